@@ -5,19 +5,83 @@ API endpoints for test generation service.
 """
 
 import os
+import json
+import asyncio
 import tempfile
-from typing import Optional
-from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel
+from contextlib import asynccontextmanager
+from typing import Literal, Optional
+from fastapi import FastAPI, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field
 
-from api_client_test_writer import generate_test_for_api
+from api_client_test_writer import generate_test_for_api, repair_test_for_api
 
-from api_client_playwright_executor import execute_playwright_test
+from api_client_playwright_executor import (
+    execute_playwright_test,
+    execute_playwright_suite,
+)
 from utils import cleanup_workspace as cleanup_workspace_util
+from workspace_pool import workspace_pool
+from playwright_runner import runner_pool
+from generation_jobs import job_manager
+from mcp_server import mcp_server_pool
+from script_cache import script_cache, generation_cache
+from run_recorder import run_recorder, fetch_step_timings, merge_runs, summarize_step_timings
+from screenshot_uploads import screenshot_uploader
+from debug_artifacts import debug_artifact_store
+from generation_budget import (
+    GenerationBudget,
+    BudgetExceededError,
+    tenant_ledger,
+    prompt_cache_stats,
+)
+from resource_scheduler import (
+    ResourceBusyError,
+    ResourceLimiter,
+    mcp_sessions,
+    test_executions,
+)
 
 from fastapi.middleware.cors import CORSMiddleware
 
-app = FastAPI(title="E2E Test Generator API")
+
+async def warm_supabase():
+    """Connect to Supabase in the background so the first request reuses the connection."""
+    from supabase_client import warm_supabase_client
+
+    try:
+        await asyncio.to_thread(warm_supabase_client)
+    except Exception as e:
+        print(f"Supabase warm-up failed: {e}")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Start and stop background services."""
+    workspace_pool.start()
+    job_manager.start()
+    mcp_server_pool.start()
+    run_recorder.start()
+    screenshot_uploader.start()
+    # Warm runners in the background so startup is not blocked on browser launch
+    runner_warmup = asyncio.create_task(runner_pool.start())
+    supabase_warmup = asyncio.create_task(warm_supabase())
+    yield
+    runner_warmup.cancel()
+    supabase_warmup.cancel()
+    await job_manager.stop()
+    await mcp_server_pool.stop()
+    await runner_pool.stop()
+    await workspace_pool.stop()
+    await screenshot_uploader.stop()
+    await run_recorder.stop()
+
+    from supabase_client import close_supabase_client
+
+    close_supabase_client()
+
+
+app = FastAPI(title="E2E Test Generator API", lifespan=lifespan)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],  # any origin
@@ -27,12 +91,42 @@ app.add_middleware(
 )
 
 
-class TestGenerationRequest(BaseModel):
+class GenerationLimits(BaseModel):
+    """Tenant and budget fields shared by requests that run the agent."""
+
+    # Usage is charged to the tenant's allowance
+    tenant_id: Optional[str] = None
+    # Per-request budgets, can only tighten the server defaults
+    max_input_tokens: Optional[int] = Field(default=None, gt=0)
+    max_output_tokens: Optional[int] = Field(default=None, gt=0)
+    max_cost_usd: Optional[float] = Field(default=None, gt=0)
+    max_seconds: Optional[float] = Field(default=None, gt=0)
+
+
+class TestGenerationRequest(GenerationLimits):
     """Request model for test generation."""
 
     target_url: str
     test_case_description: str
     instance_id: Optional[str] = None
+    # Reuse a cached result for the same URL and description if it still passes
+    use_cache: bool = True
+
+
+class GenerationUsage(BaseModel):
+    """Token usage, estimated cost and duration of a generation run."""
+
+    input_tokens: int
+    cached_input_tokens: int
+    # Share of input tokens served from the prompt cache, None before any request
+    cache_hit_rate: Optional[float] = None
+    output_tokens: int
+    total_tokens: int
+    requests: int
+    cost_usd: float
+    duration_seconds: float
+    # Budget that stopped the run early, if any
+    stop_reason: Optional[Literal["input_tokens", "output_tokens", "cost", "tenant", "time"]] = None
 
 
 class TestGenerationResponse(BaseModel):
@@ -41,12 +135,68 @@ class TestGenerationResponse(BaseModel):
     test_plan: list[str]
     test_script: str
     status: str
+    usage: Optional[GenerationUsage] = None
+    # Served from the generation cache after a passing re-run
+    cached: bool = False
+
+
+class RepairTestRequest(GenerationLimits):
+    """Request model for repairing a failing test."""
+
+    test_id: str
+
+
+class RepairTestResponse(BaseModel):
+    """Response model for a test repair."""
+
+    test_id: str
+    # "passing" if the test passed without changes, "repaired" if the patched
+    # script passes, "not_repaired" otherwise (the stored script is returned)
+    status: Literal["passing", "repaired", "not_repaired"]
+    test_plan: Optional[list[str]] = None
+    test_script: str
+    failing_step: Optional[str] = None
+    failing_step_index: Optional[int] = None
+    # The agent's closing message, e.g. why it did not change the test
+    summary: Optional[str] = None
+    usage: Optional[GenerationUsage] = None
+
+
+class GenerationJobResponse(BaseModel):
+    """Response model for a submitted test generation job."""
+
+    job_id: str
+    status: str
+
+
+class GenerationJobStatusResponse(BaseModel):
+    """Response model with the progress of a test generation job."""
+
+    job_id: str
+    status: str
+    turns: int
+    tool_calls: int
+    last_test_success: Optional[bool] = None
+    last_test_output: Optional[str] = None
+    usage: Optional[GenerationUsage] = None
+    result: Optional[TestGenerationResponse] = None
+    error: Optional[str] = None
 
 
 class TestExecutionRequest(BaseModel):
     """Request model for test execution."""
 
     test_id: str
+    # Record a Playwright trace and video, kept only for failed or retried runs
+    debug_artifacts: Optional[Literal["on_failure", "on_retry"]] = None
+
+
+class StepTiming(BaseModel):
+    """Timing of one completed step, in milliseconds since the test started."""
+
+    description: str
+    started_ms: float
+    duration_ms: float
 
 
 class TestExecutionResponse(BaseModel):
@@ -56,9 +206,53 @@ class TestExecutionResponse(BaseModel):
     output: str
     test_id: str
     test_plan: Optional[list[str]] = None
+    step_timings: Optional[list[StepTiming]] = None
     failing_step: Optional[str] = None
     failing_step_index: Optional[int] = None
     screenshot_id: Optional[str] = None
+    thumbnail_id: Optional[str] = None
+    duration_seconds: Optional[float] = None
+    execution_id: Optional[str] = None
+    debug_artifacts: Optional[list[str]] = None
+
+
+class StepTimingStats(BaseModel):
+    """Duration percentiles of one step over recent runs."""
+
+    index: int
+    description: str
+    samples: int
+    p50_ms: float
+    p95_ms: float
+    max_ms: float
+
+
+class StepTimingStatsResponse(BaseModel):
+    """Response model for a test's step timing statistics."""
+
+    test_id: str
+    runs: int
+    steps: list[StepTimingStats]
+
+
+class SuiteExecutionRequest(BaseModel):
+    """Request model for suite execution."""
+
+    test_ids: Optional[list[str]] = None
+    filter: Literal["all", "failing"] = "all"
+    concurrency: Optional[int] = Field(default=None, ge=1)
+    mode: Literal["parallel", "batch"] = "parallel"
+
+
+class SuiteExecutionResponse(BaseModel):
+    """Response model for suite execution."""
+
+    results: list[TestExecutionResponse]
+    total: int
+    passed: int
+    failed: int
+    duration_seconds: float
+    concurrency: int
 
 
 class JiraIssueRequest(BaseModel):
@@ -77,6 +271,58 @@ class JiraIssueResponse(BaseModel):
     status: str
 
 
+def execution_response(result: dict) -> TestExecutionResponse:
+    """Build the API response for a single test execution result."""
+    return TestExecutionResponse(
+        success=result["success"],
+        output=result["output"],
+        test_id=result["test_id"],
+        test_plan=result.get("test_plan"),
+        step_timings=result.get("step_timings"),
+        failing_step=result.get("failing_step"),
+        failing_step_index=result.get("failing_step_index"),
+        screenshot_id=result.get("screenshot_id"),
+        thumbnail_id=result.get("thumbnail_id"),
+        duration_seconds=result.get("duration_seconds"),
+        execution_id=result.get("execution_id"),
+        debug_artifacts=result.get("debug_artifacts"),
+    )
+
+
+def generation_budget(request: GenerationLimits) -> GenerationBudget:
+    """
+    Budget for a generation request, rejecting it with 429 if its tenant is out of allowance.
+    """
+    if request.tenant_id:
+        try:
+            tenant_ledger.check(request.tenant_id)
+        except BudgetExceededError as e:
+            raise HTTPException(
+                status_code=429,
+                detail=str(e),
+                headers={"Retry-After": str(e.retry_after)},
+            )
+
+    return GenerationBudget.from_env().tightened(
+        max_input_tokens=request.max_input_tokens,
+        max_output_tokens=request.max_output_tokens,
+        max_cost_usd=request.max_cost_usd,
+        max_seconds=request.max_seconds,
+    )
+
+
+def admit(limiter: ResourceLimiter, pending: int = 0):
+    """Reject the request with 429 and Retry-After when the limiter's queue is full."""
+    try:
+        limiter.admit(pending)
+    except ResourceBusyError as e:
+        raise HTTPException(
+            status_code=429,
+            detail=str(e),
+            headers={"Retry-After": str(e.retry_after)},
+        )
+
+
 @app.get("/")
 async def root():
     """Health check endpoint."""
@@ -87,6 +333,21 @@ async def root():
     }
 
 
+@app.get("/resources")
+async def resources_endpoint():
+    """Usage and queue depth of the browser-heavy resource slots."""
+    return {
+        "mcp_sessions": mcp_sessions.metrics(),
+        "test_executions": test_executions.metrics(),
+        "generation_job_queue_depth": job_manager.queue_depth,
+        "script_cache": script_cache.metrics(),
+        "generation_cache": generation_cache.metrics(),
+        "prompt_cache": prompt_cache_stats.metrics(),
+        "run_recorder": run_recorder.metrics(),
+        "screenshot_uploads": screenshot_uploader.metrics(),
+    }
+
+
 @app.post("/generate-test", response_model=TestGenerationResponse)
 async def generate_test_endpoint(request: TestGenerationRequest):
     """
@@ -109,6 +370,9 @@ async def generate_test_endpoint(request: TestGenerationRequest):
             status_code=500, detail="OPENAI_API_KEY not configured on server"
         )
 
+    admit(mcp_sessions)
+    budget = generation_budget(request)
+
     # Generate instance ID for logging
     instance_id = request.instance_id or str(uuid.uuid4())[:8]
 
@@ -133,6 +397,9 @@ async def generate_test_endpoint(request: TestGenerationRequest):
             test_case_description=request.test_case_description,
             target_url=request.target_url,
             instance_id=instance_id,
+            budget=budget,
+            tenant_id=request.tenant_id,
+            use_cache=request.use_cache,
         )
 
         # Build response
@@ -144,6 +411,8 @@ async def generate_test_endpoint(request: TestGenerationRequest):
             test_plan=result.get("test_plan"),
             test_script=result.get("test_script"),
             status="success",
+            usage=result.get("usage"),
+            cached=result.get("cached", False),
         )
 
         # Cleanup data store (imported from test generator)
@@ -158,6 +427,319 @@ async def generate_test_endpoint(request: TestGenerationRequest):
         raise HTTPException(status_code=500, detail=f"Test generation failed: {str(e)}")
 
 
+def generation_job_status(job) -> GenerationJobStatusResponse:
+    """Build the API response for a generation job."""
+    last_test_result = job.last_test_result or {}
+    result = None
+    if job.result is not None:
+        result = TestGenerationResponse(
+            test_plan=job.result.get("test_plan") or [],
+            test_script=job.result.get("test_script") or "",
+            status="success",
+            usage=job.result.get("usage"),
+            cached=job.result.get("cached", False),
+        )
+
+    return GenerationJobStatusResponse(
+        job_id=job.job_id,
+        status=job.status,
+        turns=job.progress.get("turns", 0),
+        tool_calls=job.progress.get("tool_calls", 0),
+        last_test_success=last_test_result.get("success"),
+        last_test_output=last_test_result.get("output"),
+        usage=job.progress.get("usage"),
+        result=result,
+        error=job.error,
+    )
+
+
+@app.post("/repair-test", response_model=RepairTestResponse)
+async def repair_test_endpoint(request: RepairTestRequest):
+    """
+    Repair a failing stored test by patching its script from the failing step on.
+
+    The test is run once to capture the current failure, then the agent is
+    seeded with the script, plan, failing step, output and screenshot. The
+    result is not saved; the caller updates the test like after a generation.
+
+    Args:
+        request: Repair request with the test ID and optional budgets
+
+    Returns:
+        RepairTestResponse with the patched (or unchanged) script and plan
+    """
+    from dotenv import load_dotenv
+    import uuid
+
+    load_dotenv()
+
+    if not os.getenv("OPENAI_API_KEY"):
+        raise HTTPException(
+            status_code=500, detail="OPENAI_API_KEY not configured on server"
+        )
+    if not os.getenv("SUPABASE_URL") or not os.getenv("SUPABASE_KEY"):
+        raise HTTPException(
+            status_code=500,
+            detail="SUPABASE_URL and SUPABASE_KEY not configured on server",
+        )
+
+    admit(mcp_sessions)
+    budget = generation_budget(request)
+
+    from supabase_client import get_supabase_client, with_retry
+
+    try:
+        result = await asyncio.to_thread(
+            with_retry,
+            get_supabase_client()
+            .table("tests")
+            .select("test_script, plan, target_url")
+            .eq("id", request.test_id)
+            .single()
+            .execute,
+        )
+    except Exception as e:
+        raise HTTPException(status_code=404, detail=f"Test {request.test_id} not found: {str(e)}")
+    test_data = result.data
+    if not test_data or not test_data.get("test_script"):
+        raise HTTPException(status_code=404, detail=f"Test {request.test_id} has no script to repair")
+
+    try:
+        failure = await execute_playwright_test(request.test_id, test_data=test_data)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Test execution failed: {str(e)}")
+
+    if failure["success"]:
+        return RepairTestResponse(
+            test_id=request.test_id,
+            status="passing",
+            test_plan=test_data.get("plan"),
+            test_script=test_data["test_script"],
+        )
+
+    instance_id = str(uuid.uuid4())[:8]
+    screenshot = None
+    if failure.get("screenshot_id"):
+        screenshot = await asyncio.to_thread(screenshot_uploader.fetch, failure["screenshot_id"])
+
+    print(f"\n{'='*80}")
+    print("Test repair started")
+    print(f"Test ID: {request.test_id}")
+    print(f"Instance ID: {instance_id}")
+    print(f"Failing step {failure.get('failing_step_index')}: {failure.get('failing_step')}")
+    print(f"{'='*80}\n")
+
+    try:
+        repair = await repair_test_for_api(
+            test_script=test_data["test_script"],
+            test_plan=test_data.get("plan"),
+            target_url=test_data["target_url"],
+            failure=failure,
+            screenshot=screenshot,
+            instance_id=instance_id,
+            budget=budget,
+            tenant_id=request.tenant_id,
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Test repair failed: {str(e)}")
+    finally:
+        from api_client_test_writer import test_data_store
+
+        test_data_store.pop(instance_id, None)
+
+    return RepairTestResponse(
+        test_id=request.test_id,
+        status="repaired" if repair["repaired"] else "not_repaired",
+        test_plan=repair.get("test_plan"),
+        test_script=repair["test_script"],
+        failing_step=failure.get("failing_step"),
+        failing_step_index=failure.get("failing_step_index"),
+        summary=repair.get("summary"),
+        usage=repair.get("usage"),
+    )
+
+
+@app.post("/generate-test/jobs", response_model=GenerationJobResponse, status_code=202)
+async def submit_generation_job_endpoint(request: TestGenerationRequest):
+    """
+    Queue an E2E test generation job and return immediately.
+
+    Args:
+        request: Test generation request with target URL and test case description
+
+    Returns:
+        GenerationJobResponse with the job ID to poll
+    """
+    from dotenv import load_dotenv
+
+    load_dotenv()
+
+    if not os.getenv("OPENAI_API_KEY"):
+        raise HTTPException(
+            status_code=500, detail="OPENAI_API_KEY not configured on server"
+        )
+
+    admit(mcp_sessions, pending=job_manager.queue_depth)
+    budget = generation_budget(request)
+
+    job = job_manager.submit(
+        request.target_url,
+        request.test_case_description,
+        budget=budget,
+        tenant_id=request.tenant_id,
+        use_cache=request.use_cache,
+    )
+
+    print(f"\n{'='*80}")
+    print("New test generation job queued")
+    print(f"Job ID: {job.job_id}")
+    print(f"Instance ID: {job.instance_id}")
+    print(f"Target URL: {request.target_url}")
+    print(f"Test Case: {request.test_case_description}")
+    print(f"Queue depth: {job_manager.queue_depth}")
+    print(f"{'='*80}\n")
+
+    return GenerationJobResponse(job_id=job.job_id, status=job.status)
+
+
+@app.get("/generate-test/jobs/{job_id}", response_model=GenerationJobStatusResponse)
+async def generation_job_status_endpoint(job_id: str):
+    """
+    Get the status and progress of a test generation job.
+
+    Args:
+        job_id: ID returned when the job was submitted
+
+    Returns:
+        GenerationJobStatusResponse with progress, and the result once finished
+    """
+    job = job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+
+    return generation_job_status(job)
+
+
+@app.delete("/generate-test/jobs/{job_id}", response_model=GenerationJobStatusResponse)
+async def cancel_generation_job_endpoint(job_id: str):
+    """
+    Cancel a queued or running test generation job.
+
+    Args:
+        job_id: ID returned when the job was submitted
+
+    Returns:
+        GenerationJobStatusResponse for the job
+    """
+    job = job_manager.cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+
+    # Let a running job unwind so the response reflects the cancellation
+    if job.task is not None and not job.task.done():
+        await asyncio.wait([job.task], timeout=10)
+        await asyncio.sleep(0)
+
+    return generation_job_status(job)
+
+
+@app.delete("/tests/{test_id}/cache")
+async def invalidate_test_cache_endpoint(test_id: str):
+    """
+    Drop a test's cached script and plan after it was regenerated or deleted.
+
+    Args:
+        test_id: The UUID of the test
+    """
+    script_cache.invalidate(test_id)
+    return {"status": "success", "test_id": test_id}
+
+
+@app.get("/tests/{test_id}/step-timings", response_model=StepTimingStatsResponse)
+async def step_timings_endpoint(test_id: str, runs: int = Query(default=50, ge=1, le=1000)):
+    """
+    Aggregate a test's step durations over its recent runs.
+
+    Args:
+        test_id: The UUID of the test
+        runs: Number of most recent runs to include
+
+    Returns:
+        StepTimingStatsResponse with p50/p95/max duration per step
+    """
+    # Runs still waiting in the write-behind buffer are merged in rather than
+    # flushed, so reading stats never forces a write. They are taken before
+    # the read so that a batch written meanwhile is not missed
+    pending = [run for run in run_recorder.pending_runs(test_id) if run["step_timings"]]
+
+    try:
+        persisted = await asyncio.to_thread(fetch_step_timings, test_id, runs)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to fetch step timings: {str(e)}")
+
+    recent_runs = merge_runs(pending, persisted, runs)
+
+    return StepTimingStatsResponse(
+        test_id=test_id,
+        runs=len(recent_runs),
+        steps=summarize_step_timings(recent_runs),
+    )
+
+
+@app.get("/screenshots/{screenshot_id}")
+async def screenshot_status_endpoint(screenshot_id: str):
+    """
+    Report whether a failure screenshot has been uploaded yet.
+
+    Args:
+        screenshot_id: ID returned in a TestExecutionResponse
+
+    Returns:
+        The screenshot ID and its upload status: "pending", "available" or "failed"
+    """
+    status = screenshot_uploader.status(screenshot_id)
+    if status is None:
+        raise HTTPException(status_code=404, detail=f"Screenshot {screenshot_id} not found")
+
+    return {"screenshot_id": screenshot_id, "status": status}
+
+
+@app.get("/executions/{execution_id}/artifacts")
+async def list_debug_artifacts_endpoint(execution_id: str):
+    """
+    List the traces and videos kept locally for an execution.
+
+    Args:
+        execution_id: ID returned in a TestExecutionResponse
+    """
+    return {
+        "execution_id": execution_id,
+        "artifacts": debug_artifact_store.list_artifacts(execution_id),
+    }
+
+
+@app.post("/executions/{execution_id}/artifacts/{name}")
+async def upload_debug_artifact_endpoint(execution_id: str, name: str):
+    """
+    Upload a trace or video to storage on demand.
+
+    Args:
+        execution_id: ID returned in a TestExecutionResponse
+        name: Artifact name from the execution's artifact list
+
+    Returns:
+        Signed download URL for the artifact, valid for one hour
+    """
+    try:
+        url = await asyncio.to_thread(debug_artifact_store.upload, execution_id, name)
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Artifact upload failed: {str(e)}")
+
+    return {"execution_id": execution_id, "name": name, "url": url}
+
+
 @app.delete("/workspace/{instance_id}")
 async def cleanup_workspace(instance_id: str, keep_tests: bool = False):
     """
@@ -202,8 +784,12 @@ async def execute_test_endpoint(request: TestExecutionRequest):
             detail="SUPABASE_URL and SUPABASE_KEY not configured on server",
         )
 
+    admit(test_executions)
+
     try:
-        result = execute_playwright_test(request.test_id)
+        result = await execute_playwright_test(
+            request.test_id, debug_artifacts=request.debug_artifacts
+        )
 
         # Log execution details to main console
         execution_id = result.get("execution_id")
@@ -218,15 +804,7 @@ async def execute_test_endpoint(request: TestExecutionRequest):
         if log_path:
             print(f"Log Path: {log_path}\n")
 
-        return TestExecutionResponse(
-            success=result["success"],
-            output=result["output"],
-            test_id=result["test_id"],
-            test_plan=result.get("test_plan"),
-            failing_step=result.get("failing_step"),
-            failing_step_index=result.get("failing_step_index"),
-            screenshot_id=result.get("screenshot_id"),
-        )
+        return execution_response(result)
 
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
@@ -234,6 +812,115 @@ async def execute_test_endpoint(request: TestExecutionRequest):
         raise HTTPException(status_code=500, detail=f"Test execution failed: {str(e)}")
 
 
+@app.get("/execute-test/{test_id}/stream")
+async def execute_test_stream_endpoint(test_id: str):
+    """
+    Execute a Playwright test and stream its progress as Server-Sent Events.
+
+    Emits "step" events as each successful_step is reached, "stdout" and
+    "stderr" lines, "failure" and "screenshot" once known, and finally a
+    "result" event with the TestExecutionResponse (or an "error" event).
+
+    Args:
+        test_id: UUID of the test to execute
+
+    Returns:
+        text/event-stream response
+    """
+    from dotenv import load_dotenv
+
+    load_dotenv()
+
+    if not os.getenv("SUPABASE_URL") or not os.getenv("SUPABASE_KEY"):
+        raise HTTPException(
+            status_code=500,
+            detail="SUPABASE_URL and SUPABASE_KEY not configured on server",
+        )
+
+    admit(test_executions)
+
+    events: asyncio.Queue[dict | None] = asyncio.Queue()
+
+    async def run():
+        try:
+            result = await execute_playwright_test(test_id, on_event=events.put_nowait)
+            events.put_nowait({"type": "result", **execution_response(result).model_dump()})
+        except ValueError as e:
+            events.put_nowait({"type": "error", "status_code": 404, "detail": str(e)})
+        except Exception as e:
+            events.put_nowait(
+                {"type": "error", "status_code": 500, "detail": f"Test execution failed: {str(e)}"}
+            )
+        finally:
+            events.put_nowait(None)
+
+    async def event_stream():
+        task = asyncio.create_task(run())
+        try:
+            while (event := await events.get()) is not None:
+                yield f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+        finally:
+            # Client went away, stop the execution
+            if not task.done():
+                task.cancel()
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.post("/execute-suite", response_model=SuiteExecutionResponse)
+async def execute_suite_endpoint(request: SuiteExecutionRequest):
+    """
+    Execute many Playwright tests from the database in parallel.
+
+    Args:
+        request: Suite execution request with test IDs or a filter, and concurrency
+
+    Returns:
+        SuiteExecutionResponse with per-test results and aggregate timing
+    """
+    from dotenv import load_dotenv
+
+    load_dotenv()
+
+    if not os.getenv("SUPABASE_URL") or not os.getenv("SUPABASE_KEY"):
+        raise HTTPException(
+            status_code=500,
+            detail="SUPABASE_URL and SUPABASE_KEY not configured on server",
+        )
+
+    admit(test_executions)
+
+    try:
+        result = await execute_playwright_suite(
+            test_ids=request.test_ids,
+            failing_only=request.filter == "failing",
+            concurrency=request.concurrency,
+            mode=request.mode,
+        )
+
+        print(f"\n{'='*80}")
+        print("Suite execution completed")
+        print(f"Tests: {result['total']}, Passed: {result['passed']}, Failed: {result['failed']}")
+        print(f"Duration: {result['duration_seconds']:.1f}s")
+        print(f"{'='*80}\n")
+
+        return SuiteExecutionResponse(
+            results=[execution_response(test_result) for test_result in result["results"]],
+            total=result["total"],
+            passed=result["passed"],
+            failed=result["failed"],
+            duration_seconds=result["duration_seconds"],
+            concurrency=result["concurrency"],
+        )
+
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Suite execution failed: {str(e)}")
+
+
 @app.post("/create-jira-issue", response_model=JiraIssueResponse)
 async def create_jira_issue_endpoint(request: JiraIssueRequest):
     """
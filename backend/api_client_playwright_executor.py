@@ -1,16 +1,25 @@
 import os
+import asyncio
 import logging
 import uuid
 import json
+import time
+import math
+from collections.abc import Callable
 
 from utils import (
     add_post_test_file_write,
-    create_workspace,
-    setup_testjs_workspace,
-    install_test_dependencies,
+    STEP_MARKER,
+    run_test_batch,
     run_tests,
     add_step_logging_to_test_script,
 )
+from workspace_pool import workspace_pool
+from script_cache import script_cache
+from run_recorder import run_recorder
+from screenshot_uploads import screenshot_uploader
+from debug_artifacts import debug_artifact_store
+from script_validation import STEP_CALL_PATTERN, strip_comments
 
 
 def setup_execution_logger(execution_id: str, workspace_dir: str) -> logging.Logger:
@@ -41,23 +50,184 @@ def setup_execution_logger(execution_id: str, workspace_dir: str) -> logging.Log
     return logger
 
 
-def execute_playwright_test(test_id: str) -> dict:
+def _stream_output(on_event: Callable[[dict], None]) -> Callable[[str, str], None]:
+    """Turn runner output lines into execution events, picking out completed steps."""
+    step_index = 0
+
+    def on_output(stream: str, line: str):
+        nonlocal step_index
+        if stream == "stdout" and line.startswith(STEP_MARKER):
+            try:
+                description = json.loads(line[len(STEP_MARKER):])
+            except json.JSONDecodeError:
+                description = line[len(STEP_MARKER):]
+            on_event({"type": "step", "index": step_index, "description": description})
+            step_index += 1
+        else:
+            on_event({"type": stream, "line": line})
+
+    return on_output
+
+
+def _steps_before_line(spec_path: str, line: int) -> int:
+    """
+    Count the successful_step calls in a spec file above the given line.
+
+    Only an approximation for runs without a step log: calls in helpers or
+    loops and errors reported at the test( line are not mapped correctly.
+    """
+    with open(spec_path, "r") as f:
+        source_lines = strip_comments(f.read()).split("\n")[: max(line - 1, 0)]
+    return sum(
+        len(STEP_CALL_PATTERN.findall(source_line))
+        for source_line in source_lines
+        if "function successful_step(" not in source_line
+    )
+
+
+async def collect_test_results(
+    report: dict | None,
+    test_plan: list[str] | None,
+    success: bool,
+    spec_path: str,
+    logger: logging.Logger,
+) -> dict:
+    """
+    Derive a run's progress from its structured report.
+
+    Queues the failure screenshot, if any, for upload to the Screenshots bucket.
+
+    Args:
+        report: The spec's structured report (see utils.build_spec_report), or
+            None if the run did not produce one
+        test_plan: The test plan steps, if any
+        success: Whether the run passed
+        spec_path: Path of the executed spec file, used to map the error
+            location to a step
+        logger: Execution logger
+
+    Returns:
+        dict with completed steps and their timings, progress, failing step
+        and screenshot IDs
+    """
+    report = report or {}
+    step_timings = report.get("steps", [])
+    completed_steps = [step["description"] for step in step_timings]
+    logger.info(f"Report lists {len(completed_steps)} completed steps")
+
+    # Handle screenshot on failure
+    screenshot_id = None
+    thumbnail_id = None
+    attachments = {attachment["name"]: attachment["path"] for attachment in report.get("attachments", [])}
+    screenshot_path = attachments.get("screenshot")
+    if screenshot_path and os.path.exists(screenshot_path):
+        thumbnail_path = attachments.get("thumbnail")
+        if thumbnail_path and not os.path.exists(thumbnail_path):
+            thumbnail_path = None
+        try:
+            # Uploaded in the background, the ID is the content hash
+            screenshot_id, thumbnail_id = await screenshot_uploader.submit(
+                screenshot_path, thumbnail_path
+            )
+            logger.info(f"Queued screenshot {screenshot_id} for upload")
+        except Exception as e:
+            logger.error(f"Failed to queue screenshot upload: {e}", exc_info=True)
+            screenshot_id = None
+            thumbnail_id = None
+    else:
+        logger.info("No screenshot attached - test likely passed or screenshot capture failed")
+
+    # Calculate progress
+    steps_completed = len(completed_steps)
+    total_steps = len(test_plan) if test_plan else 0
+    progress_percentage = (
+        (steps_completed / total_steps * 100) if total_steps > 0 else 0
+    )
+
+    logger.info(
+        f"Test progress: {steps_completed}/{total_steps} steps ({progress_percentage:.1f}%)"
+    )
+
+    # Determine failing step if test failed
+    failing_step = None
+    failing_step_index = None
+
+    if not success:
+        logger.info("Test failed. Analyzing which step failed...")
+
+        # The step after the last one the hooks logged as completed. Without
+        # a step log, fall back to the successful_step calls above the error
+        step_index = steps_completed
+        if not report.get("step_log"):
+            for error in report.get("errors", []):
+                location = error.get("location")
+                if location and os.path.basename(location.get("file", "")) == os.path.basename(
+                    spec_path
+                ):
+                    try:
+                        step_index = _steps_before_line(spec_path, location["line"])
+                    except OSError as e:
+                        logger.warning(f"Failed to map error location to a step: {e}")
+                    break
+
+        if test_plan and step_index < total_steps:
+            failing_step_index = step_index
+            failing_step = test_plan[failing_step_index]
+            logger.info(
+                f"Failing step identified at index {failing_step_index}: {failing_step}"
+            )
+        elif test_plan:
+            logger.info(
+                "All planned steps completed but test still failed (failure outside planned steps)"
+            )
+        else:
+            logger.info(
+                "No plan available or test failed before any steps executed"
+            )
+    else:
+        logger.info("Test passed successfully")
+
+
+    return {
+        "completed_steps": completed_steps,
+        "step_timings": step_timings,
+        "steps_completed": steps_completed,
+        "total_steps": total_steps,
+        "progress_percentage": progress_percentage,
+        "failing_step": failing_step,
+        "failing_step_index": failing_step_index,
+        "screenshot_id": screenshot_id,
+        "thumbnail_id": thumbnail_id,
+    }
+
+
+async def execute_playwright_test(
+    test_id: str,
+    test_data: dict | None = None,
+    on_event: Callable[[dict], None] | None = None,
+    debug_artifacts: str | None = None,
+) -> dict:
     """
     Execute a Playwright test from the database.
 
     Args:
         test_id: UUID of the test to execute
+        test_data: Optional prefetched row with test_script and plan, skips the fetch
+        on_event: Optional callback receiving live "stdout", "stderr", "step",
+            "failure" and "screenshot" events while the test runs
+        debug_artifacts: Optional "on_failure" or "on_retry" to record a trace
+            and video, kept locally under the execution ID
 
     Returns:
         dict with success status, output, and other test execution details
     """
-    from supabase_client import get_supabase_client
+    from supabase_client import get_supabase_client, with_retry
 
     # Generate unique execution ID for this request
     execution_id = str(uuid.uuid4())[:8]
 
-    # Create workspace first so we can set up logging
-    workspace_dir, _ = create_workspace(execution_id)
+    # Check out a provisioned workspace first so we can set up logging
+    workspace_dir, testjs_dir = await workspace_pool.checkout(execution_id)
     logger = setup_execution_logger(execution_id, workspace_dir)
 
     logger.info(f"Execution ID: {execution_id}")
@@ -68,22 +238,34 @@ def execute_playwright_test(test_id: str) -> dict:
         supabase = get_supabase_client()
         logger.info("Connected to Supabase")
 
-        # Fetch test data from Supabase
-        logger.info(f"Fetching test data for ID: {test_id}")
-        result = (
-            supabase.table("tests")
-            .select("test_script, plan")
-            .eq("id", test_id)
-            .single()
-            .execute()
-        )
-
-        if not result.data:
-            logger.error(f"Test with id {test_id} not found in database")
-            raise ValueError(f"Test with id {test_id} not found")
+        if test_data is None:
+            test_data = script_cache.get(test_id)
+            if test_data is not None:
+                logger.info(f"Using cached test data for ID: {test_id}")
+
+        if test_data is None:
+            # Fetch test data from Supabase
+            logger.info(f"Fetching test data for ID: {test_id}")
+            result = await asyncio.to_thread(
+                with_retry,
+                supabase.table("tests")
+                .select("test_script, plan")
+                .eq("id", test_id)
+                .single()
+                .execute
+            )
+
+            if not result.data:
+                logger.error(f"Test with id {test_id} not found in database")
+                raise ValueError(f"Test with id {test_id} not found")
+
+            test_data = result.data
+            script_cache.put(test_id, test_data)
+        else:
+            logger.info(f"Using prefetched test data for ID: {test_id}")
 
-        test_script = result.data.get("test_script")
-        test_plan = result.data.get("plan")
+        test_script = test_data.get("test_script")
+        test_plan = test_data.get("plan")
         logger.info(
             f"Successfully fetched test data. Plan has {len(test_plan) if test_plan else 0} steps"
         )
@@ -92,13 +274,11 @@ def execute_playwright_test(test_id: str) -> dict:
             logger.error(f"Test script is empty for test id {test_id}")
             raise ValueError(f"Test script is empty for test id {test_id}")
 
-        # Setup testjs directory
-        logger.info("Setting up testjs workspace")
-        testjs_dir = setup_testjs_workspace(workspace_dir, logger)
-
         # Add step logging to test script
         logger.info("Adding step logging to test script")
-        test_script_with_logging = add_post_test_file_write(test_script)
+        test_script_with_logging = add_post_test_file_write(
+            add_step_logging_to_test_script(test_script)
+        )
 
         # Write test script to file
         test_file_path = os.path.join(testjs_dir, "tests", "test.spec.js")
@@ -108,114 +288,42 @@ def execute_playwright_test(test_id: str) -> dict:
         logger.info(f"Test script written successfully")
         logger.info(f"Test script content:\n{test_script_with_logging}")
 
-        # Install dependencies
-        logger.info("Installing test dependencies")
-        deps_installed = install_test_dependencies(testjs_dir, logger)
-        if not deps_installed:
-            logger.error("Failed to install dependencies")
-            raise RuntimeError("Failed to install dependencies")
-        logger.info("Dependencies installed successfully")
-
         # Run tests
         logger.info("Running Playwright tests")
-        success, output = run_tests(testjs_dir, logger)
+        success, output, reports = await run_tests(
+            testjs_dir,
+            logger,
+            on_output=_stream_output(on_event) if on_event else None,
+            debug_artifacts=debug_artifacts,
+        )
         logger.info(f"Test execution completed. Success: {success}")
-        logger.info(f"Test output:\n{output}")
-
-        # Read completed steps from JSON file
-        completed_steps = []
-        completed_steps_path = os.path.join(testjs_dir, "completed_steps.json")
-        if os.path.exists(completed_steps_path):
-            logger.info(f"Reading completed steps from {completed_steps_path}")
-            try:
-                with open(completed_steps_path, "r") as f:
-                    completed_steps = json.load(f)
-                logger.info(f"Successfully read {len(completed_steps)} completed steps")
-            except Exception as e:
-                logger.warning(f"Failed to read completed_steps.json: {e}")
-        else:
-            logger.warning(f"completed_steps.json not found at {completed_steps_path}")
-
-        # Handle screenshot on failure
-        screenshot_id = None
-        screenshot_id_path = os.path.join(testjs_dir, "screenshot_id.json")
-        logger.info(f"Checking for screenshot at {screenshot_id_path}")
-        if os.path.exists(screenshot_id_path):
-            logger.info(f"Screenshot ID file found at {screenshot_id_path}")
-            try:
-                with open(screenshot_id_path, "r") as f:
-                    screenshot_data = json.load(f)
-                    screenshot_id = screenshot_data.get("screenshot_id")
-                    logger.info(f"Screenshot ID from file: {screenshot_id}")
-
-                if screenshot_id:
-                    screenshot_file_path = os.path.join(testjs_dir, f"{screenshot_id}.png")
-                    logger.info(f"Looking for screenshot file at {screenshot_file_path}")
-                    if os.path.exists(screenshot_file_path):
-                        logger.info(f"Screenshot file found, uploading {screenshot_id} to Supabase Screenshots bucket")
-
-                        with open(screenshot_file_path, "rb") as screenshot_file:
-                            screenshot_bytes = screenshot_file.read()
-
-                        logger.info(f"Screenshot file size: {len(screenshot_bytes)} bytes")
-
-                        upload_result = supabase.storage.from_("Screenshots").upload(
-                            path=f"{screenshot_id}.png",
-                            file=screenshot_bytes,
-                            file_options={"content-type": "image/png"}
-                        )
-
-                        logger.info(f"Screenshot uploaded successfully: {screenshot_id}, Upload result: {upload_result}")
-
-                        # Clean up local screenshot file
-                        os.remove(screenshot_file_path)
-                        logger.info(f"Removed local screenshot file at {screenshot_file_path}")
-                    else:
-                        logger.warning(f"Screenshot file not found at {screenshot_file_path}")
-                        screenshot_id = None
-                else:
-                    logger.warning("Screenshot ID is empty or None in screenshot_id.json")
-            except Exception as e:
-                logger.error(f"Failed to upload screenshot: {e}", exc_info=True)
-                screenshot_id = None
-        else:
-            logger.info("No screenshot_id.json found - test likely passed or screenshot capture failed")
 
-        # Calculate progress
-        steps_completed = len(completed_steps)
-        total_steps = len(test_plan) if test_plan else 0
-        progress_percentage = (
-            (steps_completed / total_steps * 100) if total_steps > 0 else 0
-        )
+        artifacts = None
+        if debug_artifacts:
+            artifacts = debug_artifact_store.collect(execution_id, testjs_dir)
+            logger.info(f"Debug artifacts: {artifacts}")
+        logger.info(f"Test output:\n{output}")
 
-        logger.info(
-            f"Test progress: {steps_completed}/{total_steps} steps ({progress_percentage:.1f}%)"
+        run_results = await collect_test_results(
+            reports.get("test"), test_plan, success, test_file_path, logger
         )
 
-        # Determine failing step if test failed
-        failing_step = None
-        failing_step_index = None
-
-        if not success:
-            logger.info("Test failed. Analyzing which step failed...")
-
-            # If we have a plan and completed fewer steps than planned
-            if test_plan and steps_completed < total_steps:
-                failing_step_index = steps_completed
-                failing_step = test_plan[failing_step_index]
-                logger.info(
-                    f"Failing step identified at index {failing_step_index}: {failing_step}"
-                )
-            elif test_plan and steps_completed == total_steps:
-                logger.info(
-                    "All planned steps completed but test still failed (failure outside planned steps)"
-                )
-            else:
-                logger.info(
-                    "No plan available or test failed before any steps executed"
-                )
-        else:
-            logger.info("Test passed successfully")
+        if on_event and not success:
+            on_event(
+                {
+                    "type": "failure",
+                    "failing_step": run_results["failing_step"],
+                    "failing_step_index": run_results["failing_step_index"],
+                }
+            )
+        if on_event and run_results["screenshot_id"]:
+            on_event(
+                {
+                    "type": "screenshot",
+                    "screenshot_id": run_results["screenshot_id"],
+                    "thumbnail_id": run_results["thumbnail_id"],
+                }
+            )
 
         # Cleanup logger handlers
         for handler in logger.handlers[:]:
@@ -224,22 +332,20 @@ def execute_playwright_test(test_id: str) -> dict:
 
         log_path = os.path.join(workspace_dir, "logs", "execution.log")
 
-        return {
+        execution_result = {
             "success": success,
             "output": output,
             "test_id": test_id,
             "test_plan": test_plan,
-            "completed_steps": completed_steps,
-            "steps_completed": steps_completed,
-            "total_steps": total_steps,
-            "progress_percentage": progress_percentage,
-            "failing_step": failing_step,
-            "failing_step_index": failing_step_index,
+            **run_results,
+            "debug_artifacts": artifacts,
             "workspace_dir": workspace_dir,
             "log_path": log_path,
             "execution_id": execution_id,
-            "screenshot_id": screenshot_id,
         }
+        run_recorder.record(test_id, execution_result)
+
+        return execution_result
 
     except Exception as e:
         logger.error(f"Error executing test {test_id}: {str(e)}", exc_info=True)
@@ -250,3 +356,190 @@ def execute_playwright_test(test_id: str) -> dict:
             logger.removeHandler(handler)
 
         raise
+
+    finally:
+        await workspace_pool.release(execution_id)
+
+
+async def execute_playwright_batch(tests: dict[str, dict | None], workers: int) -> list[dict]:
+    """
+    Execute many tests in one workspace with a single Playwright invocation.
+
+    Each script is written to tests/<test_id>.spec.js and the results,
+    completed steps and screenshots are mapped back by test ID.
+
+    Args:
+        tests: Prefetched rows with test_script and plan, keyed by test ID
+        workers: Number of Playwright workers
+
+    Returns:
+        List of per-test result dicts in the order of `tests`
+    """
+    execution_id = str(uuid.uuid4())[:8]
+    workspace_dir, testjs_dir = await workspace_pool.checkout(execution_id)
+    logger = setup_execution_logger(execution_id, workspace_dir)
+
+    logger.info(f"Execution ID: {execution_id}")
+    logger.info(f"Batch of {len(tests)} tests with {workers} workers")
+    logger.info(f"Workspace directory: {workspace_dir}")
+
+    try:
+        runnable = []
+        for test_id, test_data in tests.items():
+            if test_data and test_data.get("test_script"):
+                test_file_path = os.path.join(testjs_dir, "tests", f"{test_id}.spec.js")
+                with open(test_file_path, "w") as f:
+                    f.write(
+                        add_post_test_file_write(
+                            add_step_logging_to_test_script(test_data["test_script"])
+                        )
+                    )
+                runnable.append(test_id)
+        logger.info(f"Wrote {len(runnable)} test scripts")
+
+        batch_results = {}
+        if runnable:
+            timeout = 60 * math.ceil(len(runnable) / workers) + 60
+            batch_results = await run_test_batch(testjs_dir, workers, timeout, logger)
+
+        log_path = os.path.join(workspace_dir, "logs", "execution.log")
+        results = []
+        for test_id, test_data in tests.items():
+            if not test_data:
+                output = f"ERROR: Test with id {test_id} not found"
+            elif test_id not in runnable:
+                output = f"ERROR: Test script is empty for test id {test_id}"
+            else:
+                output = None
+
+            if output:
+                results.append({"success": False, "output": output, "test_id": test_id})
+                continue
+
+            report = batch_results.get(test_id)
+            if report:
+                success, output = report["success"], report["output"]
+            else:
+                success, output = False, "ERROR: No result reported for this test"
+            test_plan = test_data.get("plan")
+            logger.info(f"Collecting results for test {test_id}. Success: {success}")
+            run_results = await collect_test_results(
+                report,
+                test_plan,
+                success,
+                os.path.join(testjs_dir, "tests", f"{test_id}.spec.js"),
+                logger,
+            )
+            execution_result = {
+                "success": success,
+                "output": output,
+                "test_id": test_id,
+                "test_plan": test_plan,
+                **run_results,
+                "workspace_dir": workspace_dir,
+                "log_path": log_path,
+                "execution_id": execution_id,
+            }
+            run_recorder.record(test_id, execution_result)
+            results.append(execution_result)
+
+        return results
+
+    finally:
+        # Cleanup logger handlers
+        for handler in logger.handlers[:]:
+            handler.close()
+            logger.removeHandler(handler)
+
+        await workspace_pool.release(execution_id)
+
+
+async def execute_playwright_suite(
+    test_ids: list[str] | None = None,
+    failing_only: bool = False,
+    concurrency: int | None = None,
+    mode: str = "parallel",
+) -> dict:
+    """
+    Execute many Playwright tests from the database in parallel.
+
+    All scripts are fetched in a single query. In "parallel" mode they run as
+    separate executions with at most `concurrency` in flight; in "batch" mode
+    they share one workspace and one `playwright test` run with `concurrency`
+    workers.
+
+    Args:
+        test_ids: UUIDs of the tests to execute, or None for every test
+        failing_only: Only run tests whose last run did not pass
+        concurrency: Maximum parallel executions (defaults to SUITE_CONCURRENCY)
+        mode: "parallel" or "batch"
+
+    Returns:
+        dict with per-test results and aggregate counts and timing
+    """
+    from supabase_client import get_supabase_client, with_retry
+
+    concurrency = concurrency or int(os.getenv("SUITE_CONCURRENCY", "4"))
+    started = time.monotonic()
+
+    supabase = get_supabase_client()
+
+    # Listing every test or the failing ones needs the database, but the
+    # scripts themselves only have to be fetched for cache misses
+    if test_ids is None or failing_only:
+        query = supabase.table("tests").select("id")
+        if test_ids is not None:
+            query = query.in_("id", test_ids)
+        if failing_only:
+            query = query.eq("last_passed", False)
+        result = await asyncio.to_thread(with_retry, query.execute)
+        listed = [row["id"] for row in result.data or []]
+        test_ids = listed if test_ids is None else [t for t in test_ids if t in listed]
+
+    rows, missing = script_cache.get_many(test_ids)
+    if missing:
+        query = supabase.table("tests").select("id, test_script, plan").in_("id", missing)
+        result = await asyncio.to_thread(with_retry, query.execute)
+        for row in result.data or []:
+            rows[row["id"]] = row
+            script_cache.put(row["id"], row)
+
+    if mode == "batch":
+        results = await execute_playwright_batch(
+            {test_id: rows.get(test_id) for test_id in test_ids}, workers=concurrency
+        )
+        passed = sum(1 for test_result in results if test_result["success"])
+        return {
+            "results": results,
+            "total": len(results),
+            "passed": passed,
+            "failed": len(results) - passed,
+            "duration_seconds": time.monotonic() - started,
+            "concurrency": concurrency,
+        }
+
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run_one(test_id: str) -> dict:
+        async with semaphore:
+            test_started = time.monotonic()
+            try:
+                if test_id not in rows:
+                    raise ValueError(f"Test with id {test_id} not found")
+                test_result = await execute_playwright_test(test_id, rows[test_id])
+            except Exception as e:
+                test_result = {"success": False, "output": f"ERROR: {e}", "test_id": test_id}
+            test_result["duration_seconds"] = time.monotonic() - test_started
+            return test_result
+
+    results = await asyncio.gather(*(run_one(test_id) for test_id in test_ids))
+    passed = sum(1 for test_result in results if test_result["success"])
+
+    return {
+        "results": results,
+        "total": len(results),
+        "passed": passed,
+        "failed": len(results) - passed,
+        "duration_seconds": time.monotonic() - started,
+        "concurrency": concurrency,
+    }
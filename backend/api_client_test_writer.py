@@ -6,12 +6,21 @@ Each request generates tests in an isolated workspace.
 """
 
 import os
+import asyncio
+import base64
 import uuid
 import logging
 import sys
 from prompts.system_prompt_string import SYSTEM_PROMPT
+from prompts.repair_prompt_string import REPAIR_PROMPT
+from resource_scheduler import mcp_sessions
+from mcp_server import mcp_server_pool
+from generation_budget import GenerationBudget, UsageTracker, prompt_cache_stats
+from script_cache import generation_cache, generation_cache_key
+from script_validation import validate_test_script, extract_step_descriptions
 from utils import (
     add_step_logging_to_test_script,
+    successful_step_definition,
     print_result_stream,
     setup_testjs_workspace,
     install_test_dependencies,
@@ -21,6 +30,36 @@ from utils import (
 
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
+# Repairs start from a working script, so they get fewer turns than a generation
+REPAIR_MAX_TURNS = 15
+# Only the end of a failure output is shown to the repair agent
+REPAIR_OUTPUT_MAX_CHARS = 8000
+
+# Instructions and tools are identical across runs of the same prompt, so runs
+# share a prompt cache key and reuse the cached prefix. Anything per run (target
+# URL, test case, failure) goes into the user input after it.
+GENERATE_PROMPT_CACHE_KEY = "fastest-generate"
+REPAIR_PROMPT_CACHE_KEY = "fastest-repair"
+# "in_memory" or "24h"; unset leaves the API default
+PROMPT_CACHE_RETENTION = os.getenv("PROMPT_CACHE_RETENTION") or None
+
+
+def prompt_cache_settings(prompt_cache_key: str) -> dict:
+    """
+    ModelSettings keyword arguments for prompt caching.
+
+    The locked openai-agents sends no prompt_cache_key of its own, so the
+    stable key is always set here; without it, requests are routed by their
+    prefix alone. It has no ModelSettings field for the retention either, and
+    the locked openai client has no keyword for it, so the retention goes into
+    the request body directly.
+    """
+    settings = {"extra_args": {"prompt_cache_key": prompt_cache_key}}
+    if PROMPT_CACHE_RETENTION:
+        settings["extra_body"] = {"prompt_cache_retention": PROMPT_CACHE_RETENTION}
+    return settings
+
+
 # Storage for capturing test data during generation
 test_data_store = {}
 
@@ -57,67 +96,262 @@ def create_test_data_capture(instance_id: str, logger: logging.Logger):
     """Factory to create tool functions that capture data for API response."""
     from agents import function_tool
 
-    test_data_store[instance_id] = {"test_plan": None, "test_script": None}
+    test_data_store[instance_id] = {
+        "test_plan": None,
+        "test_script": None,
+        "last_test_result": None,
+        # Last script whose run passed, with its plan
+        "passing_test_script": None,
+        "passing_test_plan": None,
+    }
 
     def create_write_test_plan(workspace_dir: str):
         @function_tool
         def write_test_plan(steps: list[str]) -> str:
-            logger.info("TEST PLAN WRITTEN:")
-            for step in steps:
-                logger.info(f"- {step}")
-            print()
-
-            # Capture for API response
-            test_data_store[instance_id]["test_plan"] = steps
-            return "Test plan recorded successfully"
+            """Optional. Check a test plan against the successful_step calls of the last
+            script passed to write_test_script, which are used as the test plan.
+
+            Args:
+                steps: The expected successful_step descriptions, in order.
+            """
+            # The plan itself is extracted from the script in run_test_script
+            derived = test_data_store[instance_id]["test_plan"]
+            if derived is None:
+                return (
+                    "No test script written yet. The test plan is extracted from the "
+                    "successful_step calls of the script passed to write_test_script."
+                )
+            if steps == derived:
+                return "Test plan matches the successful_step calls in the test script"
+
+            logger.info("Test plan written by the agent differs from the script")
+            plan = "\n".join(f"- {step}" for step in derived)
+            return (
+                "Test plan differs from the successful_step calls in the test script. "
+                f"The test plan used is:\n{plan}"
+            )
 
         return write_test_plan
 
     def create_write_test_script(workspace_dir: str):
         @function_tool
-        def write_test_script(script: str) -> str:
-            script = add_step_logging_to_test_script(script)
+        async def write_test_script(script: str) -> str:
+            # Cheap static checks first, so broken scripts never reach a browser
+            errors = await validate_test_script(
+                add_step_logging_to_test_script(script)[len(successful_step_definition):]
+            )
+            if errors:
+                output = "\n".join(f"- {error}" for error in errors)
+                logger.info(f"Test script failed static validation:\n{output}")
+                test_data_store[instance_id]["last_test_result"] = {
+                    "success": False,
+                    "output": output,
+                }
+                return (
+                    "Test script was not run because it failed static validation:\n"
+                    f"{output}\n\nFix these errors and call write_test_script again."
+                )
+
+            success, output, output_path = await run_test_script(
+                instance_id, workspace_dir, script, logger
+            )
 
-            logger.info("=" * 80)
-            logger.info("TEST SCRIPT")
-            logger.info("=" * 80)
-            logger.info(script)
-            logger.info("=" * 80)
+            if success:
+                return f"Test Execution Results:\n{output}"
+            else:
+                return f"Test script written to {output_path}\n\n{output}"
 
-            # Capture for API response
-            test_data_store[instance_id]["test_script"] = script
+        return write_test_script
 
-            # Setup workspace and write script
-            testjs_dir = setup_testjs_workspace(workspace_dir, logger)
-            output_path = os.path.join(testjs_dir, "tests", "test.spec.js")
+    return create_write_test_plan, create_write_test_script
 
-            with open(output_path, "w") as f:
-                f.write(script)
 
-            logger.info(f"Test script written to: {output_path}")
+async def run_test_script(
+    instance_id: str, workspace_dir: str, script: str, logger: logging.Logger
+) -> tuple[bool, str, str]:
+    """
+    Write a script into the generation workspace, run it and record the result.
+
+    Args:
+        instance_id: Generation instance whose test_data_store entry is updated
+        workspace_dir: The instance's workspace directory
+        script: Test script, with or without the successful_step definition
+        logger: Generation logger
+
+    Returns:
+        Tuple of (success, output, path the script was written to)
+    """
+    script = add_step_logging_to_test_script(script)
+
+    logger.info("=" * 80)
+    logger.info("TEST SCRIPT")
+    logger.info("=" * 80)
+    logger.info(script)
+    logger.info("=" * 80)
+
+    # Capture for API response; the plan is the script's successful_step calls
+    test_data_store[instance_id]["test_script"] = script
+    test_data_store[instance_id]["test_plan"] = extract_step_descriptions(
+        script[len(successful_step_definition):]
+    )
+    logger.info("TEST PLAN:")
+    for step in test_data_store[instance_id]["test_plan"]:
+        logger.info(f"- {step}")
 
-            # Install dependencies
-            install_test_dependencies(testjs_dir, logger)
+    # Setup workspace and write script
+    testjs_dir = setup_testjs_workspace(workspace_dir, logger)
+    output_path = os.path.join(testjs_dir, "tests", "test.spec.js")
 
-            # Run tests
-            success, output = run_tests(testjs_dir, logger)
+    with open(output_path, "w") as f:
+        f.write(script)
 
-            if success:
-                return f"Test Execution Results:\n{output}"
-            else:
-                return f"Test script written to {output_path}\n\n{output}"
+    logger.info(f"Test script written to: {output_path}")
 
-        return write_test_script
+    # Install dependencies
+    await install_test_dependencies(testjs_dir, logger)
 
-    return create_write_test_plan, create_write_test_script
+    # Run tests
+    success, output, _ = await run_tests(testjs_dir, logger)
+    test_data_store[instance_id]["last_test_result"] = {
+        "success": success,
+        "output": output,
+    }
+    if success:
+        test_data_store[instance_id]["passing_test_script"] = script
+        test_data_store[instance_id]["passing_test_plan"] = test_data_store[instance_id][
+            "test_plan"
+        ]
+
+    return success, output, output_path
+
+
+async def run_agent(
+    instance_id: str,
+    browser_data_dir: str,
+    logger: logging.Logger,
+    instructions: str,
+    tools: list,
+    agent_input: str | list,
+    usage: UsageTracker,
+    progress: dict | None,
+    max_turns: int,
+    prompt_cache_key: str,
+) -> str | None:
+    """
+    Run the test-writing agent against a Playwright MCP session.
+
+    Returns once the agent finishes or its budget is used up; the tools
+    record the scripts and plans it writes in test_data_store. Cancelling the
+    calling task stops the run and shuts down the MCP server.
+
+    Args:
+        instance_id: Generation instance ID
+        browser_data_dir: Browser data directory if a fresh MCP server is needed
+        logger: Generation logger
+        instructions: System prompt; must not vary between runs
+        tools: Output tools for the agent
+        agent_input: First user message, or a list of input items
+        usage: Tracker enforcing the run's budget
+        progress: Optional dict updated with live progress
+        max_turns: Maximum number of agent turns
+        prompt_cache_key: Key shared by all runs with the same instructions
+
+    Returns:
+        The agent's final message, if it finished on its own
+    """
+    from agents import Agent, Runner, ModelSettings, RunConfig
+
+    # Each MCP server runs its own browser, wait for a free session slot
+    async with mcp_sessions.slot(), mcp_server_pool.session(
+        instance_id, browser_data_dir
+    ) as browser_automation_mcp_server:
+        # Create agent
+        agent = Agent(
+            name="E2ETestGenerator",
+            instructions=instructions,
+            tools=tools,
+            model="gpt-5",
+            mcp_servers=[browser_automation_mcp_server],
+            model_settings=ModelSettings(
+                tool_choice="required", **prompt_cache_settings(prompt_cache_key)
+            ),
+        )
+
+        # Run agent
+        # Older page snapshots in the history are replaced with references
+        result = Runner.run_streamed(
+            agent,
+            max_turns=max_turns,
+            run_config=RunConfig(
+                call_model_input_filter=browser_automation_mcp_server.compressor.filter_history
+            ),
+            input=agent_input,
+        )
+
+        try:
+            try:
+                await asyncio.wait_for(
+                    print_result_stream(result.stream_events(), logger, progress, usage),
+                    timeout=usage.remaining_seconds,
+                )
+            except TimeoutError:
+                usage.stop_reason = "time"
+                logger.warning("[Budget] time budget used up, stopping now")
+                result.cancel()
+
+            if usage.stop_reason and usage.stop_reason != "time":
+                # Lets the pending tool calls (e.g. a test run) finish, but
+                # makes no further model requests
+                result.cancel(mode="after_turn")
+
+            # Consume stream
+            async for event in result.stream_events():
+                pass  # Just consume events, tools already capture data
+        except asyncio.CancelledError:
+            logger.info("Test generation cancelled")
+            result.cancel()
+            for handler in logger.handlers[:]:
+                handler.close()
+                logger.removeHandler(handler)
+            raise
+
+    compressor = browser_automation_mcp_server.compressor
+    logger.info(
+        f"Tool output sent to the model: {compressor.emitted_chars} of "
+        f"{compressor.original_chars} characters"
+    )
+    prompt_cache_stats.record(prompt_cache_key, usage)
+    logger.info(
+        f"Prompt cache: {usage.cached_input_tokens} of {usage.input_tokens} input tokens "
+        f"cached (hit rate {usage.snapshot()['cache_hit_rate']})"
+    )
+    return result.final_output if isinstance(result.final_output, str) else None
 
 
 async def generate_test_for_api(
-    test_case_description: str, target_url: str, instance_id: str = None
+    test_case_description: str,
+    target_url: str,
+    instance_id: str = None,
+    progress: dict | None = None,
+    budget: GenerationBudget | None = None,
+    tenant_id: str | None = None,
+    use_cache: bool = True,
 ) -> dict:
-    """Modified test generation that returns data for API response."""
-    from agents import Agent, Runner, ModelSettings
-    from agents.mcp import MCPServerStdio
+    """Modified test generation that returns data for API response.
+
+    If `progress` is given it is updated live with the turns used, tool calls
+    made, token usage and the last test execution result. Cancelling the
+    calling task stops the agent run and shuts down the MCP server.
+
+    The run is limited by `budget` (the server defaults if not given) and the
+    tenant's allowance. When a token or cost budget is used up the run stops
+    after the current turn; when time runs out it stops immediately. Either
+    way the last passing script, or else the last written one, is returned.
+
+    Passing results are cached by target URL and normalized description. With
+    `use_cache`, a cached script is re-run once and returned if it still
+    passes, skipping the agent run; otherwise the test is generated as usual.
+    """
 
     # Generate instance ID if not provided
     if not instance_id:
@@ -132,59 +366,180 @@ async def generate_test_for_api(
     logger.info(f"Target URL: {target_url}")
     logger.info(f"Test case: {test_case_description}")
 
+    usage = UsageTracker(budget or GenerationBudget.from_env(), tenant_id)
+
     # Create tool functions with data capture
     create_plan_fn, create_script_fn = create_test_data_capture(instance_id, logger)
     write_test_plan = create_plan_fn(workspace_dir)
     write_test_script = create_script_fn(workspace_dir)
 
-    # Setup MCP server
-    browser_automation_mcp_server = MCPServerStdio(
-        name=f"Playwright MCP {instance_id}",
-        params={
-            "command": "npx",
-            "args": [
-                "@playwright/mcp@latest",
-                "--isolated",
-                "--user-data-dir",
-                browser_data_dir,
-                # "--headless",
-            ],
-        },
-        client_session_timeout_seconds=15,
+    cache_key = generation_cache_key(target_url, test_case_description)
+    cached = generation_cache.get(cache_key) if use_cache else None
+    if cached is not None:
+        logger.info("Found cached generation result, re-checking it with one execution")
+        success, _, _ = await run_test_script(
+            instance_id, workspace_dir, cached["test_script"], logger
+        )
+        if success:
+            logger.info(f"Cached test still passes. Usage: {usage.snapshot()}")
+            for handler in logger.handlers[:]:
+                handler.close()
+                logger.removeHandler(handler)
+            return {
+                "instance_id": instance_id,
+                "workspace_dir": workspace_dir,
+                "test_plan": cached["plan"],
+                "test_script": test_data_store[instance_id]["test_script"],
+                "usage": usage.snapshot(),
+                "cached": True,
+            }
+
+        logger.info("Cached test no longer passes, generating a new one")
+        generation_cache.invalidate(cache_key)
+        test_data_store[instance_id].update(test_plan=None, test_script=None, last_test_result=None)
+
+    await run_agent(
+        instance_id,
+        browser_data_dir,
+        logger,
+        instructions=SYSTEM_PROMPT,
+        tools=[write_test_plan, write_test_script],
+        agent_input=(
+            f"Target URL: {target_url}\n\n"
+            f"Generate an E2E test for the following test case: {test_case_description}"
+        ),
+        usage=usage,
+        progress=progress,
+        max_turns=30,
+        prompt_cache_key=GENERATE_PROMPT_CACHE_KEY,
     )
 
-    TARGET_URL_PROMPT = f"Target URL: {target_url}\n"
+    # Get captured data
+    captured_data = test_data_store.get(instance_id, {})
 
-    async with browser_automation_mcp_server:
-        # Create agent
-        agent = Agent(
-            name="E2ETestGenerator",
-            instructions=TARGET_URL_PROMPT + SYSTEM_PROMPT,
-            tools=[write_test_plan, write_test_script],
-            model="gpt-5",
-            mcp_servers=[browser_automation_mcp_server],
-            model_settings=ModelSettings(tool_choice="required"),
-        )
+    logger.info(f"Test generation completed. Usage: {usage.snapshot()}")
+    if progress is not None:
+        progress["usage"] = usage.snapshot()
 
-        # Run agent
-        result = Runner.run_streamed(
-            agent,
-            max_turns=30,
-            input=f"Generate an E2E test for the following test case: {test_case_description}",
+    # Cleanup logger handlers
+    for handler in logger.handlers[:]:
+        handler.close()
+        logger.removeHandler(handler)
+
+    if captured_data.get("passing_test_script"):
+        generation_cache.put(
+            cache_key,
+            {
+                "test_script": captured_data["passing_test_script"],
+                "plan": captured_data.get("passing_test_plan") or captured_data.get("test_plan"),
+            },
         )
 
-        await print_result_stream(result.stream_events(), logger)
+    return {
+        "instance_id": instance_id,
+        "workspace_dir": workspace_dir,
+        "test_plan": captured_data.get("passing_test_plan") or captured_data.get("test_plan"),
+        "test_script": captured_data.get("passing_test_script") or captured_data.get("test_script"),
+        "usage": usage.snapshot(),
+        "cached": False,
+    }
+
 
-        # Consume stream
-        async for event in result.stream_events():
-            pass  # Just consume events, tools already capture data
+async def repair_test_for_api(
+    test_script: str,
+    test_plan: list[str] | None,
+    target_url: str,
+    failure: dict,
+    screenshot: tuple[bytes, str] | None = None,
+    instance_id: str = None,
+    progress: dict | None = None,
+    budget: GenerationBudget | None = None,
+    tenant_id: str | None = None,
+) -> dict:
+    """Patch a failing test script, starting from the point of failure.
+
+    The agent is seeded with the current script and plan, the failing step,
+    the execution output and the failure screenshot, and asked to replay the
+    working steps and explore only from the failing one. Budgets, progress and
+    cancellation work as for generate_test_for_api.
+
+    Args:
+        test_script: The stored test script
+        test_plan: The stored test plan
+        target_url: URL the test starts from
+        failure: Result of the failing execute_playwright_test run
+        screenshot: Optional (image bytes, content type) of the failure screenshot
+
+    Returns:
+        dict with the patched test_plan and test_script if the repaired test
+        passes (the stored ones otherwise), repaired, summary and usage
+    """
+    if not instance_id:
+        instance_id = str(uuid.uuid4())[:8]
+
+    workspace_dir, browser_data_dir = create_workspace(instance_id)
+    logger = setup_logger(instance_id, workspace_dir)
+    logger.info(f"Starting test repair for instance {instance_id}")
+    logger.info(f"Target URL: {target_url}")
+    logger.info(
+        f"Failing step {failure.get('failing_step_index')}: {failure.get('failing_step')}"
+    )
+
+    usage = UsageTracker(budget or GenerationBudget.from_env(), tenant_id)
+
+    create_plan_fn, create_script_fn = create_test_data_capture(instance_id, logger)
+
+    script_body = add_step_logging_to_test_script(test_script)[len(successful_step_definition):]
+    plan_text = "\n".join(f"{index}. {step}" for index, step in enumerate(test_plan or []))
+    output = failure.get("output") or ""
+    failing_step = (
+        f"{failure['failing_step_index']}. {failure.get('failing_step')}"
+        if failure.get("failing_step_index") is not None
+        else "unknown (the failure happened outside the planned steps)"
+    )
+    content = [
+        {
+            "type": "input_text",
+            "text": (
+                f"Target URL: {target_url}\n\n"
+                "Repair the following failing test.\n\n"
+                f"Test plan:\n{plan_text}\n\n"
+                f"Failing step: {failing_step}\n\n"
+                f"Test output:\n```\n{output[-REPAIR_OUTPUT_MAX_CHARS:]}\n```\n\n"
+                f"Current test script:\n```js\n{script_body}\n```"
+            ),
+        }
+    ]
+    if screenshot is not None:
+        data, content_type = screenshot
+        content.append(
+            {
+                "type": "input_image",
+                "image_url": f"data:{content_type};base64,{base64.b64encode(data).decode()}",
+                "detail": "auto",
+            }
+        )
+
+    summary = await run_agent(
+        instance_id,
+        browser_data_dir,
+        logger,
+        instructions=REPAIR_PROMPT,
+        tools=[create_plan_fn(workspace_dir), create_script_fn(workspace_dir)],
+        agent_input=[{"role": "user", "content": content}],
+        usage=usage,
+        progress=progress,
+        max_turns=REPAIR_MAX_TURNS,
+        prompt_cache_key=REPAIR_PROMPT_CACHE_KEY,
+    )
 
-    # Get captured data
     captured_data = test_data_store.get(instance_id, {})
+    repaired = bool(captured_data.get("passing_test_script"))
 
-    logger.info("Test generation completed")
+    logger.info(f"Test repair completed. Repaired: {repaired}. Usage: {usage.snapshot()}")
+    if progress is not None:
+        progress["usage"] = usage.snapshot()
 
-    # Cleanup logger handlers
     for handler in logger.handlers[:]:
         handler.close()
         logger.removeHandler(handler)
@@ -192,6 +547,9 @@ async def generate_test_for_api(
     return {
         "instance_id": instance_id,
         "workspace_dir": workspace_dir,
-        "test_plan": captured_data.get("test_plan"),
-        "test_script": captured_data.get("test_script"),
+        "test_plan": captured_data.get("passing_test_plan") if repaired else test_plan,
+        "test_script": captured_data.get("passing_test_script") if repaired else test_script,
+        "repaired": repaired,
+        "summary": summary,
+        "usage": usage.snapshot(),
     }
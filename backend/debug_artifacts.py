@@ -0,0 +1,160 @@
+"""
+Local Store for Playwright Traces and Videos
+
+Executions run with debug artifacts leave trace.zip and .webm files in the
+workspace's test-results/. They are moved here, under one directory per
+execution, and kept locally until the retention period or size budget runs
+out. Nothing is uploaded until someone asks for an artifact through the API.
+"""
+
+import os
+import re
+import glob
+import shutil
+import logging
+import tempfile
+import time
+
+logger = logging.getLogger("debug_artifacts")
+
+ARTIFACT_PATTERNS = ["trace.zip", "*.webm"]
+# Execution IDs are the first 8 hex digits of a UUID
+ARTIFACT_ID_PATTERN = re.compile(r"[0-9a-f]{8}")
+ARTIFACT_NAME_PATTERN = re.compile(r"[\w-][\w.-]*\.(?:zip|webm)")
+
+
+class DebugArtifactStore:
+    """Directory of per-execution debug artifacts with retention."""
+
+    def __init__(self, root: str, retention_seconds: float, max_bytes: int, bucket: str):
+        self.root = root
+        self.retention_seconds = retention_seconds
+        self.max_bytes = max_bytes
+        self.bucket = bucket
+
+    def collect(self, artifact_id: str, testjs_dir: str) -> list[str]:
+        """
+        Move the traces and videos of a run into the store.
+
+        Args:
+            artifact_id: ID to file the artifacts under (the execution ID)
+            testjs_dir: Workspace whose test-results/ holds the artifacts
+
+        Returns:
+            Names of the stored artifacts, empty if the run produced none
+        """
+        results_dir = os.path.join(testjs_dir, "test-results")
+        target_dir = os.path.join(self.root, artifact_id)
+        names = []
+
+        for pattern in ARTIFACT_PATTERNS:
+            for path in sorted(glob.glob(os.path.join(results_dir, "**", pattern), recursive=True)):
+                # test-results/<test>[-retry1]/trace.zip -> <test>[-retry1]-trace.zip
+                attempt = os.path.basename(os.path.dirname(path))
+                name = f"{attempt}-{os.path.basename(path)}"
+                os.makedirs(target_dir, exist_ok=True)
+                shutil.move(path, os.path.join(target_dir, name))
+                names.append(name)
+
+        if names:
+            logger.info(f"Stored {len(names)} debug artifacts for {artifact_id}")
+            self.prune()
+        return names
+
+    def _resolve(self, artifact_id: str, *name: str) -> str | None:
+        """Path under the store for a valid ID (and name), None for anything else."""
+        if not ARTIFACT_ID_PATTERN.fullmatch(artifact_id):
+            return None
+        if name and not ARTIFACT_NAME_PATTERN.fullmatch(name[0]):
+            return None
+        root = os.path.realpath(self.root)
+        path = os.path.realpath(os.path.join(root, artifact_id, *name))
+        return path if path.startswith(root + os.sep) else None
+
+    def path(self, artifact_id: str, name: str) -> str | None:
+        """Local path of a stored artifact, or None if it does not exist."""
+        path = self._resolve(artifact_id, name)
+        return path if path and os.path.isfile(path) else None
+
+    def list_artifacts(self, artifact_id: str) -> list[dict]:
+        """Names and sizes of the artifacts stored for an execution."""
+        directory = self._resolve(artifact_id)
+        if directory is None or not os.path.isdir(directory):
+            return []
+        return [
+            {"name": name, "size_bytes": os.path.getsize(os.path.join(directory, name))}
+            for name in sorted(os.listdir(directory))
+        ]
+
+    def prune(self):
+        """Remove expired executions, then the oldest ones while over the size budget."""
+        if not os.path.isdir(self.root):
+            return
+
+        entries = []
+        for artifact_id in os.listdir(self.root):
+            directory = os.path.join(self.root, artifact_id)
+            files = glob.glob(os.path.join(directory, "*"))
+            size = sum(os.path.getsize(path) for path in files)
+            entries.append((os.path.getmtime(directory), size, directory))
+
+        entries.sort()
+        total = sum(size for _, size, _ in entries)
+        cutoff = time.time() - self.retention_seconds
+        for modified, size, directory in entries:
+            if modified >= cutoff and total <= self.max_bytes:
+                break
+            shutil.rmtree(directory, ignore_errors=True)
+            total -= size
+
+    def upload(self, artifact_id: str, name: str) -> str:
+        """
+        Upload an artifact to storage if needed and return a signed URL for it.
+
+        Args:
+            artifact_id: The execution ID the artifact is stored under
+            name: Artifact file name
+
+        Returns:
+            Signed download URL, valid for one hour
+
+        Raises:
+            FileNotFoundError: If the artifact is not (or no longer) stored
+        """
+        from supabase_client import get_supabase_client, with_retry
+
+        path = self.path(artifact_id, name)
+        if path is None:
+            raise FileNotFoundError(f"Artifact {artifact_id}/{name} not found")
+
+        object_name = f"{artifact_id}/{name}"
+        content_type = "application/zip" if name.endswith(".zip") else "video/webm"
+        bucket = get_supabase_client().storage.from_(self.bucket)
+
+        def upload_file():
+            # Reopened on every attempt so a retry streams the file from the start
+            with open(path, "rb") as f:
+                try:
+                    bucket.upload(
+                        path=object_name,
+                        file=f,
+                        file_options={"content-type": content_type},
+                    )
+                except Exception as e:
+                    # Uploaded by an earlier request
+                    if str(getattr(e, "status", "")) != "409":
+                        raise
+
+        with_retry(upload_file)
+
+        signed = with_retry(bucket.create_signed_url, object_name, 3600)
+        return signed["signedURL"]
+
+
+debug_artifact_store = DebugArtifactStore(
+    root=os.getenv("DEBUG_ARTIFACTS_DIR")
+    or os.path.join(tempfile.gettempdir(), "playwright_debug_artifacts"),
+    retention_seconds=float(os.getenv("DEBUG_ARTIFACT_RETENTION_HOURS", "24")) * 3600,
+    max_bytes=int(os.getenv("DEBUG_ARTIFACT_MAX_MB", "2048")) * 1024 * 1024,
+    bucket=os.getenv("DEBUG_ARTIFACT_BUCKET", "Artifacts"),
+)
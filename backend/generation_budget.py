@@ -0,0 +1,259 @@
+"""
+Token, Cost and Time Budgets for Test Generation
+
+Each generation run gets a budget for input tokens, output tokens, estimated
+cost and wall-clock time. Server-wide defaults come from the environment and
+a request may only tighten them. Usage is tracked from the model responses as
+they stream in; once a budget is used up the run stops after the current turn
+and returns the best script it has so far.
+
+Tenants additionally share a token and cost allowance over a rolling window.
+Usage is charged to the tenant as it happens, so concurrent runs of the same
+tenant count against one allowance.
+
+The share of input tokens served from the prompt cache is tracked per run and,
+across runs, per prompt.
+"""
+
+import os
+import time
+import threading
+from collections import deque
+
+
+def _env_number(name: str) -> float | None:
+    value = os.getenv(name)
+    return float(value) if value else None
+
+
+class BudgetExceededError(Exception):
+    """Raised when a tenant has no allowance left for a new generation run."""
+
+    def __init__(self, tenant_id: str, retry_after: int):
+        super().__init__(f"Generation budget for tenant {tenant_id} is used up, retry in {retry_after}s")
+        self.tenant_id = tenant_id
+        self.retry_after = retry_after
+
+
+class GenerationBudget:
+    """Limits for one generation run; None means unlimited."""
+
+    def __init__(
+        self,
+        max_input_tokens: float | None = None,
+        max_output_tokens: float | None = None,
+        max_cost_usd: float | None = None,
+        max_seconds: float | None = None,
+    ):
+        self.max_input_tokens = max_input_tokens
+        self.max_output_tokens = max_output_tokens
+        self.max_cost_usd = max_cost_usd
+        self.max_seconds = max_seconds
+
+    @classmethod
+    def from_env(cls) -> "GenerationBudget":
+        """Server-wide default budget."""
+        return cls(
+            max_input_tokens=_env_number("GENERATION_MAX_INPUT_TOKENS"),
+            max_output_tokens=_env_number("GENERATION_MAX_OUTPUT_TOKENS"),
+            max_cost_usd=_env_number("GENERATION_MAX_COST_USD"),
+            max_seconds=_env_number("GENERATION_MAX_SECONDS"),
+        )
+
+    def tightened(self, **limits: float | None) -> "GenerationBudget":
+        """
+        Combine with per-request limits, keeping the stricter of each.
+
+        Args:
+            **limits: Limits by attribute name; None leaves the default in place
+        """
+        budget = GenerationBudget(**vars(self))
+        for name, limit in limits.items():
+            current = getattr(budget, name)
+            if limit is not None and (current is None or limit < current):
+                setattr(budget, name, limit)
+        return budget
+
+
+class TenantLedger:
+    """Token and cost usage of each tenant over a rolling window."""
+
+    def __init__(self, max_tokens: float | None, max_cost_usd: float | None, window_seconds: float):
+        self.max_tokens = max_tokens
+        self.max_cost_usd = max_cost_usd
+        self.window_seconds = window_seconds
+        self._entries: dict[str, deque[tuple[float, int, float]]] = {}
+        # Charged from the generation task and read by request handlers
+        self._lock = threading.Lock()
+
+    def _expire(self, tenant_id: str) -> deque:
+        entries = self._entries.setdefault(tenant_id, deque())
+        cutoff = time.time() - self.window_seconds
+        while entries and entries[0][0] < cutoff:
+            entries.popleft()
+        return entries
+
+    def usage(self, tenant_id: str) -> tuple[int, float]:
+        """Tokens and cost charged to a tenant within the window."""
+        with self._lock:
+            entries = self._expire(tenant_id)
+            return sum(e[1] for e in entries), sum(e[2] for e in entries)
+
+    def charge(self, tenant_id: str, tokens: int, cost_usd: float):
+        with self._lock:
+            self._expire(tenant_id).append((time.time(), tokens, cost_usd))
+
+    def exhausted(self, tenant_id: str) -> bool:
+        tokens, cost = self.usage(tenant_id)
+        return (self.max_tokens is not None and tokens >= self.max_tokens) or (
+            self.max_cost_usd is not None and cost >= self.max_cost_usd
+        )
+
+    def check(self, tenant_id: str):
+        """
+        Reject a new run when the tenant's allowance is used up.
+
+        Raises:
+            BudgetExceededError: If the tenant is over its token or cost allowance
+        """
+        if not self.exhausted(tenant_id):
+            return
+        with self._lock:
+            entries = self._expire(tenant_id)
+            oldest = entries[0][0] if entries else time.time()
+        retry_after = max(1, int(oldest + self.window_seconds - time.time()))
+        raise BudgetExceededError(tenant_id, retry_after)
+
+
+def cache_hit_rate(input_tokens: int, cached_input_tokens: int) -> float | None:
+    """Share of input tokens served from the prompt cache, None before any input."""
+    return round(cached_input_tokens / input_tokens, 4) if input_tokens else None
+
+
+class PromptCacheStats:
+    """Prompt cache hits across all runs, by prompt cache key."""
+
+    def __init__(self):
+        self._totals: dict[str, dict[str, int]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, prompt_cache_key: str, tracker: "UsageTracker"):
+        """Add the usage of a finished run to its prompt's totals."""
+        with self._lock:
+            totals = self._totals.setdefault(
+                prompt_cache_key,
+                {"runs": 0, "requests": 0, "input_tokens": 0, "cached_input_tokens": 0},
+            )
+            totals["runs"] += 1
+            totals["requests"] += tracker.requests
+            totals["input_tokens"] += tracker.input_tokens
+            totals["cached_input_tokens"] += tracker.cached_input_tokens
+
+    def metrics(self) -> dict:
+        with self._lock:
+            return {
+                key: {
+                    **totals,
+                    "hit_rate": cache_hit_rate(totals["input_tokens"], totals["cached_input_tokens"]),
+                }
+                for key, totals in self._totals.items()
+            }
+
+
+class UsageTracker:
+    """Live usage of one generation run against its budget."""
+
+    def __init__(self, budget: GenerationBudget, tenant_id: str | None = None):
+        self.budget = budget
+        self.tenant_id = tenant_id
+        self.input_tokens = 0
+        self.cached_input_tokens = 0
+        self.output_tokens = 0
+        self.requests = 0
+        self.cost_usd = 0.0
+        self.stop_reason: str | None = None
+        self.started = time.monotonic()
+
+    @property
+    def elapsed_seconds(self) -> float:
+        return time.monotonic() - self.started
+
+    @property
+    def remaining_seconds(self) -> float | None:
+        if self.budget.max_seconds is None:
+            return None
+        return max(0.0, self.budget.max_seconds - self.elapsed_seconds)
+
+    def add(self, usage) -> str | None:
+        """
+        Record the usage of one model response.
+
+        Args:
+            usage: Usage reported on the response.completed event
+
+        Returns:
+            The exceeded budget ("input_tokens", "output_tokens", "cost" or
+            "tenant"), or None while within budget
+        """
+        if usage is None:
+            return None
+
+        details = getattr(usage, "input_tokens_details", None)
+        cached = getattr(details, "cached_tokens", 0) or 0
+        cost = (
+            (usage.input_tokens - cached) * INPUT_COST_PER_MTOK
+            + cached * CACHED_INPUT_COST_PER_MTOK
+            + usage.output_tokens * OUTPUT_COST_PER_MTOK
+        ) / 1_000_000
+
+        self.requests += 1
+        self.input_tokens += usage.input_tokens
+        self.cached_input_tokens += cached
+        self.output_tokens += usage.output_tokens
+        self.cost_usd += cost
+        if self.tenant_id:
+            tenant_ledger.charge(self.tenant_id, usage.input_tokens + usage.output_tokens, cost)
+
+        return self.exceeded()
+
+    def exceeded(self) -> str | None:
+        """Name of the first budget that is used up, remembered as the stop reason."""
+        budget = self.budget
+        if self.stop_reason is None:
+            if budget.max_input_tokens is not None and self.input_tokens >= budget.max_input_tokens:
+                self.stop_reason = "input_tokens"
+            elif budget.max_output_tokens is not None and self.output_tokens >= budget.max_output_tokens:
+                self.stop_reason = "output_tokens"
+            elif budget.max_cost_usd is not None and self.cost_usd >= budget.max_cost_usd:
+                self.stop_reason = "cost"
+            elif self.tenant_id and tenant_ledger.exhausted(self.tenant_id):
+                self.stop_reason = "tenant"
+        return self.stop_reason
+
+    def snapshot(self) -> dict:
+        """Usage so far, shaped like GenerationUsage in the API."""
+        return {
+            "input_tokens": self.input_tokens,
+            "cached_input_tokens": self.cached_input_tokens,
+            "cache_hit_rate": cache_hit_rate(self.input_tokens, self.cached_input_tokens),
+            "output_tokens": self.output_tokens,
+            "total_tokens": self.input_tokens + self.output_tokens,
+            "requests": self.requests,
+            "cost_usd": round(self.cost_usd, 6),
+            "duration_seconds": round(self.elapsed_seconds, 3),
+            "stop_reason": self.stop_reason,
+        }
+
+
+# Model prices in USD per million tokens, used for cost estimates
+INPUT_COST_PER_MTOK = float(os.getenv("GENERATION_INPUT_COST_PER_MTOK", "1.25"))
+CACHED_INPUT_COST_PER_MTOK = float(os.getenv("GENERATION_CACHED_INPUT_COST_PER_MTOK", "0.125"))
+OUTPUT_COST_PER_MTOK = float(os.getenv("GENERATION_OUTPUT_COST_PER_MTOK", "10"))
+
+prompt_cache_stats = PromptCacheStats()
+
+tenant_ledger = TenantLedger(
+    max_tokens=_env_number("GENERATION_TENANT_MAX_TOKENS"),
+    max_cost_usd=_env_number("GENERATION_TENANT_MAX_COST_USD"),
+    window_seconds=float(os.getenv("GENERATION_TENANT_WINDOW_HOURS", "24")) * 3600,
+)
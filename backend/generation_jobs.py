@@ -0,0 +1,172 @@
+"""
+Background Test Generation Jobs
+
+In-process job queue for test generation. Submitting returns a job ID
+immediately; a fixed number of workers run the agent so heavy load queues up
+instead of exhausting the server. Jobs report live progress and can be
+cancelled, which stops the agent run and tears down its MCP server.
+"""
+
+import os
+import asyncio
+import logging
+import time
+import uuid
+
+from api_client_test_writer import generate_test_for_api, test_data_store
+from generation_budget import GenerationBudget
+
+logger = logging.getLogger("generation_jobs")
+
+# Finished jobs are kept this long for status polling
+JOB_RETENTION_SECONDS = 3600
+
+
+class GenerationJob:
+    """State of a single test generation job."""
+
+    def __init__(
+        self,
+        target_url: str,
+        test_case_description: str,
+        budget: GenerationBudget | None = None,
+        tenant_id: str | None = None,
+        use_cache: bool = True,
+    ):
+        self.job_id = str(uuid.uuid4())
+        self.instance_id = self.job_id[:8]
+        self.target_url = target_url
+        self.test_case_description = test_case_description
+        self.budget = budget
+        self.tenant_id = tenant_id
+        self.use_cache = use_cache
+        self.status = "queued"
+        self.progress = {"turns": 0, "tool_calls": 0}
+        self.result: dict | None = None
+        self.error: str | None = None
+        self.created_at = time.time()
+        self.finished_at: float | None = None
+        self.task: asyncio.Task | None = None
+        self.cancel_requested = False
+
+    @property
+    def last_test_result(self) -> dict | None:
+        if self.result is not None:
+            return self.result.get("last_test_result")
+        return test_data_store.get(self.instance_id, {}).get("last_test_result")
+
+    def finish(self, status: str, error: str | None = None):
+        self.status = status
+        self.error = error
+        self.finished_at = time.time()
+
+
+class GenerationJobManager:
+    """Queue and worker pool for generation jobs."""
+
+    def __init__(self, workers: int):
+        self.workers = workers
+        self.jobs: dict[str, GenerationJob] = {}
+        self._queue: asyncio.Queue[GenerationJob] = asyncio.Queue()
+        self._worker_tasks: list[asyncio.Task] = []
+
+    def start(self):
+        """Start the worker tasks."""
+        if self._worker_tasks:
+            return
+        self._worker_tasks = [
+            asyncio.create_task(self._worker()) for _ in range(self.workers)
+        ]
+
+    async def stop(self):
+        """Cancel running jobs and stop the workers."""
+        for task in self._worker_tasks:
+            task.cancel()
+        await asyncio.gather(*self._worker_tasks, return_exceptions=True)
+        self._worker_tasks = []
+
+    def submit(
+        self,
+        target_url: str,
+        test_case_description: str,
+        budget: GenerationBudget | None = None,
+        tenant_id: str | None = None,
+        use_cache: bool = True,
+    ) -> GenerationJob:
+        """Queue a generation job and return it."""
+        self._expire_finished()
+        job = GenerationJob(target_url, test_case_description, budget, tenant_id, use_cache)
+        self.jobs[job.job_id] = job
+        self._queue.put_nowait(job)
+        logger.info(f"Queued generation job {job.job_id}")
+        return job
+
+    def get(self, job_id: str) -> GenerationJob | None:
+        return self.jobs.get(job_id)
+
+    @property
+    def queue_depth(self) -> int:
+        return self._queue.qsize()
+
+    def cancel(self, job_id: str) -> GenerationJob | None:
+        """
+        Cancel a queued or running job.
+
+        Returns:
+            The job, or None if no job has that ID
+        """
+        job = self.jobs.get(job_id)
+        if job is None:
+            return None
+
+        if job.status == "queued":
+            job.finish("cancelled")
+        elif job.status == "running" and job.task is not None:
+            job.cancel_requested = True
+            job.task.cancel()
+        return job
+
+    def _expire_finished(self):
+        cutoff = time.time() - JOB_RETENTION_SECONDS
+        for job_id, job in list(self.jobs.items()):
+            if job.finished_at is not None and job.finished_at < cutoff:
+                del self.jobs[job_id]
+
+    async def _worker(self):
+        while True:
+            job = await self._queue.get()
+            if job.status != "queued":
+                continue
+
+            job.status = "running"
+            job.task = asyncio.create_task(
+                generate_test_for_api(
+                    test_case_description=job.test_case_description,
+                    target_url=job.target_url,
+                    instance_id=job.instance_id,
+                    progress=job.progress,
+                    budget=job.budget,
+                    tenant_id=job.tenant_id,
+                    use_cache=job.use_cache,
+                )
+            )
+
+            try:
+                job.result = await job.task
+                job.result["last_test_result"] = test_data_store.get(
+                    job.instance_id, {}
+                ).get("last_test_result")
+                job.finish("succeeded")
+            except asyncio.CancelledError:
+                job.finish("cancelled")
+                # Shutdown cancels the worker itself, not only the job
+                if not job.cancel_requested:
+                    raise
+            except Exception as e:
+                logger.error(f"Generation job {job.job_id} failed: {e}", exc_info=True)
+                job.finish("failed", str(e))
+            finally:
+                test_data_store.pop(job.instance_id, None)
+
+
+job_manager = GenerationJobManager(workers=int(os.getenv("GENERATION_WORKERS", "2")))
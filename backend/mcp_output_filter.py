@@ -0,0 +1,215 @@
+"""
+Trimming of Playwright MCP Tool Outputs
+
+Most Playwright MCP tools return a full accessibility snapshot of the page,
+and every one of them stays in the conversation the agent resends each turn.
+The filtered server sits between MCPServerStdio and the agent:
+
+- A snapshot is compared with the last full ("base") snapshot. When most of
+  it is unchanged, only the changed regions are sent and the rest are marked
+  as unchanged since the base. Otherwise it is sent in full and becomes the
+  new base.
+- Snapshots and other outputs over the size limits are truncated.
+- Before each model call, snapshots older than the current base are replaced
+  in the history with a short reference. History only changes when a new base
+  is taken, so the request prefix stays stable in between.
+
+The SDK stores MCP tool outputs in the history as JSON (a content item, or a
+list of them), so references are written into the "text" fields of the
+decoded items.
+"""
+
+import re
+import json
+import logging
+
+from agents.mcp import MCPServerStdio
+from agents.run import CallModelData, ModelInputData
+
+logger = logging.getLogger("mcp_output_filter")
+
+SNAPSHOT_PATTERN = re.compile(r"- Page Snapshot[^\n]*\n```yaml\n(.*?)\n```", re.S)
+SNAPSHOT_ID_PATTERN = re.compile(r"- Page Snapshot #(\d+)[^\n]*\n```yaml\n.*?\n```", re.S)
+
+# Send a delta only if at least this share of the snapshot is unchanged
+MIN_UNCHANGED_SHARE = 0.5
+# Split snapshots at the shallowest depth with at least this many nodes
+MIN_REGIONS = 4
+
+
+def _indent(line: str) -> int:
+    return len(line) - len(line.lstrip(" "))
+
+
+def split_regions(snapshot: str) -> list[str]:
+    """
+    Split a YAML accessibility snapshot into top-level regions.
+
+    The split depth is the shallowest indentation level with at least
+    MIN_REGIONS nodes, so a single wrapper element does not make the whole
+    page one region.
+    """
+    lines = snapshot.split("\n")
+    depths = sorted({_indent(line) for line in lines if line.strip()})
+    split_indent = depths[-1] if depths else 0
+    for depth in depths:
+        if sum(1 for line in lines if _indent(line) == depth and line.strip()) >= MIN_REGIONS:
+            split_indent = depth
+            break
+
+    regions: list[list[str]] = []
+    for line in lines:
+        if not regions or (line.strip() and _indent(line) <= split_indent):
+            regions.append([])
+        regions[-1].append(line)
+    return ["\n".join(region) for region in regions]
+
+
+def truncate(text: str, max_chars: int, hint: str) -> str:
+    """Cut text to max_chars on a line boundary, noting how much was dropped."""
+    if len(text) <= max_chars:
+        return text
+    cut = text.rfind("\n", 0, max_chars)
+    cut = cut if cut > 0 else max_chars
+    dropped = text[cut:].count("\n") + 1
+    return f"{text[:cut]}\n[... {dropped} more lines truncated. {hint}]"
+
+
+class SnapshotCompressor:
+    """Per-session state for turning snapshots into deltas against a base."""
+
+    def __init__(self, max_snapshot_chars: int, max_output_chars: int):
+        self.max_snapshot_chars = max_snapshot_chars
+        self.max_output_chars = max_output_chars
+        self.count = 0
+        self.base_id: int | None = None
+        self._base_regions: set[str] = set()
+        self.original_chars = 0
+        self.emitted_chars = 0
+
+    def compress(self, text: str) -> str:
+        """
+        Rewrite one tool output: number its snapshots, send deltas where
+        possible and truncate oversized content.
+        """
+        compressed = SNAPSHOT_PATTERN.sub(lambda match: self._compress_snapshot(match.group(1)), text)
+        compressed = truncate(
+            compressed,
+            self.max_output_chars,
+            "Narrow the request to see the rest.",
+        )
+        self.original_chars += len(text)
+        self.emitted_chars += len(compressed)
+        return compressed
+
+    def _compress_snapshot(self, snapshot: str) -> str:
+        self.count += 1
+        snapshot_id = self.count
+        regions = split_regions(snapshot)
+
+        if self.base_id is not None:
+            unchanged = [region in self._base_regions for region in regions]
+            unchanged_chars = sum(len(r) for r, same in zip(regions, unchanged) if same)
+            if unchanged_chars >= MIN_UNCHANGED_SHARE * len(snapshot):
+                if all(unchanged):
+                    return f"- Page Snapshot #{snapshot_id}: unchanged since snapshot #{self.base_id}"
+                lines = []
+                for region, same in zip(regions, unchanged):
+                    if same:
+                        first_line = region.split("\n", 1)[0]
+                        lines.append(f"{first_line} [unchanged, {region.count(chr(10)) + 1} lines]")
+                    else:
+                        lines.append(region)
+                return (
+                    f"- Page Snapshot #{snapshot_id} (regions marked unchanged are as in "
+                    f"snapshot #{self.base_id}):\n```yaml\n" + "\n".join(lines) + "\n```"
+                )
+
+        # New base; only what the model actually sees counts as unchanged later
+        snapshot = truncate(
+            snapshot,
+            self.max_snapshot_chars,
+            "Scroll or use a more specific tool to see the rest of the page.",
+        )
+        self.base_id = snapshot_id
+        self._base_regions = set(split_regions(snapshot))
+        return f"- Page Snapshot #{snapshot_id}:\n```yaml\n{snapshot}\n```"
+
+    def _elide(self, text: str) -> str:
+        def replace(match: re.Match) -> str:
+            snapshot_id = int(match.group(1))
+            if snapshot_id >= self.base_id:
+                return match.group(0)
+            return f"- Page Snapshot #{snapshot_id}: omitted, superseded by snapshot #{self.base_id}"
+
+        return SNAPSHOT_ID_PATTERN.sub(replace, text)
+
+    def _elide_output(self, output: str) -> str:
+        """Elide old snapshots in a stored tool output, JSON-encoded or raw."""
+        if "- Page Snapshot #" not in output:
+            return output
+        try:
+            parsed = json.loads(output)
+        except ValueError:
+            return self._elide(output)
+        if not isinstance(parsed, (dict, list)):
+            return self._elide(output)
+
+        changed = False
+        for content in parsed if isinstance(parsed, list) else [parsed]:
+            if isinstance(content, dict) and isinstance(content.get("text"), str):
+                elided = self._elide(content["text"])
+                if elided != content["text"]:
+                    content["text"] = elided
+                    changed = True
+        # Unchanged outputs keep their exact bytes, so the prefix stays cached
+        return json.dumps(parsed) if changed else output
+
+    def filter_history(self, data: CallModelData) -> ModelInputData:
+        """
+        RunConfig.call_model_input_filter replacing snapshots older than the
+        current base with references.
+        """
+        if self.base_id is None:
+            return data.model_data
+
+        items = []
+        for item in data.model_data.input:
+            if isinstance(item, dict) and item.get("type") == "function_call_output":
+                output = item.get("output")
+                if isinstance(output, str) and "- Page Snapshot #" in output:
+                    item = {**item, "output": self._elide_output(output)}
+                elif isinstance(output, dict) and isinstance(output.get("text"), str):
+                    item = {**item, "output": {**output, "text": self._elide_output(output["text"])}}
+                elif isinstance(output, list):
+                    item = {
+                        **item,
+                        "output": [
+                            {**part, "text": self._elide_output(part["text"])}
+                            if isinstance(part, dict) and isinstance(part.get("text"), str)
+                            else part
+                            for part in output
+                        ],
+                    }
+            items.append(item)
+
+        return ModelInputData(input=items, instructions=data.model_data.instructions)
+
+
+class FilteredMCPServerStdio(MCPServerStdio):
+    """MCPServerStdio whose text tool outputs go through a SnapshotCompressor."""
+
+    def __init__(self, *args, max_snapshot_chars: int, max_output_chars: int, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.compressor = SnapshotCompressor(max_snapshot_chars, max_output_chars)
+
+    async def call_tool(self, tool_name, arguments):
+        result = await super().call_tool(tool_name, arguments)
+        for content in result.content:
+            if getattr(content, "type", None) == "text":
+                content.text = self.compressor.compress(content.text)
+        logger.debug(
+            f"{self.name}: {self.compressor.emitted_chars}/{self.compressor.original_chars} "
+            "tool output characters sent so far"
+        )
+        return result
@@ -0,0 +1,166 @@
+"""
+Pinned Playwright MCP Server Pool
+
+Test generation talks to the browser through the Playwright MCP server. The
+server version is pinned in playwright_mcp/package.json and installed once
+into the shared dependency cache, so sessions start the local cli.js with
+node instead of resolving `@playwright/mcp@latest` through npx every time.
+
+A few servers are also started ahead of time. Each one serves a single
+generation session and is then shut down, so no browser state carries over;
+a replacement is started in the background as soon as one is checked out.
+"""
+
+import os
+import json
+import asyncio
+import shutil
+import logging
+import tempfile
+import uuid
+from contextlib import asynccontextmanager
+
+from utils import ensure_dependency_cache
+
+PLAYWRIGHT_MCP_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "playwright_mcp")
+MCP_PACKAGE = "@playwright/mcp"
+
+# Size limits for snapshots and whole tool outputs sent to the model
+MCP_SNAPSHOT_MAX_CHARS = int(os.getenv("MCP_SNAPSHOT_MAX_CHARS", "30000"))
+MCP_OUTPUT_MAX_CHARS = int(os.getenv("MCP_OUTPUT_MAX_CHARS", "40000"))
+
+logger = logging.getLogger("mcp_server")
+
+
+def get_pinned_mcp_version() -> str:
+    """Read the pinned @playwright/mcp version from playwright_mcp/package.json."""
+    with open(os.path.join(PLAYWRIGHT_MCP_DIR, "package.json")) as f:
+        return json.load(f)["dependencies"][MCP_PACKAGE]
+
+
+class MCPServerPool:
+    """Pre-started, single-use Playwright MCP servers."""
+
+    def __init__(self, size: int):
+        self.size = size
+        self._command: list[str] | None = None
+        self._resolve_lock = asyncio.Lock()
+        self._ready: asyncio.Queue = asyncio.Queue()
+        self._holders: set[asyncio.Task] = set()
+        self._stopping = False
+
+    async def resolve_command(self) -> list[str]:
+        """
+        Resolve how to launch the pinned MCP server, once per process.
+
+        Returns:
+            Command prefix running the locally installed cli.js, or npx with
+            the pinned version if the local install is not available
+        """
+        async with self._resolve_lock:
+            if self._command is None:
+                node_modules = await ensure_dependency_cache(logger, PLAYWRIGHT_MCP_DIR)
+                cli = os.path.join(node_modules or "", MCP_PACKAGE, "cli.js")
+                if node_modules and os.path.exists(cli):
+                    self._command = ["node", cli]
+                else:
+                    version = get_pinned_mcp_version()
+                    logger.warning(f"Local {MCP_PACKAGE} not available, using npx {version}")
+                    self._command = ["npx", "--yes", f"{MCP_PACKAGE}@{version}"]
+                logger.info(f"Playwright MCP command: {' '.join(self._command)}")
+        return self._command
+
+    async def _create_server(self, name: str, browser_data_dir: str):
+        from mcp_output_filter import FilteredMCPServerStdio
+
+        command, *args = await self.resolve_command()
+        return FilteredMCPServerStdio(
+            max_snapshot_chars=MCP_SNAPSHOT_MAX_CHARS,
+            max_output_chars=MCP_OUTPUT_MAX_CHARS,
+            name=name,
+            params={
+                "command": command,
+                "args": [
+                    *args,
+                    "--isolated",
+                    "--user-data-dir",
+                    browser_data_dir,
+                    # "--headless",
+                ],
+            },
+            client_session_timeout_seconds=15,
+        )
+
+    def start(self):
+        """Start the initial set of warm servers."""
+        self._stopping = False
+        while len(self._holders) < self.size:
+            self._spawn_holder()
+
+    async def stop(self):
+        """Shut down all warm and in-use pooled servers."""
+        self._stopping = True
+        holders = list(self._holders)
+        for task in holders:
+            task.cancel()
+        await asyncio.gather(*holders, return_exceptions=True)
+        while not self._ready.empty():
+            self._ready.get_nowait()
+
+    def _spawn_holder(self):
+        task = asyncio.create_task(self._hold())
+        self._holders.add(task)
+        task.add_done_callback(self._holders.discard)
+
+    async def _hold(self):
+        # The MCP client's task groups must be exited by the task that entered
+        # them, so each pooled server lives inside its own holder task
+        server_id = uuid.uuid4().hex[:8]
+        browser_data_dir = os.path.join(tempfile.gettempdir(), f"playwright_mcp_{server_id}")
+        os.makedirs(browser_data_dir, exist_ok=True)
+        released = asyncio.Event()
+
+        try:
+            server = await self._create_server(f"Playwright MCP {server_id}", browser_data_dir)
+            async with server:
+                self._ready.put_nowait((server, released))
+                await released.wait()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning(f"Pooled Playwright MCP server {server_id} failed: {e}")
+        finally:
+            shutil.rmtree(browser_data_dir, ignore_errors=True)
+
+    @asynccontextmanager
+    async def session(self, instance_id: str, browser_data_dir: str):
+        """
+        Provide a connected MCP server for one generation session.
+
+        Uses a warm pooled server when one is ready, otherwise starts a fresh
+        server for this session.
+
+        Args:
+            instance_id: Generation instance ID, used to name a fresh server
+            browser_data_dir: Browser data directory for a fresh server
+        """
+        try:
+            server, released = self._ready.get_nowait()
+        except asyncio.QueueEmpty:
+            server = None
+
+        if server is None:
+            server = await self._create_server(f"Playwright MCP {instance_id}", browser_data_dir)
+            async with server:
+                yield server
+            return
+
+        if not self._stopping:
+            self._spawn_holder()
+        try:
+            yield server
+        finally:
+            released.set()
+
+
+mcp_server_pool = MCPServerPool(size=int(os.getenv("MCP_SERVER_POOL_SIZE", "1")))
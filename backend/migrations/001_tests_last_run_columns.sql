@@ -0,0 +1,6 @@
+-- Columns on tests describing the last run, written by run_recorder.py.
+
+alter table public.tests
+  add column if not exists last_error_step text null,
+  add column if not exists last_error_index integer null,
+  add column if not exists last_screenshot_id text null;
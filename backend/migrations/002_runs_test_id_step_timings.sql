@@ -0,0 +1,18 @@
+-- Link runs to their test and store per-step timings.
+-- Run rows are written with test_id and step_timings by run_recorder.py, and
+-- read back per test by GET /tests/{test_id}/step-timings.
+
+alter table public.runs
+  add column if not exists test_id uuid null,
+  add column if not exists step_timings jsonb null;
+
+do $$
+begin
+  if not exists (select 1 from pg_constraint where conname = 'runs_test_id_fkey') then
+    alter table public.runs
+      add constraint runs_test_id_fkey foreign key (test_id) references public.tests (id) on delete cascade;
+  end if;
+end $$;
+
+create index if not exists idx_runs_test_id_created_at
+  on public.runs using btree (test_id, created_at desc);
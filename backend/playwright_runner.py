@@ -0,0 +1,256 @@
+"""
+Persistent Playwright Runner Pool
+
+Keeps long-lived Node workers (testjs/runner/runner.mjs) with a warm browser
+so test executions skip npm, npx and browser startup on every run. Every run
+leaves its spec modules loaded in the worker, so workers are replaced after
+a fixed number of runs.
+"""
+
+import os
+import asyncio
+import glob
+import json
+import shutil
+import logging
+import time
+import uuid
+
+from utils import TESTJS_TEMPLATE_DIR, ensure_dependency_cache
+
+RUNNER_SOURCE_DIR = os.path.join(TESTJS_TEMPLATE_DIR, "runner")
+
+# Result events carry the whole run output on a single line
+STREAM_LIMIT = 16 * 1024 * 1024
+
+logger = logging.getLogger("playwright_runner")
+
+
+class RunnerUnavailableError(RuntimeError):
+    """Raised when no persistent runner could be started."""
+
+
+class PlaywrightRunner:
+    """A single Node worker process holding a warm browser."""
+
+    def __init__(self, process: asyncio.subprocess.Process):
+        self.process = process
+        self.jobs = 0
+        self._closed = False
+        self._events: asyncio.Queue[dict | None] = asyncio.Queue()
+        self._readers = [
+            asyncio.create_task(self._read_stdout()),
+            asyncio.create_task(self._read_stderr()),
+        ]
+
+    @classmethod
+    async def start(cls, runner_dir: str, startup_timeout: int = 60) -> "PlaywrightRunner":
+        """Launch a worker and wait until its browser is up."""
+        process = await asyncio.create_subprocess_exec(
+            "node",
+            "runner.mjs",
+            cwd=runner_dir,
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+            limit=STREAM_LIMIT,
+        )
+        runner = cls(process)
+
+        try:
+            event = await asyncio.wait_for(runner._events.get(), startup_timeout)
+        except asyncio.TimeoutError:
+            event = None
+        if not event or event.get("type") != "ready":
+            await runner.close()
+            raise RunnerUnavailableError("Playwright runner failed to start")
+
+        return runner
+
+    async def _read_stdout(self):
+        while line := await self.process.stdout.readline():
+            try:
+                self._events.put_nowait(json.loads(line))
+            except json.JSONDecodeError:
+                continue
+        self._events.put_nowait(None)
+
+    async def _read_stderr(self):
+        while line := await self.process.stderr.readline():
+            logger.warning(line.decode(errors="replace").rstrip())
+
+    @property
+    def alive(self) -> bool:
+        return not self._closed and self.process.returncode is None
+
+    async def run(
+        self, testjs_dir: str, specs: list[str], timeout: int, on_event=None
+    ) -> tuple[bool, str, list[dict]]:
+        """
+        Run spec files in a fresh browser context each.
+
+        Args:
+            testjs_dir: Working directory for the run (hooks write files here)
+            specs: Absolute paths of the spec files to run
+            timeout: Seconds before the run is abandoned and the worker killed
+            on_event: Optional callback receiving each streamed event
+
+        Returns:
+            Tuple of (success: bool, output: str, structured per-test results)
+
+        Raises:
+            RunnerUnavailableError: If the specs need the Playwright CLI, or the
+                worker exited
+        """
+        job_id = uuid.uuid4().hex
+        request = {"id": job_id, "cwd": testjs_dir, "specs": specs}
+        self.jobs += 1
+        self.process.stdin.write((json.dumps(request) + "\n").encode())
+        await self.process.stdin.drain()
+
+        deadline = time.monotonic() + timeout
+        while True:
+            remaining = deadline - time.monotonic()
+            try:
+                event = await asyncio.wait_for(self._events.get(), max(remaining, 0))
+            except asyncio.CancelledError:
+                # Abandoned mid-run, the worker can't be handed to anyone else
+                await self.close()
+                raise
+            except asyncio.TimeoutError:
+                # The test may still hold the browser, start over with a new worker
+                await self.close()
+                raise TimeoutError("Test execution timed out")
+
+            if event is None:
+                raise RunnerUnavailableError("Playwright runner exited unexpectedly")
+            if event.get("id") != job_id:
+                continue
+            if on_event:
+                on_event(event)
+            if event["type"] == "result":
+                if event.get("unsupported"):
+                    raise RunnerUnavailableError(event["unsupported"])
+                output = (
+                    f"STDOUT:\n{event['stdout']}\n\nSTDERR:\n{event['stderr']}"
+                    f"\n\nReturn Code: {event['exit_code']}"
+                )
+                return event["success"], output, event.get("tests", [])
+
+    async def close(self):
+        self._closed = True
+        if self.process.returncode is None:
+            self.process.kill()
+        await self.process.wait()
+        for reader in self._readers:
+            reader.cancel()
+        await asyncio.gather(*self._readers, return_exceptions=True)
+
+
+class RunnerPool:
+    """Fixed-size pool of persistent Playwright runners."""
+
+    def __init__(self, size: int, max_jobs: int):
+        self.size = size
+        self.max_jobs = max_jobs
+        self._idle: asyncio.Queue[PlaywrightRunner] = asyncio.Queue()
+        self._started = 0
+        self._prepare_lock = asyncio.Lock()
+        self._runner_dir: str | None = None
+        self._unavailable_until = 0.0
+
+    @property
+    def enabled(self) -> bool:
+        return self.size > 0
+
+    async def _prepare_runner_dir(self) -> str:
+        """Copy the runner next to the shared node_modules so it resolves @playwright/test."""
+        cached_node_modules = await ensure_dependency_cache()
+        if not cached_node_modules:
+            raise RunnerUnavailableError("Dependency cache is not available")
+
+        runner_dir = os.path.join(os.path.dirname(cached_node_modules), "runner")
+        os.makedirs(runner_dir, exist_ok=True)
+        for source in glob.glob(os.path.join(RUNNER_SOURCE_DIR, "*.mjs")):
+            shutil.copy2(source, runner_dir)
+        return runner_dir
+
+    async def _spawn(self) -> PlaywrightRunner:
+        # Don't pay for repeated failing startups, callers fall back to npm meanwhile
+        if time.monotonic() < self._unavailable_until:
+            raise RunnerUnavailableError("Playwright runner recently failed to start")
+
+        try:
+            # Prepared on every spawn: follows manifest changes and marks the
+            # dependency cache as in use, so it is not pruned under the runner
+            async with self._prepare_lock:
+                self._runner_dir = await self._prepare_runner_dir()
+                runner_dir = self._runner_dir
+            return await PlaywrightRunner.start(runner_dir)
+        except RunnerUnavailableError:
+            self._unavailable_until = time.monotonic() + 300
+            raise
+
+    async def start(self):
+        """Start all runners up front so the first executions are warm too."""
+        if not self.enabled:
+            return
+        while self._started < self.size:
+            self._started += 1
+            try:
+                self._idle.put_nowait(await self._spawn())
+            except RunnerUnavailableError as e:
+                logger.warning(str(e))
+                self._started -= 1
+                return
+
+    async def stop(self):
+        while not self._idle.empty():
+            runner = self._idle.get_nowait()
+            await runner.close()
+        self._started = 0
+
+    async def _acquire(self) -> PlaywrightRunner:
+        if self._idle.empty() and self._started < self.size:
+            self._started += 1
+            try:
+                return await self._spawn()
+            except Exception:
+                self._started -= 1
+                raise
+        return await self._idle.get()
+
+    async def _release(self, runner: PlaywrightRunner):
+        if runner.alive and runner.jobs < self.max_jobs:
+            self._idle.put_nowait(runner)
+            return
+        # Replaced by a fresh worker on the next acquire
+        await runner.close()
+        self._started -= 1
+
+    async def run(
+        self, testjs_dir: str, timeout: int = 60, on_event=None
+    ) -> tuple[bool, str, list[dict]]:
+        """
+        Run every spec in testjs_dir/tests on a warm runner.
+
+        Args:
+            testjs_dir: Path to the testjs directory
+            timeout: Seconds before the run is abandoned
+            on_event: Optional callback receiving each streamed event
+
+        Returns:
+            Tuple of (success: bool, output: str, structured per-test results)
+        """
+        specs = sorted(glob.glob(os.path.join(testjs_dir, "tests", "*.spec.js")))
+        runner = await self._acquire()
+        try:
+            return await runner.run(testjs_dir, specs, timeout, on_event)
+        finally:
+            await self._release(runner)
+
+
+runner_pool = RunnerPool(
+    size=int(os.getenv("PLAYWRIGHT_RUNNER_POOL_SIZE", "2")),
+    max_jobs=int(os.getenv("PLAYWRIGHT_RUNNER_MAX_JOBS", "100")),
+)
@@ -0,0 +1,105 @@
+"""
+Resource Scheduler for Browser-Heavy Work
+
+Bounds how many MCP browser sessions and test executions run at once.
+Excess work waits for a slot; HTTP entry points call `admit` first so
+requests are rejected with 429 once the wait queue is full.
+"""
+
+import os
+import asyncio
+import math
+import time
+from contextlib import asynccontextmanager
+
+
+class ResourceBusyError(Exception):
+    """Raised when a resource's wait queue is full."""
+
+    def __init__(self, resource: str, retry_after: int):
+        super().__init__(f"Too many pending {resource} requests, retry in {retry_after}s")
+        self.resource = resource
+        self.retry_after = retry_after
+
+
+class ResourceLimiter:
+    """Counting limiter with a bounded wait queue and usage metrics."""
+
+    def __init__(self, name: str, slots: int, max_queue: int):
+        self.name = name
+        self.slots = slots
+        self.max_queue = max_queue
+        self.in_use = 0
+        self.waiting = 0
+        self.rejected = 0
+        self._condition = asyncio.Condition()
+        # Moving average of how long a slot is held, for Retry-After estimates
+        self._average_hold_seconds = 30.0
+
+    def retry_after(self, pending: int = 0) -> int:
+        """Estimate seconds until a newly queued request would get a slot."""
+        rounds = (self.waiting + pending + 1) / self.slots
+        return max(1, math.ceil(self._average_hold_seconds * rounds))
+
+    def admit(self, pending: int = 0):
+        """
+        Reject new work when the wait queue is full.
+
+        Args:
+            pending: Requests queued elsewhere that will also need this resource
+
+        Raises:
+            ResourceBusyError: If the queue is full
+        """
+        if self.in_use >= self.slots and self.waiting + pending >= self.max_queue:
+            self.rejected += 1
+            raise ResourceBusyError(self.name, self.retry_after(pending))
+
+    @asynccontextmanager
+    async def slot(self, count: int = 1):
+        """
+        Hold `count` slots for the duration of the block, waiting if needed.
+
+        Args:
+            count: Number of slots needed (clamped to the total)
+        """
+        count = min(count, self.slots)
+        self.waiting += 1
+        try:
+            async with self._condition:
+                await self._condition.wait_for(lambda: self.in_use + count <= self.slots)
+                self.in_use += count
+        finally:
+            self.waiting -= 1
+
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            held = time.monotonic() - started
+            self._average_hold_seconds = 0.8 * self._average_hold_seconds + 0.2 * held
+            async with self._condition:
+                self.in_use -= count
+                self._condition.notify_all()
+
+    def metrics(self) -> dict:
+        return {
+            "slots": self.slots,
+            "in_use": self.in_use,
+            "queue_depth": self.waiting,
+            "max_queue": self.max_queue,
+            "rejected": self.rejected,
+        }
+
+
+mcp_sessions = ResourceLimiter(
+    "MCP session",
+    slots=int(os.getenv("MCP_SESSION_SLOTS", "2")),
+    max_queue=int(os.getenv("MCP_SESSION_QUEUE", "10")),
+)
+
+test_executions = ResourceLimiter(
+    "test execution",
+    slots=int(os.getenv("TEST_EXECUTION_SLOTS", "4")),
+    max_queue=int(os.getenv("TEST_EXECUTION_QUEUE", "50")),
+)
@@ -0,0 +1,340 @@
+"""
+Write-Behind Recording of Execution Results
+
+Executions hand their results to the recorder, which buffers them and writes
+them to Supabase in batches: one insert for all buffered `runs` rows and one
+update per distinct outcome on `tests`. A flush happens when the buffer
+reaches the batch size or the flush interval passes, and the buffer is
+drained on shutdown.
+
+Failed writes are kept and retried with exponential backoff. Transient errors
+(network, gateway) are retried until they succeed; the buffer cap bounds what
+piles up meanwhile. A batch rejected by the database itself (schema or
+constraint errors) is dropped and logged after a few attempts, so it cannot
+block the rows recorded after it.
+"""
+
+import os
+import time
+import asyncio
+import logging
+from datetime import datetime, timezone
+
+logger = logging.getLogger("run_recorder")
+
+# Longest wait between retries of a failing flush
+MAX_RETRY_DELAY_SECONDS = 300
+
+# Columns on `tests` describing the last run, written together
+TEST_RESULT_COLUMNS = (
+    "last_passed",
+    "last_error_message",
+    "last_error_step",
+    "last_error_index",
+    "last_screenshot_id",
+)
+
+
+class RunRecorder:
+    """Buffers execution results and flushes them to Supabase in batches."""
+
+    def __init__(
+        self,
+        batch_size: int,
+        flush_interval: float,
+        max_attempts: int,
+        max_buffered: int = 10000,
+    ):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_attempts = max_attempts
+        self.max_buffered = max_buffered
+        self.flushes = 0
+        self.failed_flushes = 0
+        self.dropped = 0
+        self.dropped_batches = 0
+        # Consecutive failed flushes, and when the next one may be tried
+        self._failures = 0
+        self._retry_at = 0.0
+        self._runs: list[dict] = []
+        # Runs taken out of the buffer by a flush that has not written them yet
+        self._in_flight: list[dict] = []
+        self._test_updates: dict[str, dict] = {}
+        self._wake = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self._task: asyncio.Task | None = None
+
+    @property
+    def pending(self) -> int:
+        return len(self._runs) + len(self._test_updates)
+
+    def pending_runs(self, test_id: str) -> list[dict]:
+        """
+        Runs of a test that are recorded but not yet written.
+
+        Args:
+            test_id: The UUID of the test
+
+        Returns:
+            Buffered `runs` rows of the test, newest first
+        """
+        runs = self._in_flight + self._runs
+        return [run for run in reversed(runs) if run["test_id"] == test_id]
+
+    def start(self):
+        """Start the background flush loop."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._flush_loop())
+
+    async def stop(self):
+        """Stop the flush loop and write out everything still buffered."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    def record(self, test_id: str, result: dict):
+        """
+        Buffer the outcome of one execution.
+
+        Args:
+            test_id: The UUID of the executed test
+            result: Execution result with success, output, completed_steps,
+                step_timings, failing_step, failing_step_index and screenshot_id
+        """
+        finished_at = datetime.now(timezone.utc).isoformat()
+        success = result["success"]
+
+        self._runs.append(
+            {
+                "created_at": finished_at,
+                "test_id": test_id,
+                "success": success,
+                "successful_steps": result.get("completed_steps") or [],
+                "step_timings": result.get("step_timings") or None,
+                "screenshot_bucket_id": result.get("screenshot_id"),
+            }
+        )
+        # Only the latest outcome of a test matters for its last_* columns
+        self._test_updates[test_id] = {
+            "last_run_at": finished_at,
+            "last_passed": success,
+            "last_error_message": None if success else result.get("output"),
+            "last_error_step": None if success else result.get("failing_step"),
+            "last_error_index": None if success else result.get("failing_step_index"),
+            "last_screenshot_id": None if success else result.get("screenshot_id"),
+        }
+
+        if len(self._runs) > self.max_buffered:
+            overflow = len(self._runs) - self.max_buffered
+            del self._runs[:overflow]
+            self.dropped += overflow
+            logger.warning(f"Run buffer full, dropped {overflow} oldest runs")
+
+        if self.pending >= self.batch_size:
+            self._wake.set()
+
+    async def _flush_loop(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            if time.monotonic() >= self._retry_at:
+                await self.flush()
+
+    async def flush(self):
+        """Write buffered runs and test updates, keeping them on failure."""
+        from supabase_client import is_transient_error
+
+        async with self._flush_lock:
+            runs, self._runs = self._runs, []
+            test_updates, self._test_updates = self._test_updates, {}
+            if not runs and not test_updates:
+                return
+
+            self.flushes += 1
+            self._in_flight = runs
+            try:
+                if runs:
+                    await asyncio.to_thread(self._insert_runs, runs)
+                    runs = []
+                    self._in_flight = []
+                if test_updates:
+                    await asyncio.to_thread(self._update_tests, test_updates)
+                logger.info(f"Flushed run results for {len(test_updates)} tests")
+                self._failures = 0
+                self._retry_at = 0.0
+            except Exception as e:
+                self.failed_flushes += 1
+                self._failures += 1
+
+                if not is_transient_error(e) and self._failures >= self.max_attempts:
+                    # Rejected by the database, retrying won't help. Only the
+                    # write that failed is dropped: runs are inserted first,
+                    # so test updates are kept for the next flush if they were
+                    # never tried
+                    if runs:
+                        dropped = f"{len(runs)} runs"
+                        test_ids = sorted({run["test_id"] for run in runs})
+                        self.dropped += len(runs)
+                        self._test_updates = {**test_updates, **self._test_updates}
+                    else:
+                        dropped = f"{len(test_updates)} test updates"
+                        test_ids = sorted(test_updates)
+                    self.dropped_batches += 1
+                    self._failures = 0
+                    self._retry_at = 0.0
+                    logger.error(
+                        f"Dropping {dropped} after {self.max_attempts} failed flushes: {e}\n"
+                        f"Affected tests: {', '.join(test_ids)}"
+                    )
+                    return
+
+                delay = min(self.flush_interval * 2 ** (self._failures - 1), MAX_RETRY_DELAY_SECONDS)
+                self._retry_at = time.monotonic() + delay
+                logger.warning(
+                    f"Failed to flush run results (attempt {self._failures}), "
+                    f"retrying in {delay:.0f}s: {e}"
+                )
+                self._runs = runs + self._runs
+                # Newer outcomes recorded meanwhile take precedence
+                self._test_updates = {**test_updates, **self._test_updates}
+            finally:
+                self._in_flight = []
+
+    @staticmethod
+    def _insert_runs(runs: list[dict]):
+        from supabase_client import get_supabase_client, with_retry
+
+        supabase = get_supabase_client()
+        with_retry(supabase.table("runs").insert(runs).execute)
+
+    @staticmethod
+    def _update_tests(test_updates: dict[str, dict]):
+        from supabase_client import get_supabase_client, with_retry
+
+        # PostgREST cannot update many rows with different values in one call,
+        # so tests sharing an outcome (e.g. every pass) are updated together
+        groups: dict[tuple, dict] = {}
+        for test_id, update in test_updates.items():
+            key = tuple(update[column] for column in TEST_RESULT_COLUMNS)
+            group = groups.setdefault(key, {"ids": [], "last_run_at": update["last_run_at"]})
+            group["ids"].append(test_id)
+            group["last_run_at"] = max(group["last_run_at"], update["last_run_at"])
+
+        supabase = get_supabase_client()
+        for key, group in groups.items():
+            values = dict(zip(TEST_RESULT_COLUMNS, key), last_run_at=group["last_run_at"])
+            with_retry(supabase.table("tests").update(values).in_("id", group["ids"]).execute)
+
+    def metrics(self) -> dict:
+        return {
+            "pending": self.pending,
+            "flushes": self.flushes,
+            "failed_flushes": self.failed_flushes,
+            "dropped": self.dropped,
+            "dropped_batches": self.dropped_batches,
+        }
+
+
+def _percentile(values: list[float], q: float) -> float:
+    """Linearly interpolated percentile of sorted values, q in [0, 1]."""
+    position = (len(values) - 1) * q
+    lower = int(position)
+    upper = min(lower + 1, len(values) - 1)
+    return values[lower] + (values[upper] - values[lower]) * (position - lower)
+
+
+def summarize_step_timings(runs: list[dict]) -> list[dict]:
+    """
+    Aggregate per-step durations over runs of one test.
+
+    Steps are matched by position and description, so a step that was
+    renamed or moved starts a new series.
+
+    Args:
+        runs: `runs` rows with step_timings, newest first
+
+    Returns:
+        One entry per step in plan order with description, index, samples,
+        p50_ms, p95_ms and max_ms
+    """
+    durations: dict[tuple[int, str], list[float]] = {}
+    for run in runs:
+        for index, step in enumerate(run.get("step_timings") or []):
+            durations.setdefault((index, step["description"]), []).append(step["duration_ms"])
+
+    summary = []
+    for (index, description), values in sorted(durations.items(), key=lambda item: item[0][0]):
+        values.sort()
+        summary.append(
+            {
+                "index": index,
+                "description": description,
+                "samples": len(values),
+                "p50_ms": round(_percentile(values, 0.5), 3),
+                "p95_ms": round(_percentile(values, 0.95), 3),
+                "max_ms": values[-1],
+            }
+        )
+    return summary
+
+
+def merge_runs(pending: list[dict], persisted: list[dict], limit: int) -> list[dict]:
+    """
+    Combine buffered and stored runs of one test without flushing.
+
+    Buffered runs are newer than every stored one, except a batch whose insert
+    completed while the stored rows were being read; those appear in both and
+    are matched by created_at.
+
+    Args:
+        pending: Buffered runs from RunRecorder.pending_runs, newest first
+        persisted: Stored `runs` rows, newest first
+        limit: Maximum number of runs to return
+
+    Returns:
+        Up to limit runs, newest first
+    """
+    seen = {datetime.fromisoformat(run["created_at"]) for run in pending}
+    stored = [run for run in persisted if datetime.fromisoformat(run["created_at"]) not in seen]
+    return (pending + stored)[:limit]
+
+
+def fetch_step_timings(test_id: str, limit: int) -> list[dict]:
+    """
+    Fetch the step timings of a test's most recent runs.
+
+    Args:
+        test_id: The UUID of the test
+        limit: Maximum number of runs, newest first
+
+    Returns:
+        `runs` rows with created_at, success and step_timings
+    """
+    from supabase_client import get_supabase_client, with_retry
+
+    supabase = get_supabase_client()
+    result = with_retry(
+        supabase.table("runs")
+        .select("created_at, success, step_timings")
+        .eq("test_id", test_id)
+        .not_.is_("step_timings", "null")
+        .order("created_at", desc=True)
+        .limit(limit)
+        .execute
+    )
+    return result.data or []
+
+
+run_recorder = RunRecorder(
+    batch_size=int(os.getenv("RUN_RECORDER_BATCH_SIZE", "50")),
+    flush_interval=float(os.getenv("RUN_RECORDER_FLUSH_SECONDS", "2")),
+    max_attempts=int(os.getenv("RUN_RECORDER_MAX_ATTEMPTS", "5")),
+)
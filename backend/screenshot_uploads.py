@@ -0,0 +1,221 @@
+"""
+Background Screenshot Upload Queue
+
+Failure screenshots are uploaded to the Screenshots bucket off the request's
+critical path. A screenshot is named by the hash of its contents, so its ID
+is known before the upload and identical screenshots are stored only once.
+A thumbnail, if the hook produced one, is uploaded next to it. Files are
+moved out of the execution workspace into a spool directory and streamed
+from disk by background workers that retry with backoff.
+"""
+
+import os
+import asyncio
+import hashlib
+import logging
+import tempfile
+from collections import OrderedDict
+
+logger = logging.getLogger("screenshot_uploads")
+
+SCREENSHOT_BUCKET = "Screenshots"
+
+CONTENT_TYPES = {"png": "image/png", "jpeg": "image/jpeg", "webp": "image/webp"}
+
+# Upload states reported by the status endpoint
+PENDING = "pending"
+AVAILABLE = "available"
+FAILED = "failed"
+
+
+def hash_file(path: str, chunk_size: int = 1024 * 1024) -> str:
+    """Hash a file's contents without loading it into memory at once."""
+    hasher = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(chunk_size):
+            hasher.update(chunk)
+    return hasher.hexdigest()[:32]
+
+
+class ScreenshotUploader:
+    """Queue and worker pool uploading spooled screenshots to Supabase storage."""
+
+    def __init__(self, workers: int, max_attempts: int, max_tracked: int = 10000):
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.max_tracked = max_tracked
+        self.spool_dir = os.path.join(tempfile.gettempdir(), "screenshot_uploads")
+        self._statuses: OrderedDict[str, str] = OrderedDict()
+        # Thumbnail uploaded with each tracked screenshot, if any
+        self._thumbnail_ids: dict[str, str | None] = {}
+        self._queue: asyncio.Queue[list[str]] = asyncio.Queue()
+        self._worker_tasks: list[asyncio.Task] = []
+
+    def start(self):
+        """Start the upload workers."""
+        if self._worker_tasks:
+            return
+        os.makedirs(self.spool_dir, exist_ok=True)
+        self._worker_tasks = [
+            asyncio.create_task(self._worker()) for _ in range(self.workers)
+        ]
+
+    async def stop(self, drain_timeout: float = 30):
+        """Give queued uploads a chance to finish, then stop the workers."""
+        if not self._worker_tasks:
+            return
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout=drain_timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"{self._queue.qsize()} screenshot uploads left unfinished")
+        for task in self._worker_tasks:
+            task.cancel()
+        await asyncio.gather(*self._worker_tasks, return_exceptions=True)
+        self._worker_tasks = []
+
+    def status(self, screenshot_id: str) -> str | None:
+        """Upload status of a screenshot, or None if it is not known."""
+        return self._statuses.get(screenshot_id)
+
+    def _set_status(self, screenshot_id: str, status: str):
+        self._statuses[screenshot_id] = status
+        self._statuses.move_to_end(screenshot_id)
+        while len(self._statuses) > self.max_tracked:
+            evicted, _ = self._statuses.popitem(last=False)
+            self._thumbnail_ids.pop(evicted, None)
+
+    async def submit(self, path: str, thumbnail_path: str | None = None) -> tuple[str, str | None]:
+        """
+        Queue a screenshot for upload and return its IDs right away.
+
+        The files are moved out of the caller's workspace, so it can be
+        reused immediately.
+
+        Args:
+            path: Path of the screenshot file to upload
+            thumbnail_path: Optional path of its thumbnail
+
+        Returns:
+            Tuple of (screenshot ID, thumbnail ID or None). IDs are the object
+            names in the bucket: "<content hash>.<ext>" and
+            "<content hash>.thumb.<ext>"
+        """
+        content_hash = await asyncio.to_thread(hash_file, path)
+        screenshot_id = f"{content_hash}{os.path.splitext(path)[1]}"
+        thumbnail_id = None
+        if thumbnail_path:
+            thumbnail_id = f"{content_hash}.thumb{os.path.splitext(thumbnail_path)[1]}"
+
+        if self._statuses.get(screenshot_id) in (PENDING, AVAILABLE):
+            for local_path in (path, thumbnail_path):
+                if local_path:
+                    os.remove(local_path)
+            # Only a thumbnail that was queued with the original exists
+            return screenshot_id, self._thumbnail_ids.get(screenshot_id)
+
+        os.makedirs(self.spool_dir, exist_ok=True)
+        os.replace(path, os.path.join(self.spool_dir, screenshot_id))
+        object_names = [screenshot_id]
+        if thumbnail_path:
+            os.replace(thumbnail_path, os.path.join(self.spool_dir, thumbnail_id))
+            object_names.append(thumbnail_id)
+
+        self._set_status(screenshot_id, PENDING)
+        self._thumbnail_ids[screenshot_id] = thumbnail_id
+        self._queue.put_nowait(object_names)
+        return screenshot_id, thumbnail_id
+
+    async def _worker(self):
+        while True:
+            object_names = await self._queue.get()
+            try:
+                await self._upload_with_retry(object_names)
+            finally:
+                self._queue.task_done()
+
+    async def _upload_with_retry(self, object_names: list[str]):
+        screenshot_id = object_names[0]
+        remaining = list(object_names)
+
+        for attempt in range(self.max_attempts):
+            try:
+                while remaining:
+                    await asyncio.to_thread(self._upload, self.spool_dir, remaining[0])
+                    remaining.pop(0)
+                self._set_status(screenshot_id, AVAILABLE)
+                logger.info(f"Uploaded screenshot {screenshot_id}")
+                break
+            except Exception as e:
+                if attempt == self.max_attempts - 1:
+                    logger.error(f"Giving up on screenshot {screenshot_id}: {e}")
+                    self._set_status(screenshot_id, FAILED)
+                    break
+                delay = 2**attempt
+                logger.warning(f"Screenshot {screenshot_id} upload failed ({e}), retrying in {delay}s")
+                await asyncio.sleep(delay)
+
+        for object_name in object_names:
+            try:
+                os.remove(os.path.join(self.spool_dir, object_name))
+            except OSError:
+                pass
+
+    @staticmethod
+    def _upload(spool_dir: str, object_name: str):
+        from supabase_client import get_supabase_client
+
+        extension = object_name.rsplit(".", 1)[-1]
+        supabase = get_supabase_client()
+        # An open file is streamed by the HTTP client instead of read up front
+        with open(os.path.join(spool_dir, object_name), "rb") as f:
+            try:
+                supabase.storage.from_(SCREENSHOT_BUCKET).upload(
+                    path=object_name,
+                    file=f,
+                    file_options={"content-type": CONTENT_TYPES.get(extension, "image/png")},
+                )
+            except Exception as e:
+                # Already in the bucket from an earlier run
+                if str(getattr(e, "status", "")) != "409":
+                    raise
+
+    def fetch(self, screenshot_id: str) -> tuple[bytes, str] | None:
+        """
+        Read a screenshot, from the spool while its upload is pending or
+        from the bucket afterwards. Blocking.
+
+        Args:
+            screenshot_id: ID returned by submit
+
+        Returns:
+            Tuple of (image bytes, content type), or None if it cannot be found
+        """
+        from supabase_client import get_supabase_client, with_retry
+
+        extension = screenshot_id.rsplit(".", 1)[-1]
+        content_type = CONTENT_TYPES.get(extension, "image/png")
+        try:
+            with open(os.path.join(self.spool_dir, screenshot_id), "rb") as f:
+                return f.read(), content_type
+        except FileNotFoundError:
+            pass
+
+        try:
+            bucket = get_supabase_client().storage.from_(SCREENSHOT_BUCKET)
+            return with_retry(bucket.download, screenshot_id), content_type
+        except Exception as e:
+            logger.warning(f"Failed to download screenshot {screenshot_id}: {e}")
+            return None
+
+    def metrics(self) -> dict:
+        return {
+            "queue_depth": self._queue.qsize(),
+            "pending": sum(1 for status in self._statuses.values() if status == PENDING),
+            "failed": sum(1 for status in self._statuses.values() if status == FAILED),
+        }
+
+
+screenshot_uploader = ScreenshotUploader(
+    workers=int(os.getenv("SCREENSHOT_UPLOAD_WORKERS", "2")),
+    max_attempts=int(os.getenv("SCREENSHOT_UPLOAD_ATTEMPTS", "5")),
+)
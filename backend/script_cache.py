@@ -0,0 +1,195 @@
+"""
+Read-Through Cache for Test Scripts and Plans
+
+Executions look up a test's script and plan here before going to Supabase.
+Entries live in a bounded in-memory LRU, optionally backed by a local SQLite
+file so they survive restarts. The SQLite table is bounded too: expired rows
+and rows beyond the entry limit are removed on every write. Tests are edited by the frontend directly in
+Supabase, so entries expire after a TTL and are dropped explicitly through
+the invalidation endpoint when a test is regenerated or deleted.
+
+A second instance caches generation results, keyed by the target URL and the
+normalized test case description instead of a test ID.
+"""
+
+import os
+import json
+import hashlib
+import sqlite3
+import time
+from collections import OrderedDict
+
+
+class ScriptCache:
+    """LRU cache of {test_script, plan} rows keyed by test ID."""
+
+    def __init__(
+        self,
+        max_entries: int,
+        ttl_seconds: float,
+        sqlite_path: str | None = None,
+        table: str = "test_cache",
+    ):
+        if not table.isidentifier():
+            raise ValueError(f"Invalid cache table name: {table}")
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.table = table
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self._entries: OrderedDict[str, tuple[float, dict]] = OrderedDict()
+        self._db: sqlite3.Connection | None = None
+
+        if sqlite_path:
+            os.makedirs(os.path.dirname(os.path.abspath(sqlite_path)), exist_ok=True)
+            self._db = sqlite3.connect(sqlite_path, check_same_thread=False)
+            self._db.execute(
+                f"CREATE TABLE IF NOT EXISTS {table} ("
+                "test_id TEXT PRIMARY KEY, test_script TEXT, plan TEXT, cached_at REAL)"
+            )
+            self._db.execute(
+                f"CREATE INDEX IF NOT EXISTS {table}_cached_at ON {table} (cached_at)"
+            )
+            self._db.commit()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    def _expired(self, cached_at: float) -> bool:
+        return time.time() - cached_at > self.ttl_seconds
+
+    def _load(self, test_id: str) -> tuple[float, dict] | None:
+        if self._db is None:
+            return None
+        row = self._db.execute(
+            f"SELECT test_script, plan, cached_at FROM {self.table} WHERE test_id = ?",
+            (test_id,),
+        ).fetchone()
+        if row is None:
+            return None
+        test_script, plan, cached_at = row
+        return cached_at, {"test_script": test_script, "plan": json.loads(plan)}
+
+    def get(self, test_id: str) -> dict | None:
+        """
+        Look up a test's script and plan.
+
+        Args:
+            test_id: The UUID of the test
+
+        Returns:
+            dict with test_script and plan, or None on a miss
+        """
+        if not self.enabled:
+            return None
+
+        entry = self._entries.get(test_id) or self._load(test_id)
+        if entry is None or self._expired(entry[0]):
+            if entry is not None:
+                self.invalidate(test_id, count=False)
+            self.misses += 1
+            return None
+
+        self._entries[test_id] = entry
+        self._entries.move_to_end(test_id)
+        self._evict()
+        self.hits += 1
+        return dict(entry[1])
+
+    def get_many(self, test_ids: list[str]) -> tuple[dict[str, dict], list[str]]:
+        """
+        Look up several tests at once.
+
+        Returns:
+            Tuple of (cached rows by test ID, IDs that missed)
+        """
+        rows, missing = {}, []
+        for test_id in test_ids:
+            row = self.get(test_id)
+            if row is None:
+                missing.append(test_id)
+            else:
+                rows[test_id] = row
+        return rows, missing
+
+    def put(self, test_id: str, row: dict):
+        """
+        Store a test's script and plan.
+
+        Args:
+            test_id: The UUID of the test
+            row: Row from the tests table with test_script and plan
+        """
+        if not self.enabled or not row.get("test_script"):
+            return
+
+        entry = (time.time(), {"test_script": row["test_script"], "plan": row.get("plan")})
+        self._entries[test_id] = entry
+        self._entries.move_to_end(test_id)
+        self._evict()
+
+        if self._db is not None:
+            self._db.execute(
+                f"INSERT OR REPLACE INTO {self.table} VALUES (?, ?, ?, ?)",
+                (test_id, entry[1]["test_script"], json.dumps(entry[1]["plan"]), entry[0]),
+            )
+            self._prune_db()
+            self._db.commit()
+
+    def invalidate(self, test_id: str, count: bool = True):
+        """Drop a test from the cache, e.g. after it was regenerated."""
+        self._entries.pop(test_id, None)
+        if self._db is not None:
+            self._db.execute(f"DELETE FROM {self.table} WHERE test_id = ?", (test_id,))
+            self._db.commit()
+        if count:
+            self.invalidations += 1
+
+    def _evict(self):
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _prune_db(self):
+        """Delete expired rows and all but the newest max_entries rows."""
+        self._db.execute(
+            f"DELETE FROM {self.table} WHERE cached_at < ?", (time.time() - self.ttl_seconds,)
+        )
+        self._db.execute(
+            f"DELETE FROM {self.table} WHERE test_id NOT IN "
+            f"(SELECT test_id FROM {self.table} ORDER BY cached_at DESC LIMIT ?)",
+            (self.max_entries,),
+        )
+
+    def metrics(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else None,
+            "invalidations": self.invalidations,
+        }
+
+
+script_cache = ScriptCache(
+    max_entries=int(os.getenv("TEST_CACHE_SIZE", "500")),
+    ttl_seconds=float(os.getenv("TEST_CACHE_TTL_SECONDS", "600")),
+    sqlite_path=os.getenv("TEST_CACHE_SQLITE_PATH") or None,
+)
+
+
+def generation_cache_key(target_url: str, test_case_description: str) -> str:
+    """Cache key for a generation request, ignoring whitespace and case in the description."""
+    description = " ".join(test_case_description.split()).lower()
+    return hashlib.sha256(f"{target_url.strip()}\n{description}".encode()).hexdigest()
+
+
+generation_cache = ScriptCache(
+    max_entries=int(os.getenv("GENERATION_CACHE_SIZE", "200")),
+    ttl_seconds=float(os.getenv("GENERATION_CACHE_TTL_SECONDS", "86400")),
+    sqlite_path=os.getenv("GENERATION_CACHE_SQLITE_PATH") or None,
+    table="generation_cache",
+)
@@ -0,0 +1,207 @@
+"""
+Static Validation of Generated Test Scripts
+
+Checks a script before it is given a browser run: `node --check` for syntax,
+plus the rules the system prompt sets for scripts (at least one `test(`
+block, only static string arguments to successful_step). Errors come back in
+milliseconds and point at the offending lines, so the agent can fix them
+without waiting for Playwright.
+
+The static successful_step arguments are also the test plan, which is
+extracted here instead of being written separately by the agent.
+"""
+
+import os
+import re
+import subprocess
+import tempfile
+
+from utils import run_subprocess
+
+TEST_BLOCK_PATTERN = re.compile(r"\btest(?:\.only)?\s*\(")
+STEP_CALL_PATTERN = re.compile(r"\bsuccessful_step\s*\(")
+# A single static string: quoted, or a template literal without ${...}
+STEP_LITERAL_PATTERN = re.compile(
+    r"""\bsuccessful_step\s*\(\s*("(?:[^"\\\n]|\\.)*"|'(?:[^'\\\n]|\\.)*'|`(?:[^`\\$]|\\.|\$(?!\{))*`)\s*\)"""
+)
+
+# Syntax that parses as TypeScript but not JavaScript, for clearer messages
+TYPESCRIPT_PATTERNS = [
+    (
+        re.compile(r"^\s*(?:export\s+)?(?:interface|type)\s+\w+\s*(?:<[^>]*>)?\s*[={]", re.M),
+        "type declaration",
+    ),
+    (
+        re.compile(r"\b(?:const|let|var)\s+\w+\s*:\s*[\w\[\]<>|]+\s*="),
+        "type annotation on a variable",
+    ),
+    (
+        re.compile(r"\([^()]*\w+\s*:\s*(?:string|number|boolean|any|Page|Locator)\b[^()]*\)"),
+        "type annotation on a parameter",
+    ),
+    (
+        re.compile(r"\bas\s+(?:string|number|boolean|any|unknown|const|HTML\w+)\b"),
+        "type assertion",
+    ),
+    (re.compile(r"\w!\.\w"), "non-null assertion"),
+    (re.compile(r"^\s*import\s+type\b", re.M), "type-only import"),
+]
+
+
+def strip_comments(script: str) -> str:
+    """
+    Blank out // and /* */ comments, keeping string and template literals.
+
+    Comment characters are replaced with spaces (newlines are kept), so
+    offsets and line numbers in the result match the original script.
+    """
+    result = []
+    index, length = 0, len(script)
+    while index < length:
+        char = script[index]
+        pair = script[index : index + 2]
+        if char in "'\"`":
+            end = index + 1
+            while end < length and script[end] != char:
+                if script[end] == "\\":
+                    end += 1
+                elif char != "`" and script[end] == "\n":
+                    break
+                end += 1
+            result.append(script[index : end + 1])
+            index = end + 1
+        elif pair in ("//", "/*"):
+            end = script.find("\n" if pair == "//" else "*/", index + 2)
+            end = length if end == -1 else end + (0 if pair == "//" else 2)
+            result.append(re.sub(r"[^\n]", " ", script[index:end]))
+            index = end
+        else:
+            result.append(char)
+            index += 1
+    return "".join(result)
+
+
+def _line_number(script: str, offset: int) -> int:
+    return script.count("\n", 0, offset) + 1
+
+
+def check_test_blocks(script: str) -> list[str]:
+    """Require at least one test( block."""
+    if TEST_BLOCK_PATTERN.search(script):
+        return []
+    return ["No test( block found. Wrap the steps in test('...', async ({ page }) => { ... })."]
+
+
+def check_step_calls(script: str) -> list[str]:
+    """Require every successful_step call to take a single static string."""
+    script = strip_comments(script)
+    literal_offsets = {match.start() for match in STEP_LITERAL_PATTERN.finditer(script)}
+    errors = []
+    for match in STEP_CALL_PATTERN.finditer(script):
+        line_start = script.rfind("\n", 0, match.start()) + 1
+        line_end = script.find("\n", match.start())
+        line = script[line_start : line_end if line_end != -1 else len(script)]
+        if "function successful_step" in line or match.start() in literal_offsets:
+            continue
+        errors.append(
+            f"Line {_line_number(script, match.start())}: successful_step must be called with a "
+            f"single static string, not an expression or template with ${{...}}: {line.strip()}"
+        )
+    return errors
+
+
+def _decode_literal(literal: str) -> str:
+    escapes = {"n": "\n", "t": "\t", "r": "\r", "b": "\b", "f": "\f", "v": "\v", "0": "\0"}
+
+    def unescape(match: re.Match) -> str:
+        escaped = match.group(1)
+        if escaped[0] in "ux" and len(escaped) > 1:
+            return chr(int(escaped[1:].strip("{}"), 16))
+        if escaped in ("\n", "\r\n", "\r"):
+            # Line continuation
+            return ""
+        return escapes.get(escaped, escaped)
+
+    return re.sub(
+        r"\\(u\{[0-9a-fA-F]+\}|u[0-9a-fA-F]{4}|x[0-9a-fA-F]{2}|\r\n|.)",
+        unescape,
+        literal[1:-1],
+        flags=re.S,
+    )
+
+
+def extract_step_descriptions(script: str) -> list[str]:
+    """
+    Derive the test plan from a script's successful_step calls.
+
+    Args:
+        script: Test script; the successful_step definition is ignored
+
+    Returns:
+        The static description of each successful_step call, in source order.
+        Calls in comments and calls that fail check_step_calls are skipped.
+    """
+    return [
+        _decode_literal(match.group(1))
+        for match in STEP_LITERAL_PATTERN.finditer(strip_comments(script))
+    ]
+
+
+def describe_typescript(script: str) -> list[str]:
+    """List TypeScript-only constructs in a script, with line numbers."""
+    found = []
+    for pattern, description in TYPESCRIPT_PATTERNS:
+        for match in pattern.finditer(script):
+            found.append(f"Line {_line_number(script, match.start())}: TypeScript {description}")
+    return found
+
+
+async def check_syntax(script: str) -> list[str]:
+    """
+    Parse a script as an ES module with `node --check`.
+
+    Returns:
+        The syntax error with its line and source excerpt, or an empty list
+    """
+    with tempfile.TemporaryDirectory(prefix="script_check_") as directory:
+        path = os.path.join(directory, "test.spec.mjs")
+        with open(path, "w") as f:
+            f.write(script)
+        try:
+            result = await run_subprocess(["node", "--check", path], cwd=directory, timeout=10)
+        except (subprocess.TimeoutExpired, OSError):
+            # Syntax is still checked by the Playwright run
+            return []
+
+    if result.returncode == 0:
+        return []
+
+    stderr = result.stderr.replace(path, "test.spec.js")
+    location = re.search(r"test\.spec\.js:(\d+)", stderr)
+    message = re.search(r"^(\w*Error: .*)$", stderr, re.M)
+    error = message.group(1) if message else stderr.strip().splitlines()[-1]
+    if location:
+        line_number = int(location.group(1))
+        lines = script.splitlines()
+        source = lines[line_number - 1].strip() if 0 < line_number <= len(lines) else ""
+        error = f"Line {line_number}: {error}: {source}"
+
+    errors = [error]
+    typescript = describe_typescript(script)
+    if typescript:
+        errors.append("The script must be JavaScript, but contains TypeScript syntax:")
+        errors.extend(typescript)
+    return errors
+
+
+async def validate_test_script(script: str) -> list[str]:
+    """
+    Run all static checks on a script without the successful_step definition.
+
+    Args:
+        script: Test script as written by the agent
+
+    Returns:
+        Error messages; empty if the script may be run
+    """
+    return await check_syntax(script) + check_test_blocks(script) + check_step_calls(script)
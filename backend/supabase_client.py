@@ -1,7 +1,21 @@
 import os
-from supabase import create_client, Client
+import time
+import logging
+import threading
+import httpx
+from postgrest.exceptions import APIError
+from supabase import create_client, Client, ClientOptions
 
-# tests SCHEMA for reference:
+logger = logging.getLogger("supabase_client")
+
+# Gateway errors returned while Supabase is briefly unavailable
+TRANSIENT_STATUS_CODES = {"502", "503", "504"}
+
+_client: Client | None = None
+_http_client: httpx.Client | None = None
+_client_lock = threading.Lock()
+
+# tests SCHEMA for reference (last_error_*, last_screenshot_id: migrations/001_tests_last_run_columns.sql):
 """
 create table public.tests (
   id uuid not null default gen_random_uuid (),
@@ -12,7 +26,10 @@ create table public.tests (
   last_run_at timestamp with time zone null,
   last_passed boolean null,
   last_error_message text null,
+  last_error_step text null,
+  last_error_index integer null,
   last_screenshot_path text null,
+  last_screenshot_id text null,
   created_at timestamp with time zone null default now(),
   test_script character varying null,
   constraint test_cases_pkey primary key (id)
@@ -26,7 +43,7 @@ create index IF not exists idx_tests_last_passed on public.tests using btree (la
 """
 
 
-# runs SCHEMA for reference:
+# runs SCHEMA for reference (test_id, step_timings: migrations/002_runs_test_id_step_timings.sql):
 """
 create table public.runs (
   id bigint generated by default as identity not null,
@@ -34,23 +51,111 @@ create table public.runs (
   screenshot_bucket_id text null,
   success boolean null,
   successful_steps text[] null,
-  constraint Runs_pkey primary key (id)
+  test_id uuid null,
+  step_timings jsonb null,
+  constraint Runs_pkey primary key (id),
+  constraint runs_test_id_fkey foreign key (test_id) references tests (id) on delete cascade
 ) TABLESPACE pg_default;
+
+create index IF not exists idx_runs_test_id_created_at on public.runs using btree (test_id, created_at desc) TABLESPACE pg_default;
 """
 
 
 def get_supabase_client() -> Client:
     """
-    Get the Supabase client instance.
+    Get the process-wide Supabase client instance.
+
+    The client is created on first use and shared by every request. All of
+    its sub-clients (PostgREST, storage, auth) go through one pooled HTTP
+    client, so warm keep-alive connections are reused across requests.
 
     Returns:
         Supabase Client
     """
-    url: str = os.environ.get("SUPABASE_URL")
-    key: str = os.environ.get("SUPABASE_KEY")
-    supabase: Client = create_client(url, key)
+    global _client, _http_client
+
+    if _client is not None:
+        return _client
+
+    with _client_lock:
+        if _client is None:
+            max_connections = int(os.getenv("SUPABASE_MAX_CONNECTIONS", "20"))
+            _http_client = httpx.Client(
+                timeout=httpx.Timeout(float(os.getenv("SUPABASE_TIMEOUT_SECONDS", "30"))),
+                limits=httpx.Limits(
+                    max_connections=max_connections,
+                    max_keepalive_connections=max_connections,
+                    keepalive_expiry=float(os.getenv("SUPABASE_KEEPALIVE_SECONDS", "60")),
+                ),
+                follow_redirects=True,
+            )
+
+            url: str = os.environ.get("SUPABASE_URL")
+            key: str = os.environ.get("SUPABASE_KEY")
+            _client = create_client(url, key, ClientOptions(httpx_client=_http_client))
+
+    return _client
+
+
+def warm_supabase_client():
+    """
+    Create the shared client and open a connection ahead of the first request.
+    """
+    supabase = get_supabase_client()
+    with_retry(supabase.table("tests").select("id").limit(1).execute)
+
+
+def close_supabase_client():
+    """Close the shared client's pooled connections."""
+    global _client, _http_client
+
+    with _client_lock:
+        if _http_client is not None:
+            _http_client.close()
+        _client = None
+        _http_client = None
+
+
+def is_transient_error(error: Exception) -> bool:
+    """
+    Check whether a failed Supabase call is worth retrying.
+
+    Args:
+        error: The exception raised by the call
+
+    Returns:
+        True for network errors and gateway responses, False otherwise
+    """
+    if isinstance(error, httpx.TransportError):
+        return True
+    if isinstance(error, APIError):
+        return str(error.code) in TRANSIENT_STATUS_CODES
+    return False
+
+
+def with_retry(fn, *args, **kwargs):
+    """
+    Call a blocking Supabase operation, retrying transient errors with backoff.
+
+    Args:
+        fn: The operation, e.g. a query's `execute` or a storage `upload`
+        *args: Positional arguments for fn
+        **kwargs: Keyword arguments for fn
+
+    Returns:
+        Whatever fn returns
+    """
+    retries = int(os.getenv("SUPABASE_RETRIES", "3"))
 
-    return supabase
+    for attempt in range(retries + 1):
+        try:
+            return fn(*args, **kwargs)
+        except Exception as e:
+            if attempt == retries or not is_transient_error(e):
+                raise
+            delay = 0.5 * 2**attempt
+            logger.warning(f"Supabase call failed ({e}), retrying in {delay}s")
+            time.sleep(delay)
 
 
 def get_test_script(test_id: str) -> str | None:
@@ -66,11 +171,11 @@ def get_test_script(test_id: str) -> str | None:
 
     supabase = get_supabase_client()
 
-    result = (
+    result = with_retry(
         supabase.table("tests")
         .select("test_script")
         .eq("id", test_id)
         .single()
-        .execute()
+        .execute
     )
     return result.data.get("test_script") if result.data else None
@@ -1,8 +1,12 @@
 import { defineConfig } from "@playwright/test"
 
 export default defineConfig({
+  // Debug artifact runs set these, see DEBUG_ARTIFACT_MODES in utils.py
+  retries: Number(process.env.PLAYWRIGHT_RETRIES || 0),
   use: {
     viewport: { width: 1200, height: 1000 },
+    trace: process.env.PLAYWRIGHT_TRACE || "off",
+    video: process.env.PLAYWRIGHT_VIDEO || "off",
     // headless: false,
     // launchOptions: {
     //   slowMo: 100, // 👈 slows every action by 250 ms
@@ -0,0 +1,25 @@
+// Module hooks for the persistent runner.
+// Spec files are imported with a `?runner-job=` query: their `@playwright/test`
+// imports are redirected to the runner shim, and they are always loaded as ES
+// modules regardless of the workspace package.json "type".
+
+const JOB_QUERY = "?runner-job="
+const SHIM_URL = new URL("./shim.mjs", import.meta.url).href
+
+export async function resolve(specifier, context, nextResolve) {
+  if (
+    specifier === "@playwright/test" &&
+    context.parentURL &&
+    context.parentURL.includes(JOB_QUERY)
+  ) {
+    return { url: SHIM_URL, shortCircuit: true }
+  }
+  return nextResolve(specifier, context)
+}
+
+export async function load(url, context, nextLoad) {
+  if (url.includes(JOB_QUERY) || url.includes("?runner-config=")) {
+    return nextLoad(url, { ...context, format: "module" })
+  }
+  return nextLoad(url, context)
+}
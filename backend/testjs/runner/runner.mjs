@@ -0,0 +1,303 @@
+// Persistent Playwright runner.
+// Keeps one Chromium instance warm and executes spec files sent over stdin,
+// one JSON request per line: {"id": "...", "cwd": "...", "specs": ["..."]}.
+// Every test gets a fresh BrowserContext. Progress and results are written to
+// stdout as JSON lines tagged with the request id:
+//   {"type": "ready"}
+//   {"id", "type": "stdout" | "stderr", "line"}
+//   {"id", "type": "result", "success", "exit_code", "stdout", "stderr", "tests"}
+// "tests" holds one structured result per test (status, duration, errors with
+// location, attachments) in the shape of Playwright's JSON reporter. A spec
+// using an API the runner does not support gets a result with "unsupported"
+// set instead, and is to be run with the Playwright CLI.
+//
+// Every job imports its specs as new modules, which ES modules never release,
+// so the pool replaces a runner after a number of jobs.
+
+import { createHash } from "node:crypto"
+import { readFile } from "node:fs/promises"
+import { register } from "node:module"
+import { createInterface } from "node:readline"
+import { pathToFileURL } from "node:url"
+import { format } from "node:util"
+import * as path from "node:path"
+import { chromium } from "@playwright/test"
+import { registry, resetRegistry, isSkip, isUnsupported } from "./shim.mjs"
+
+register("./hooks.mjs", import.meta.url)
+
+const DEFAULT_TEST_TIMEOUT = 30000
+
+const send = (message) => process.stdout.write(JSON.stringify(message) + "\n")
+
+let browser = null
+let job = null
+
+async function getBrowser() {
+  if (!browser || !browser.isConnected()) {
+    browser = await chromium.launch()
+  }
+  return browser
+}
+
+function emit(stream, args) {
+  const line = format(...args)
+  if (!job) {
+    process.stderr.write(line + "\n")
+    return
+  }
+  job[stream].push(line)
+  send({ id: job.id, type: stream, line })
+}
+
+console.log = (...args) => emit("stdout", args)
+console.info = (...args) => emit("stdout", args)
+console.debug = (...args) => emit("stdout", args)
+console.warn = (...args) => emit("stderr", args)
+console.error = (...args) => emit("stderr", args)
+
+// Work left running by a timed-out test must not take the runner down
+process.on("unhandledRejection", (error) => emit("stderr", [error]))
+process.on("uncaughtException", (error) => emit("stderr", [error]))
+
+// Workspaces are copies of one template, so configs are imported once per
+// distinct content rather than once per workspace
+const configCache = new Map()
+
+async function loadUseOptions(cwd) {
+  const configPath = path.join(cwd, "playwright.config.js")
+  let use = {}
+  try {
+    const hash = createHash("sha256").update(await readFile(configPath)).digest("hex")
+    if (!configCache.has(hash)) {
+      const url = pathToFileURL(configPath).href + `?runner-config=${hash}`
+      configCache.set(hash, ((await import(url)).default || {}).use || {})
+    }
+    use = configCache.get(hash)
+  } catch {}
+  // Tracing and video are only recorded by the Playwright CLI
+  const { headless, launchOptions, trace, video, ...contextOptions } = use
+  return contextOptions
+}
+
+function withTimeout(promise, timeout) {
+  let timer
+  const expired = new Promise((_, reject) => {
+    timer = setTimeout(() => {
+      const error = new Error(`Test timeout of ${timeout}ms exceeded.`)
+      error.timedOut = true
+      reject(error)
+    }, timeout)
+  })
+  return Promise.race([promise, expired]).finally(() => clearTimeout(timer))
+}
+
+function formatError(error, specUrl, relativePath) {
+  const text = error && error.stack ? error.stack : String(error)
+  return text.split(specUrl).join(relativePath)
+}
+
+function errorLocation(error, specUrl, spec) {
+  const stack = error && error.stack ? error.stack : ""
+  const index = stack.indexOf(specUrl + ":")
+  if (index === -1) return null
+  const match = /^:(\d+):(\d+)/.exec(stack.slice(index + specUrl.length))
+  return match ? { file: spec, line: Number(match[1]), column: Number(match[2]) } : null
+}
+
+function attachmentRecorder(testInfo) {
+  return async (name, options = {}) => {
+    testInfo.attachments.push({
+      name,
+      contentType: options.contentType || "application/octet-stream",
+      path: options.path,
+      body: options.body === undefined ? undefined : Buffer.from(options.body).toString("base64"),
+    })
+  }
+}
+
+async function loadSpec(spec) {
+  const specUrl = pathToFileURL(spec).href + `?runner-job=${job.id}`
+  resetRegistry()
+  await import(specUrl)
+  return { spec, specUrl, ...registry }
+}
+
+async function runSpec(loaded, onlyMode, contextOptions, counters, failures) {
+  const { spec, specUrl, beforeAll, afterAll, beforeEach, afterEach } = loaded
+  const relativePath = path.relative(job.cwd, spec)
+  // As with the CLI, test.only anywhere in the run limits it to those tests
+  const tests = onlyMode ? loaded.tests.filter((entry) => entry.only) : loaded.tests
+  if (tests.length === 0) return
+  const timeout = loaded.timeout || DEFAULT_TEST_TIMEOUT
+  const activeBrowser = await getBrowser()
+
+  for (const hook of beforeAll) await hook({ browser: activeBrowser })
+
+  for (const [index, entry] of tests.entries()) {
+    const label = `${relativePath} › ${entry.title}`
+    if (entry.skipped) {
+      counters.skipped += 1
+      emit("stdout", [`  -  ${index + 1} ${label}`])
+      continue
+    }
+
+    const context = await activeBrowser.newContext(contextOptions)
+    const page = await context.newPage()
+    const outputDir = path.join(job.cwd, "test-results", `${path.basename(spec, ".spec.js")}-${index}`)
+    const testInfo = {
+      title: entry.title,
+      file: spec,
+      retry: 0,
+      timeout,
+      status: "passed",
+      expectedStatus: "passed",
+      errors: [],
+      attachments: [],
+      duration: 0,
+      outputDir,
+      outputPath: (...segments) => path.join(outputDir, ...segments),
+    }
+    testInfo.attach = attachmentRecorder(testInfo)
+    const fixtures = {
+      page,
+      context,
+      browser: activeBrowser,
+      browserName: "chromium",
+      request: context.request,
+    }
+    const started = Date.now()
+    registry.current = testInfo
+
+    try {
+      for (const hook of beforeEach) await hook(fixtures, testInfo)
+      await withTimeout(Promise.resolve(entry.fn(fixtures, testInfo)), timeout)
+    } catch (error) {
+      if (isUnsupported(error)) {
+        await context.close().catch(() => {})
+        throw error
+      }
+      if (isSkip(error)) {
+        testInfo.status = "skipped"
+      } else {
+        testInfo.status = error && error.timedOut ? "timedOut" : "failed"
+        testInfo.errors.push(error)
+      }
+    }
+
+    for (const hook of afterEach) {
+      try {
+        await hook(fixtures, testInfo)
+      } catch (error) {
+        if (isUnsupported(error)) {
+          await context.close().catch(() => {})
+          throw error
+        }
+        testInfo.status = "failed"
+        testInfo.errors.push(error)
+      }
+    }
+
+    registry.current = null
+    testInfo.duration = Date.now() - started
+    await context.close().catch(() => {})
+
+    job.tests.push({
+      spec,
+      title: entry.title,
+      status: testInfo.status,
+      duration: testInfo.duration,
+      retry: 0,
+      errors: testInfo.errors.map((error) => ({
+        message: formatError(error, specUrl, relativePath),
+        location: errorLocation(error, specUrl, spec),
+      })),
+      attachments: testInfo.attachments,
+    })
+
+    const seconds = (testInfo.duration / 1000).toFixed(1)
+    if (testInfo.status === "passed") {
+      counters.passed += 1
+      emit("stdout", [`  ✓  ${index + 1} ${label} (${seconds}s)`])
+    } else if (testInfo.status === "skipped") {
+      counters.skipped += 1
+      emit("stdout", [`  -  ${index + 1} ${label}`])
+    } else {
+      counters.failed += 1
+      emit("stdout", [`  ✘  ${index + 1} ${label} (${seconds}s)`])
+      failures.push({
+        label,
+        errors: testInfo.errors.map((error) => formatError(error, specUrl, relativePath)),
+      })
+    }
+  }
+
+  for (const hook of afterAll) await hook({ browser: activeBrowser })
+}
+
+async function runJob(request) {
+  job = { id: request.id, cwd: request.cwd, stdout: [], stderr: [], tests: [] }
+  const counters = { passed: 0, failed: 0, skipped: 0 }
+  const failures = []
+
+  // Hooks in generated scripts write their side files relative to the cwd
+  process.chdir(request.cwd)
+
+  try {
+    const contextOptions = await loadUseOptions(request.cwd)
+    const loaded = []
+    for (const spec of request.specs) loaded.push(await loadSpec(spec))
+    const onlyMode = loaded.some(({ tests }) => tests.some((entry) => entry.only))
+    emit("stdout", [`\nRunning tests from ${request.specs.length} file(s) using 1 warm worker\n`])
+    for (const spec of loaded) {
+      await runSpec(spec, onlyMode, contextOptions, counters, failures)
+    }
+  } catch (error) {
+    if (isUnsupported(error)) {
+      registry.current = null
+      send({ id: job.id, type: "result", unsupported: error.message })
+      job = null
+      return
+    }
+    counters.failed += 1
+    failures.push({ label: "Error loading tests", errors: [formatError(error, "", "")] })
+  }
+
+  failures.forEach((failure, index) => {
+    emit("stdout", [`\n  ${index + 1}) ${failure.label}\n`])
+    failure.errors.forEach((error) => emit("stdout", [error.replace(/^/gm, "    ")]))
+  })
+
+  const summary = Object.entries(counters)
+    .filter(([, count]) => count > 0)
+    .map(([status, count]) => `  ${count} ${status}`)
+  emit("stdout", ["\n" + summary.join("\n")])
+
+  const success = counters.failed === 0 && counters.passed > 0
+  send({
+    id: job.id,
+    type: "result",
+    success,
+    exit_code: success ? 0 : 1,
+    stdout: job.stdout.join("\n"),
+    stderr: job.stderr.join("\n"),
+    tests: job.tests,
+  })
+  job = null
+}
+
+await getBrowser()
+send({ type: "ready" })
+
+let queue = Promise.resolve()
+const input = createInterface({ input: process.stdin })
+input.on("line", (line) => {
+  if (!line.trim()) return
+  const request = JSON.parse(line)
+  queue = queue.then(() => runJob(request))
+})
+input.on("close", async () => {
+  await queue
+  if (browser) await browser.close()
+  process.exit(0)
+})
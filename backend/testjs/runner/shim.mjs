@@ -0,0 +1,121 @@
+// Minimal stand-in for the `test` API of @playwright/test.
+// Calls made while a spec module is imported are collected into the registry,
+// which the runner then executes against its warm browser. APIs whose
+// semantics the runner does not reproduce (fixtures, expected failures) throw
+// an UnsupportedError, and the run falls back to the Playwright CLI.
+
+import { expect, devices } from "@playwright/test"
+
+export { expect, devices }
+
+class SkipError extends Error {}
+
+class UnsupportedError extends Error {}
+
+export const registry = {
+  tests: [],
+  beforeAll: [],
+  afterAll: [],
+  beforeEach: [],
+  afterEach: [],
+  describes: [],
+  onlyDepth: 0,
+  timeout: null,
+  current: null,
+}
+
+export function resetRegistry() {
+  registry.tests = []
+  registry.beforeAll = []
+  registry.afterAll = []
+  registry.beforeEach = []
+  registry.afterEach = []
+  registry.describes = []
+  registry.onlyDepth = 0
+  registry.timeout = null
+  registry.current = null
+}
+
+export function isSkip(error) {
+  return error instanceof SkipError
+}
+
+export function isUnsupported(error) {
+  return error instanceof UnsupportedError
+}
+
+function unsupported(name) {
+  return () => {
+    throw new UnsupportedError(`${name} is not supported by the persistent runner`)
+  }
+}
+
+function register(title, fn, skipped = false, only = false) {
+  registry.tests.push({
+    title: [...registry.describes, title].join(" › "),
+    fn,
+    skipped,
+    only: only || registry.onlyDepth > 0,
+  })
+}
+
+function skipOrRegister(args) {
+  if (typeof args[0] === "string") {
+    register(args[0], args[args.length - 1], true)
+  } else if (registry.current && (args.length === 0 || args[0])) {
+    throw new SkipError()
+  }
+}
+
+export function test(title, details, fn) {
+  register(title, fn || details)
+}
+
+function describe(title, fn) {
+  if (typeof title === "function") return title()
+  registry.describes.push(title)
+  try {
+    fn()
+  } finally {
+    registry.describes.pop()
+  }
+}
+
+function describeOnly(title, fn) {
+  registry.onlyDepth += 1
+  try {
+    describe(title, fn)
+  } finally {
+    registry.onlyDepth -= 1
+  }
+}
+
+describe.only = describeOnly
+describe.serial = describe
+describe.parallel = describe
+describe.serial.only = describeOnly
+describe.parallel.only = describeOnly
+describe.skip = () => {}
+describe.fixme = () => {}
+describe.configure = () => {}
+
+test.only = (title, details, fn) => register(title, fn || details, false, true)
+test.skip = (...args) => skipOrRegister(args)
+test.fixme = (...args) => skipOrRegister(args)
+test.fail = unsupported("test.fail")
+test.slow = () => {}
+test.describe = describe
+test.beforeAll = (fn) => registry.beforeAll.push(fn)
+test.afterAll = (fn) => registry.afterAll.push(fn)
+test.beforeEach = (fn) => registry.beforeEach.push(fn)
+test.afterEach = (fn) => registry.afterEach.push(fn)
+test.step = async (title, body) => body()
+test.setTimeout = (timeout) => {
+  registry.timeout = timeout
+}
+test.use = unsupported("test.use")
+test.info = () => registry.current
+test.extend = unsupported("test.extend")
+test.expect = expect
+
+export default test
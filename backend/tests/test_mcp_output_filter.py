@@ -0,0 +1,79 @@
+import asyncio
+import json
+
+from mcp.types import CallToolResult, TextContent
+from agents.mcp.util import MCPUtil
+from agents.run import CallModelData, ModelInputData
+
+from mcp_output_filter import SnapshotCompressor
+
+
+def snapshot(role: str, count: int) -> str:
+    nodes = "\n".join(f'- {role} "{role}{i}" [ref={role[0]}{i}]' for i in range(count))
+    return f"- Page Snapshot:\n```yaml\n{nodes}\n```"
+
+
+class FakeServer:
+    name = "playwright"
+    use_structured_content = False
+
+    def __init__(self, texts: list[str]):
+        self.texts = texts
+
+    async def call_tool(self, tool_name, arguments, meta=None):
+        return CallToolResult(content=[TextContent(type="text", text=text) for text in self.texts])
+
+
+class FakeTool:
+    name = "browser_snapshot"
+
+
+def stored_output(texts: list[str]):
+    """Tool output as the SDK stores it in the conversation history."""
+    return asyncio.run(MCPUtil.invoke_mcp_tool(FakeServer(texts), FakeTool(), None, "{}"))
+
+
+def filter_outputs(compressor: SnapshotCompressor, outputs: list) -> list:
+    data = CallModelData(
+        model_data=ModelInputData(
+            input=[
+                {"type": "function_call_output", "call_id": f"call_{i}", "output": output}
+                for i, output in enumerate(outputs)
+            ],
+            instructions="instructions",
+        ),
+        agent=None,
+        context=None,
+    )
+    return [item["output"] for item in compressor.filter_history(data).input]
+
+
+def test_elides_superseded_snapshots_in_sdk_tool_outputs():
+    compressor = SnapshotCompressor(max_snapshot_chars=30000, max_output_chars=40000)
+    # One content item, then several, as returned by the Playwright MCP
+    first = stored_output([compressor.compress(snapshot("button", 10))])
+    second = stored_output(["### Ran Playwright code", compressor.compress(snapshot("link", 10))])
+
+    old, current = filter_outputs(compressor, [first, second])
+
+    assert 'button0' not in str(old)
+    assert "Page Snapshot #1: omitted, superseded by snapshot #2" in str(old)
+    assert current == second
+
+
+def test_keeps_outputs_without_old_snapshots_byte_identical():
+    compressor = SnapshotCompressor(max_snapshot_chars=30000, max_output_chars=40000)
+    output = stored_output([compressor.compress(snapshot("button", 10))])
+
+    assert filter_outputs(compressor, [output]) == [output]
+
+
+def test_elides_raw_string_outputs():
+    compressor = SnapshotCompressor(max_snapshot_chars=30000, max_output_chars=40000)
+    first = compressor.compress(snapshot("button", 10))
+    compressor.compress(snapshot("link", 10))
+
+    [old] = filter_outputs(compressor, [first])
+
+    assert old == "- Page Snapshot #1: omitted, superseded by snapshot #2"
+    assert json.loads(json.dumps(old)) == old
@@ -0,0 +1,64 @@
+import asyncio
+import threading
+
+from run_recorder import RunRecorder, merge_runs
+
+
+def record(recorder, test_id):
+    recorder.record(
+        test_id,
+        {"success": True, "step_timings": [{"description": "Open page", "duration_ms": 12.0}]},
+    )
+
+
+def test_runs_being_flushed_stay_visible(monkeypatch):
+    inserting = threading.Event()
+    release = threading.Event()
+    inserted = []
+
+    def insert_runs(runs):
+        inserting.set()
+        release.wait(timeout=5)
+        inserted.extend(runs)
+
+    monkeypatch.setattr(RunRecorder, "_insert_runs", staticmethod(insert_runs))
+    monkeypatch.setattr(RunRecorder, "_update_tests", staticmethod(lambda updates: None))
+
+    async def scenario():
+        recorder = RunRecorder(batch_size=100, flush_interval=60, max_attempts=3)
+        record(recorder, "a")
+        record(recorder, "b")
+        flush = asyncio.create_task(recorder.flush())
+        await asyncio.to_thread(inserting.wait, 5)
+
+        record(recorder, "a")
+        pending = recorder.pending_runs("a")
+        assert len(pending) == 2
+        assert pending[0]["created_at"] >= pending[1]["created_at"]
+
+        release.set()
+        await flush
+        assert len(recorder.pending_runs("a")) == 1
+        assert len(inserted) == 2
+
+    asyncio.run(scenario())
+
+
+def test_merge_drops_runs_already_stored():
+    pending = [
+        {"created_at": "2026-10-18T06:20:02.500000+00:00", "step_timings": []},
+        {"created_at": "2026-10-18T06:20:01.250000+00:00", "step_timings": []},
+    ]
+    persisted = [
+        # The same run as the older pending one, as PostgREST formats it
+        {"created_at": "2026-10-18T06:20:01.25+00:00", "step_timings": []},
+        {"created_at": "2026-10-18T06:19:00+00:00", "step_timings": []},
+    ]
+
+    merged = merge_runs(pending, persisted, limit=10)
+    assert [run["created_at"] for run in merged] == [
+        pending[0]["created_at"],
+        pending[1]["created_at"],
+        persisted[1]["created_at"],
+    ]
+    assert len(merge_runs(pending, persisted, limit=2)) == 2
@@ -0,0 +1,32 @@
+from script_validation import check_step_calls, extract_step_descriptions, strip_comments
+
+SCRIPT = r'''
+test('checkout', async ({ page }) => {
+    // successful_step("Commented out");
+    /* successful_step("Block comment");
+       successful_step(dynamic); */
+    await page.goto("https://example.com//shop"); // successful_step("Trailing")
+    successful_step("Open the \x22shop\x22 page \u{2192} it's open");
+    successful_step('Keep /* this */ and // this');
+});
+'''
+
+
+def test_strip_comments_keeps_offsets_and_strings():
+    stripped = strip_comments(SCRIPT)
+
+    assert len(stripped) == len(SCRIPT)
+    assert stripped.count("\n") == SCRIPT.count("\n")
+    assert "https://example.com//shop" in stripped
+    assert "Commented out" not in stripped
+
+
+def test_extract_step_descriptions_skips_comments_and_decodes_escapes():
+    assert extract_step_descriptions(SCRIPT) == [
+        "Open the \"shop\" page → it's open",
+        "Keep /* this */ and // this",
+    ]
+
+
+def test_check_step_calls_ignores_commented_calls():
+    assert check_step_calls(SCRIPT) == []
@@ -1,12 +1,25 @@
 import os
+import json
+import asyncio
 import shutil
+import glob
+import hashlib
+import base64
+import re
+import signal
 import subprocess
 import tempfile
+import time
 import logging
-from collections.abc import AsyncIterator
+from collections.abc import AsyncIterator, Callable
 
 from agents import ItemHelpers, StreamEvent
 
+from generation_budget import UsageTracker
+
+
+# Prefix of the stdout line successful_step prints so steps can be streamed live
+STEP_MARKER = "[successful_step] "
 
 successful_step_definition = r"""
 import * as fs from "fs";
@@ -15,19 +28,91 @@ import * as path from "path";
 const completed_steps = [];
 
 function successful_step(description) {
-    completed_steps.push(description);
+    completed_steps.push({ description, at: performance.now() });
+    console.log(`[successful_step] ${JSON.stringify(description)}`);
 }
 
 """
 
+# Definition stored at the top of scripts saved before steps were streamed
+legacy_successful_step_definitions = [
+    r"""
+import * as fs from "fs";
+import * as path from "path";
+
+const completed_steps = [];
+
+function successful_step(description) {
+    completed_steps.push(description);
+}
+
+""",
+]
+
+# Completed steps and their timings are attached to the test result, so they
+# arrive in the structured report alongside errors and screenshots. Times come
+# from the monotonic high-resolution clock: started_ms is the offset from the
+# start of the test, duration_ms the time since the previous step.
 post_test_file_write = r"""
-test.afterEach(async () => {
-    const outputPath = path.join(process.cwd(), 'completed_steps.json');
-    fs.writeFileSync(outputPath, JSON.stringify(completed_steps, null, 2));
+let steps_started_at = performance.now();
+
+test.beforeEach(async () => {
+    completed_steps.length = 0;
+    steps_started_at = performance.now();
+});
+
+test.afterEach(async ({}, testInfo) => {
+    let previous = steps_started_at;
+    const round = (ms) => Math.round(ms * 1000) / 1000;
+    const steps = completed_steps.map(({ description, at }) => {
+        const step = {
+            description,
+            started_ms: round(previous - steps_started_at),
+            duration_ms: round(at - previous),
+        };
+        previous = at;
+        return step;
+    });
+    await testInfo.attach('steps', { body: JSON.stringify(steps), contentType: 'application/json' });
 });
 """
 
 screenshot_on_failure = r"""
+// Failure screenshots are re-encoded to save storage, configured through the environment
+const ARTIFACT_FORMAT = process.env.ARTIFACT_FORMAT || 'webp';
+const ARTIFACT_QUALITY = Number(process.env.ARTIFACT_QUALITY || 75);
+const ARTIFACT_MAX_WIDTH = Number(process.env.ARTIFACT_MAX_WIDTH || 0);
+const ARTIFACT_THUMBNAIL_WIDTH = Number(process.env.ARTIFACT_THUMBNAIL_WIDTH || 320);
+
+// Encodes a PNG with the browser's canvas, which supports WebP and JPEG. This
+// runs on the test's own page but never attaches anything to its DOM, so the
+// video and trace screencast only show the test. The image is decoded from a
+// Blob rather than a data: URL, which the page's CSP could block.
+async function encode_artifact(page, png, maxWidth) {
+    if (ARTIFACT_FORMAT === 'png' && !maxWidth) {
+        return { data: png, extension: 'png' };
+    }
+    const dataUrl = await page.evaluate(async ({ data, mime, quality, maxWidth }) => {
+        const bytes = Uint8Array.from(atob(data), (c) => c.charCodeAt(0));
+        const image = await createImageBitmap(new Blob([bytes], { type: 'image/png' }));
+        const scale = maxWidth > 0 && image.width > maxWidth ? maxWidth / image.width : 1;
+        const canvas = document.createElement('canvas');
+        canvas.width = Math.round(image.width * scale);
+        canvas.height = Math.round(image.height * scale);
+        canvas.getContext('2d').drawImage(image, 0, 0, canvas.width, canvas.height);
+        image.close();
+        return canvas.toDataURL(mime, quality);
+    }, {
+        data: png.toString('base64'),
+        mime: `image/${ARTIFACT_FORMAT}`,
+        quality: ARTIFACT_QUALITY / 100,
+        maxWidth,
+    });
+    // Browsers fall back to PNG for formats they cannot encode
+    const extension = dataUrl.slice('data:image/'.length, dataUrl.indexOf(';'));
+    return { data: Buffer.from(dataUrl.split(',')[1], 'base64'), extension };
+}
+
 test.afterEach(async ({ page }, testInfo) => {
     console.log(`[Screenshot] Test status: ${testInfo.status}, Expected: ${testInfo.expectedStatus}`);
     if (testInfo.status !== testInfo.expectedStatus) {
@@ -35,19 +120,37 @@ test.afterEach(async ({ page }, testInfo) => {
         try {
             const crypto = await import('crypto');
             const screenshotId = crypto.randomUUID();
-            const screenshotPath = path.join(process.cwd(), `${screenshotId}.png`);
             console.log(`[Screenshot] Screenshot ID: ${screenshotId}`);
-            console.log(`[Screenshot] Screenshot path: ${screenshotPath}`);
 
-            await page.screenshot({
+            const png = await page.screenshot({ fullPage: false });
+            let screenshot = { data: png, extension: 'png' };
+            let thumbnail = null;
+            try {
+                screenshot = await encode_artifact(page, png, ARTIFACT_MAX_WIDTH);
+                if (ARTIFACT_THUMBNAIL_WIDTH > 0) {
+                    thumbnail = await encode_artifact(page, png, ARTIFACT_THUMBNAIL_WIDTH);
+                }
+            } catch (error) {
+                console.error('[Screenshot] Failed to encode screenshot, keeping PNG:', error);
+            }
+
+            const screenshotPath = testInfo.outputPath(`${screenshotId}.${screenshot.extension}`);
+            fs.mkdirSync(path.dirname(screenshotPath), { recursive: true });
+            fs.writeFileSync(screenshotPath, screenshot.data);
+            await testInfo.attach('screenshot', {
                 path: screenshotPath,
-                fullPage: false
+                contentType: `image/${screenshot.extension}`,
             });
-            console.log('[Screenshot] Screenshot captured successfully');
-
-            const idOutputPath = path.join(process.cwd(), 'screenshot_id.json');
-            fs.writeFileSync(idOutputPath, JSON.stringify({ screenshot_id: screenshotId }, null, 2));
-            console.log(`[Screenshot] Screenshot ID written to ${idOutputPath}`);
+            console.log(`[Screenshot] Screenshot captured successfully (${png.length} -> ${screenshot.data.length} bytes)`);
+
+            if (thumbnail) {
+                const thumbnailPath = testInfo.outputPath(`${screenshotId}.thumb.${thumbnail.extension}`);
+                fs.writeFileSync(thumbnailPath, thumbnail.data);
+                await testInfo.attach('thumbnail', {
+                    path: thumbnailPath,
+                    contentType: `image/${thumbnail.extension}`,
+                });
+            }
         } catch (error) {
             console.error('[Screenshot] Failed to capture screenshot:', error);
         }
@@ -68,14 +171,31 @@ def add_post_test_file_write(script: str) -> str:
 def add_step_logging_to_test_script(script: str) -> str:
     """
     Adds the successful_step function to the start of the test script
+
+    A definition already at the start of the script (current or legacy) is
+    replaced, so stored scripts always run with the current one.
     """
+    for definition in [successful_step_definition, *legacy_successful_step_definitions]:
+        if script.startswith(definition):
+            script = script[len(definition):]
+            break
     return successful_step_definition + script
 
 
-async def print_result_stream(stream: AsyncIterator[StreamEvent], logger):
+async def print_result_stream(
+    stream: AsyncIterator[StreamEvent],
+    logger,
+    progress: dict | None = None,
+    usage: UsageTracker | None = None,
+):
     """Log events from the result stream.
     Args:
         stream: An async iterator yielding StreamEvent objects.
+        progress: Optional dict updated with "turns" and "tool_calls" counts,
+            and "usage" when a tracker is given.
+        usage: Optional tracker recording each response's token usage. Returns
+            early, leaving the rest of the stream unread, once its budget is
+            used up.
     """
     import tiktoken
 
@@ -84,6 +204,16 @@ async def print_result_stream(stream: AsyncIterator[StreamEvent], logger):
     async for event in stream:
         # Ignore raw response deltas to avoid token-by-token noise
         if event.type == "raw_response_event":
+            if event.data.type == "response.completed":
+                if progress is not None:
+                    progress["turns"] = progress.get("turns", 0) + 1
+                if usage is not None:
+                    exceeded = usage.add(event.data.response.usage)
+                    if progress is not None:
+                        progress["usage"] = usage.snapshot()
+                    if exceeded:
+                        logger.warning(f"[Budget] {exceeded} budget used up, stopping after this turn")
+                        return
             continue
         # When the agent updates
         elif event.type == "agent_updated_stream_event":
@@ -96,6 +226,8 @@ async def print_result_stream(stream: AsyncIterator[StreamEvent], logger):
                     "name",
                     "unknown_tool",
                 )
+                if progress is not None:
+                    progress["tool_calls"] = progress.get("tool_calls", 0) + 1
                 # tool_args = getattr(
                 #     event.item.raw_item,
                 #     "arguments",
@@ -126,6 +258,95 @@ async def print_result_stream(stream: AsyncIterator[StreamEvent], logger):
 
 # Workspace Management Functions
 
+TESTJS_TEMPLATE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "testjs")
+
+# Files that determine the contents of node_modules
+DEPENDENCY_MANIFEST_FILES = ["package.json", "package-lock.json"]
+
+_dependency_cache_lock = asyncio.Lock()
+
+# Caches of older manifests are kept this long after their last use
+DEPENDENCY_CACHE_GRACE_SECONDS = float(os.getenv("TESTJS_DEPS_CACHE_GRACE_HOURS", "24")) * 3600
+
+
+async def kill_process_tree(process: asyncio.subprocess.Process):
+    """
+    Kill a process started with start_new_session=True along with its
+    children (e.g. npx -> node -> browser) and reap it.
+    """
+    if process.returncode is None:
+        try:
+            os.killpg(process.pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+        except PermissionError:
+            process.kill()
+    await process.wait()
+
+
+async def run_subprocess(
+    command: list[str],
+    cwd: str,
+    timeout: float,
+    on_output: Callable[[str, str], None] | None = None,
+    env: dict[str, str] | None = None,
+) -> subprocess.CompletedProcess:
+    """
+    Run a command without blocking the event loop and capture its output.
+
+    Args:
+        command: Program and arguments to execute
+        cwd: Working directory for the command
+        timeout: Seconds before the process is killed
+        on_output: Optional callback receiving ("stdout" | "stderr", line) as lines arrive
+        env: Optional extra environment variables for the command
+
+    Returns:
+        CompletedProcess with decoded stdout and stderr
+
+    Raises:
+        subprocess.TimeoutExpired: If the command did not finish in time
+
+    The process and its children are also killed if the calling task is
+    cancelled.
+    """
+    process = await asyncio.create_subprocess_exec(
+        *command,
+        cwd=cwd,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+        env={**os.environ, **env} if env else None,
+        start_new_session=True,
+    )
+
+    async def read_lines(stream: asyncio.StreamReader, name: str) -> str:
+        lines = []
+        while line := await stream.readline():
+            text = line.decode(errors="replace")
+            lines.append(text)
+            if on_output:
+                on_output(name, text.rstrip("\n"))
+        return "".join(lines)
+
+    async def communicate() -> tuple[str, str]:
+        stdout, stderr = await asyncio.gather(
+            read_lines(process.stdout, "stdout"), read_lines(process.stderr, "stderr")
+        )
+        await process.wait()
+        return stdout, stderr
+
+    try:
+        stdout, stderr = await asyncio.wait_for(communicate(), timeout)
+    except asyncio.TimeoutError:
+        await kill_process_tree(process)
+        raise subprocess.TimeoutExpired(command, timeout)
+    finally:
+        # Cancelled, e.g. by a client disconnect or a cancelled generation
+        if process.returncode is None:
+            await kill_process_tree(process)
+
+    return subprocess.CompletedProcess(command, process.returncode, stdout, stderr)
+
 
 def create_workspace(instance_id: str) -> tuple[str, str]:
     """
@@ -164,7 +385,7 @@ def setup_testjs_workspace(workspace_dir: str, logger: logging.Logger = None) ->
     os.makedirs(tests_dir, exist_ok=True)
 
     # Copy config files from original testjs
-    original_testjs = os.path.join(os.path.dirname(os.path.abspath(__file__)), "testjs")
+    original_testjs = TESTJS_TEMPLATE_DIR
 
     for config_file in ["playwright.config.js", "package.json"]:
         workspace_config = os.path.join(testjs_dir, config_file)
@@ -178,10 +399,184 @@ def setup_testjs_workspace(workspace_dir: str, logger: logging.Logger = None) ->
     return testjs_dir
 
 
-def install_test_dependencies(testjs_dir: str, logger: logging.Logger = None) -> bool:
+# Settings read by playwright.config.js to record traces and videos
+DEBUG_ARTIFACT_MODES = {
+    "on_failure": {
+        "PLAYWRIGHT_TRACE": "retain-on-failure",
+        "PLAYWRIGHT_VIDEO": "retain-on-failure",
+    },
+    "on_retry": {
+        "PLAYWRIGHT_TRACE": "on-first-retry",
+        "PLAYWRIGHT_VIDEO": "on-first-retry",
+        "PLAYWRIGHT_RETRIES": "1",
+    },
+}
+
+
+def get_dependency_cache_root() -> str:
+    """
+    Get the directory holding the shared node_modules caches.
+
+    Returns:
+        Path to the cache root (TESTJS_DEPS_CACHE_DIR or a temp directory)
+    """
+    return os.getenv("TESTJS_DEPS_CACHE_DIR") or os.path.join(
+        tempfile.gettempdir(), "playwright_deps_cache"
+    )
+
+
+def get_dependency_cache_key(manifest_dir: str = TESTJS_TEMPLATE_DIR) -> str:
+    """
+    Compute the cache key for a set of npm dependencies.
+
+    The key is a hash of package.json and package-lock.json, so any change to
+    the manifest produces a new key and the cache is rebuilt.
+
+    Args:
+        manifest_dir: Directory holding the manifest (testjs by default)
+
+    Returns:
+        Hex digest identifying the current dependency set
+    """
+    hasher = hashlib.sha256()
+    for manifest in DEPENDENCY_MANIFEST_FILES:
+        manifest_path = os.path.join(manifest_dir, manifest)
+        hasher.update(manifest.encode())
+        if os.path.exists(manifest_path):
+            with open(manifest_path, "rb") as f:
+                hasher.update(f.read())
+    return hasher.hexdigest()[:16]
+
+
+def get_dependency_cache_dir(manifest_dir: str = TESTJS_TEMPLATE_DIR) -> str:
+    """
+    Get the cache directory for the current contents of a manifest.
+
+    Args:
+        manifest_dir: Directory holding the manifest (testjs by default)
+
+    Returns:
+        Path to <cache root>/<manifest dir name>/<cache key>
+    """
+    return os.path.join(
+        get_dependency_cache_root(),
+        os.path.basename(manifest_dir),
+        get_dependency_cache_key(manifest_dir),
+    )
+
+
+async def ensure_dependency_cache(
+    logger: logging.Logger = None, manifest_dir: str = TESTJS_TEMPLATE_DIR
+) -> str | None:
+    """
+    Build the shared node_modules cache for the current manifest if needed.
+
+    The install runs in a scratch directory which is atomically renamed into
+    place, so concurrent callers never see a partially installed cache.
+
+    Args:
+        logger: Optional logger for logging operations
+        manifest_dir: Directory holding the manifest (testjs by default)
+
+    Returns:
+        Path to the cached node_modules directory, or None if the build failed
+    """
+    cache_dir = get_dependency_cache_dir(manifest_dir)
+    cache_root, cache_key = os.path.split(cache_dir)
+    cached_node_modules = os.path.join(cache_dir, "node_modules")
+
+    if os.path.isdir(cached_node_modules):
+        # Last use, so pruning leaves caches that are still handed out alone
+        os.utime(cache_dir)
+        return cached_node_modules
+
+    async with _dependency_cache_lock:
+        if os.path.isdir(cached_node_modules):
+            os.utime(cache_dir)
+            return cached_node_modules
+
+        os.makedirs(cache_root, exist_ok=True)
+        build_dir = tempfile.mkdtemp(prefix=f"{cache_key}.build.", dir=cache_root)
+
+        for manifest in DEPENDENCY_MANIFEST_FILES:
+            manifest_path = os.path.join(manifest_dir, manifest)
+            if os.path.exists(manifest_path):
+                shutil.copy2(manifest_path, os.path.join(build_dir, manifest))
+
+        has_lockfile = os.path.exists(os.path.join(build_dir, "package-lock.json"))
+        command = ["npm", "ci"] if has_lockfile else ["npm", "install"]
+
+        if logger:
+            logger.info(f"Building dependency cache {cache_key} with {' '.join(command)}")
+
+        try:
+            result = await run_subprocess(command, cwd=build_dir, timeout=120)
+            if result.returncode != 0:
+                raise RuntimeError(result.stderr.strip() or result.stdout.strip())
+        except Exception as e:
+            if logger:
+                logger.warning(f"Failed to build dependency cache: {e}")
+            shutil.rmtree(build_dir, ignore_errors=True)
+            return None
+
+        try:
+            os.rename(build_dir, cache_dir)
+        except OSError:
+            # Another process finished the same build first
+            shutil.rmtree(build_dir, ignore_errors=True)
+
+        prune_dependency_caches(cache_root, keep=cache_key)
+
+        if logger:
+            logger.info(f"Dependency cache ready at {cache_dir}")
+
+    return cached_node_modules
+
+
+def _referenced_dependency_caches() -> set[str]:
+    """Cache directories that workspace node_modules symlinks point into."""
+    referenced = set()
+    pattern = os.path.join(tempfile.gettempdir(), "playwright_test_*", "testjs", "node_modules")
+    for link in glob.glob(pattern):
+        if os.path.islink(link):
+            referenced.add(os.path.dirname(os.path.realpath(link)))
+    return referenced
+
+
+def prune_dependency_caches(cache_root: str, keep: str):
+    """
+    Remove caches built from older manifests once nothing uses them.
+
+    A cache is removed only if no workspace links to it and it was last
+    handed out more than DEPENDENCY_CACHE_GRACE_SECONDS ago, so executions
+    and runners still on an older cache keep working.
+
+    Args:
+        cache_root: Directory holding the caches of one manifest
+        keep: Cache key to keep regardless
+    """
+    referenced = _referenced_dependency_caches()
+    cutoff = time.time() - DEPENDENCY_CACHE_GRACE_SECONDS
+    for entry in os.listdir(cache_root):
+        # Entries with a dot are builds in progress
+        if entry == keep or "." in entry:
+            continue
+        path = os.path.join(cache_root, entry)
+        try:
+            if os.path.realpath(path) in referenced or os.path.getmtime(path) >= cutoff:
+                continue
+        except OSError:
+            continue
+        shutil.rmtree(path, ignore_errors=True)
+
+
+async def install_test_dependencies(testjs_dir: str, logger: logging.Logger = None) -> bool:
     """
     Install npm dependencies in the testjs workspace.
 
+    node_modules is symlinked from the shared dependency cache, falling back
+    to a local npm install if the cache cannot be built.
+
     Args:
         testjs_dir: Path to the testjs directory
         logger: Optional logger for logging operations
@@ -190,20 +585,25 @@ def install_test_dependencies(testjs_dir: str, logger: logging.Logger = None) ->
         True if successful, False otherwise
     """
     node_modules = os.path.join(testjs_dir, "node_modules")
-    if os.path.exists(node_modules):
+    if os.path.lexists(node_modules):
         return True
 
+    cached_node_modules = await ensure_dependency_cache(logger)
+    if cached_node_modules:
+        try:
+            os.symlink(cached_node_modules, node_modules, target_is_directory=True)
+            if logger:
+                logger.info(f"Linked cached dependencies into {testjs_dir}")
+            return True
+        except OSError as e:
+            if logger:
+                logger.warning(f"Failed to link cached dependencies: {e}")
+
     if logger:
         logger.info(f"Installing dependencies in {testjs_dir}...")
 
     try:
-        subprocess.run(
-            ["npm", "install"],
-            cwd=testjs_dir,
-            capture_output=True,
-            text=True,
-            timeout=120,
-        )
+        await run_subprocess(["npm", "install"], cwd=testjs_dir, timeout=120)
         return True
     except Exception as e:
         if logger:
@@ -211,46 +611,329 @@ def install_test_dependencies(testjs_dir: str, logger: logging.Logger = None) ->
         return False
 
 
-def run_tests(testjs_dir: str, logger: logging.Logger = None) -> tuple[bool, str]:
+_browser_binaries_verified = False
+
+
+async def verify_browser_binaries(testjs_dir: str, logger: logging.Logger = None) -> bool:
+    """
+    Make sure the Chromium build used by the installed Playwright exists.
+
+    Installs it with `npx playwright install chromium` when missing. The
+    result is remembered for the lifetime of the process.
+
+    Args:
+        testjs_dir: Path to a testjs directory with dependencies installed
+        logger: Optional logger for logging operations
+
+    Returns:
+        True if the browser binaries are available, False otherwise
+    """
+    global _browser_binaries_verified
+    if _browser_binaries_verified:
+        return True
+
+    check_script = (
+        "const { chromium } = require('@playwright/test');"
+        "process.exit(require('fs').existsSync(chromium.executablePath()) ? 0 : 1);"
+    )
+
+    try:
+        result = await run_subprocess(
+            ["node", "-e", check_script], cwd=testjs_dir, timeout=30
+        )
+        if result.returncode != 0:
+            if logger:
+                logger.info("Browser binaries missing, installing chromium...")
+            result = await run_subprocess(
+                ["npx", "playwright", "install", "chromium"],
+                cwd=testjs_dir,
+                timeout=300,
+            )
+        _browser_binaries_verified = result.returncode == 0
+    except Exception as e:
+        if logger:
+            logger.warning(f"Failed to verify browser binaries: {e}")
+
+    return _browser_binaries_verified
+
+
+async def run_tests(
+    testjs_dir: str,
+    logger: logging.Logger = None,
+    on_output: Callable[[str, str], None] | None = None,
+    debug_artifacts: str | None = None,
+) -> tuple[bool, str, dict[str, dict]]:
     """
     Run playwright tests in the testjs workspace.
 
+    Uses a warm persistent runner when available, otherwise `npm run test`.
+    Waits for a free test execution slot first.
+
     Args:
         testjs_dir: Path to the testjs directory
         logger: Optional logger for logging operations
+        on_output: Optional callback receiving ("stdout" | "stderr", line) as lines arrive
+        debug_artifacts: Optional DEBUG_ARTIFACT_MODES key recording traces and
+            videos into test-results/, which needs the Playwright CLI
 
     Returns:
-        Tuple of (success: bool, output: str)
+        Tuple of (success: bool, output: str, structured reports by spec name,
+        see build_spec_report)
     """
+    from resource_scheduler import test_executions
+
+    async with test_executions.slot():
+        return await _run_tests(testjs_dir, logger, on_output, debug_artifacts)
+
+
+async def _run_tests(
+    testjs_dir: str,
+    logger: logging.Logger = None,
+    on_output: Callable[[str, str], None] | None = None,
+    debug_artifacts: str | None = None,
+) -> tuple[bool, str, dict[str, dict]]:
+    from playwright_runner import runner_pool, RunnerUnavailableError
+
     if logger:
         logger.info(f"Running tests from {testjs_dir}...")
 
+    if runner_pool.enabled and not debug_artifacts:
+        try:
+            def forward_event(event: dict):
+                if event["type"] in ("stdout", "stderr"):
+                    on_output(event["type"], event["line"])
+
+            success, output, tests = await runner_pool.run(
+                testjs_dir, timeout=60, on_event=forward_event if on_output else None
+            )
+            if logger:
+                logger.info(f"Test execution completed. Output:\n{output}")
+
+            spec_tests = {}
+            for test in tests:
+                spec_tests.setdefault(_spec_name(test["spec"]), []).append(test)
+            reports = {name: build_spec_report(tests) for name, tests in spec_tests.items()}
+            return success, output, reports
+        except TimeoutError:
+            error_msg = "Test execution timed out"
+            if logger:
+                logger.error(error_msg)
+            return False, f"ERROR: {error_msg}", {}
+        except RunnerUnavailableError as e:
+            if logger:
+                logger.warning(f"Persistent runner unavailable, using npm: {e}")
+
+    report_path = os.path.join(testjs_dir, "results.json")
     try:
-        result = subprocess.run(
-            ["npm", "run", "test"],
+        result = await run_subprocess(
+            ["npm", "run", "test", "--", "--reporter=list,json"],
             cwd=testjs_dir,
-            capture_output=True,
-            text=True,
-            timeout=60,
+            # A retry runs the test a second time
+            timeout=120 if debug_artifacts else 60,
+            on_output=on_output,
+            env={
+                "PLAYWRIGHT_JSON_OUTPUT_NAME": report_path,
+                **DEBUG_ARTIFACT_MODES.get(debug_artifacts, {}),
+            },
         )
         output = f"STDOUT:\n{result.stdout}\n\nSTDERR:\n{result.stderr}\n\nReturn Code: {result.returncode}"
 
         if logger:
             logger.info(f"Test execution completed. Output:\n{output}")
 
-        return result.returncode == 0, output
+        reports = {}
+        try:
+            with open(report_path, "r") as f:
+                reports = parse_json_report(json.load(f))
+        except Exception as e:
+            if logger:
+                logger.warning(f"Failed to read JSON report: {e}")
+
+        return result.returncode == 0, output, reports
 
     except subprocess.TimeoutExpired:
         error_msg = "Test execution timed out"
         if logger:
             logger.error(error_msg)
-        return False, f"ERROR: {error_msg}"
+        return False, f"ERROR: {error_msg}", {}
 
     except Exception as e:
         error_msg = f"Error during test execution: {e}"
         if logger:
             logger.error(error_msg)
-        return False, f"ERROR: {str(e)}"
+        return False, f"ERROR: {str(e)}", {}
+
+
+def _collect_report_specs(suite: dict) -> list[dict]:
+    specs = list(suite.get("specs", []))
+    for child in suite.get("suites", []):
+        specs.extend(_collect_report_specs(child))
+    return specs
+
+
+def _spec_name(path: str) -> str:
+    return os.path.basename(path).removesuffix(".spec.js")
+
+
+def _strip_ansi(text: str) -> str:
+    return re.sub(r"\x1b\[[0-9;]*m", "", text)
+
+
+def build_spec_report(tests: list[dict], retries: int = 0) -> dict:
+    """
+    Combine the final results of a spec's tests into one structured report.
+
+    Args:
+        tests: Final attempt of each test, shaped like a Playwright JSON
+            reporter result (status, duration, errors, attachments)
+        retries: Number of retries the spec's tests needed
+
+    Returns:
+        dict with success, status, duration_ms, retries, steps (description,
+        started_ms and duration_ms, from the "steps" attachment), step_log
+        (whether any test attached its steps), errors (message and location)
+        and file attachments (name, path, content_type)
+    """
+    status = "passed"
+    steps, errors, attachments = [], [], []
+    step_log = False
+
+    for test in tests:
+        if status == "passed" and test.get("status") not in ("passed", "skipped"):
+            status = test.get("status")
+        for error in test.get("errors", []):
+            errors.append(
+                {
+                    "message": _strip_ansi(error.get("message") or error.get("stack") or ""),
+                    "location": error.get("location"),
+                }
+            )
+        for attachment in test.get("attachments", []):
+            if attachment.get("name") == "steps" and attachment.get("body"):
+                steps.extend(json.loads(base64.b64decode(attachment["body"])))
+                step_log = True
+            elif attachment.get("path"):
+                attachments.append(
+                    {
+                        "name": attachment["name"],
+                        "path": attachment["path"],
+                        "content_type": attachment.get("contentType"),
+                    }
+                )
+
+    return {
+        "success": status == "passed" and any(t.get("status") == "passed" for t in tests),
+        "status": status,
+        "duration_ms": sum(test.get("duration", 0) for test in tests),
+        "retries": retries,
+        "steps": steps,
+        "step_log": step_log,
+        "errors": errors,
+        "attachments": attachments,
+    }
+
+
+def parse_json_report(report: dict) -> dict[str, dict]:
+    """
+    Map a Playwright JSON report to per-spec structured reports.
+
+    Args:
+        report: Parsed output of Playwright's JSON reporter
+
+    Returns:
+        Dict of spec name (file name without .spec.js) to its build_spec_report
+        result, with the spec's own console output added as "output"
+    """
+    results = {}
+    for file_suite in report.get("suites", []):
+        spec_name = _spec_name(file_suite.get("file", ""))
+        specs = _collect_report_specs(file_suite)
+
+        final_results, retries = [], 0
+        stdout, stderr, errors = [], [], []
+        for spec in specs:
+            for test in spec.get("tests", []):
+                test_results = test.get("results", [])
+                if test_results:
+                    final_results.append(test_results[-1])
+                    retries = max(retries, len(test_results) - 1)
+                for result in test_results:
+                    stdout.extend(chunk.get("text", "") for chunk in result.get("stdout", []))
+                    stderr.extend(chunk.get("text", "") for chunk in result.get("stderr", []))
+                    for error in result.get("errors", []):
+                        errors.append(f"{spec.get('title')}:\n{error.get('stack') or error.get('message', '')}")
+
+        spec_report = build_spec_report(final_results, retries)
+        spec_report["output"] = (
+            f"STDOUT:\n{''.join(stdout)}\n" + "\n".join(errors)
+            + f"\n\nSTDERR:\n{''.join(stderr)}\n\nReturn Code: {0 if spec_report['success'] else 1}"
+        )
+        results[spec_name] = spec_report
+
+    return results
+
+
+async def run_test_batch(
+    testjs_dir: str, workers: int, timeout: int, logger: logging.Logger = None
+) -> dict[str, dict]:
+    """
+    Run every spec in the workspace with one `playwright test` invocation.
+
+    Playwright's own worker processes share the runner and browser startup
+    across the batch, and the JSON reporter output is mapped back per spec.
+
+    Args:
+        testjs_dir: Path to the testjs directory holding tests/<name>.spec.js files
+        workers: Number of Playwright workers
+        timeout: Seconds before the whole batch is abandoned
+        logger: Optional logger for logging operations
+
+    Returns:
+        Dict of spec name to its structured report (see parse_json_report);
+        specs missing from the report are absent
+    """
+    report_path = os.path.join(testjs_dir, "results.json")
+    command = ["npx", "playwright", "test", f"--workers={workers}", "--reporter=json"]
+
+    if logger:
+        logger.info(f"Running test batch from {testjs_dir} with {workers} workers...")
+
+    from resource_scheduler import test_executions
+
+    # Each Playwright worker runs its own browser
+    async with test_executions.slot(workers):
+        process = await asyncio.create_subprocess_exec(
+            *command,
+            cwd=testjs_dir,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+            env={**os.environ, "PLAYWRIGHT_JSON_OUTPUT_NAME": report_path},
+            start_new_session=True,
+        )
+        try:
+            _, stderr = await asyncio.wait_for(process.communicate(), timeout)
+        except asyncio.TimeoutError:
+            await kill_process_tree(process)
+            if logger:
+                logger.error("Test batch timed out")
+            return {}
+        finally:
+            if process.returncode is None:
+                await kill_process_tree(process)
+
+    try:
+        with open(report_path, "r") as f:
+            report = json.load(f)
+    except Exception as e:
+        if logger:
+            logger.error(f"Failed to read JSON report: {e}\n{stderr.decode(errors='replace')}")
+        return {}
+
+    results = parse_json_report(report)
+    if logger:
+        passed = sum(spec_report["success"] for spec_report in results.values())
+        logger.info(f"Test batch completed: {passed}/{len(results)} passed")
+    return results
 
 
 def cleanup_workspace(instance_id: str, keep_tests: bool = False) -> bool:
@@ -278,7 +961,10 @@ def cleanup_workspace(instance_id: str, keep_tests: bool = False) -> bool:
 
             if os.path.exists(browser_data):
                 shutil.rmtree(browser_data)
-            if os.path.exists(node_modules):
+            if os.path.islink(node_modules):
+                # Shared dependency cache, only remove the link
+                os.unlink(node_modules)
+            elif os.path.exists(node_modules):
                 shutil.rmtree(node_modules)
         else:
             shutil.rmtree(workspace_dir)
@@ -0,0 +1,231 @@
+"""
+Warm Pool of Test Execution Workspaces
+
+Keeps a configurable number of workspaces provisioned by a background asyncio
+task (config copied, dependencies linked, browser binaries verified) so test
+executions only have to write their spec file and run it. Scrubbing and
+deleting released workspaces runs in a worker thread, off the event loop.
+"""
+
+import os
+import glob
+import asyncio
+import shutil
+import logging
+import tempfile
+import uuid
+
+from utils import (
+    create_workspace,
+    setup_testjs_workspace,
+    install_test_dependencies,
+    verify_browser_binaries,
+    get_dependency_cache_dir,
+)
+
+logger = logging.getLogger("workspace_pool")
+
+# Files and directories produced by a test run that must not leak into the next one
+RUN_ARTIFACTS = [
+    "results.json",
+    "test-results",
+    "playwright-report",
+    "*.png",
+]
+
+
+def _workspace_path(name: str) -> str:
+    return os.path.join(tempfile.gettempdir(), f"playwright_test_{name}")
+
+
+class WorkspacePool:
+    """Background-maintained pool of ready-to-run testjs workspaces."""
+
+    def __init__(self, size: int):
+        self.size = size
+        self._ready: asyncio.Queue[str] = asyncio.Queue()
+        self._refill = asyncio.Event()
+        self._task: asyncio.Task | None = None
+        # Released workspaces being scrubbed, counted against the pool size
+        self._returning = 0
+
+    def start(self):
+        """Start the background task that keeps the pool filled."""
+        if self.size <= 0 or self._task is not None:
+            return
+        self._task = asyncio.create_task(self._maintain())
+
+    async def stop(self):
+        """Stop the background task and remove idle workspaces."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        while not self._ready.empty():
+            pool_id = self._ready.get_nowait()
+            await asyncio.to_thread(shutil.rmtree, _workspace_path(pool_id), ignore_errors=True)
+
+    async def _maintain(self):
+        while True:
+            while self._ready.qsize() < self.size:
+                pool_id = await self._provision()
+                if pool_id is None:
+                    break
+                self._ready.put_nowait(pool_id)
+            try:
+                await asyncio.wait_for(self._refill.wait(), timeout=30)
+            except asyncio.TimeoutError:
+                pass
+            self._refill.clear()
+
+    async def _provision(self) -> str | None:
+        """Provision a fresh pooled workspace and return its pool ID."""
+        pool_id = f"pool_{uuid.uuid4().hex[:8]}"
+        workspace_dir, _ = create_workspace(pool_id)
+        testjs_dir = setup_testjs_workspace(workspace_dir, logger)
+
+        if not await install_test_dependencies(
+            testjs_dir, logger
+        ) or not await verify_browser_binaries(testjs_dir, logger):
+            logger.warning(f"Failed to provision pooled workspace {pool_id}")
+            shutil.rmtree(workspace_dir, ignore_errors=True)
+            return None
+
+        logger.info(f"Provisioned pooled workspace {pool_id}")
+        return pool_id
+
+    async def checkout(self, execution_id: str) -> tuple[str, str]:
+        """
+        Check out a ready workspace for an execution.
+
+        The workspace is moved to the regular per-execution location so logs
+        and paths look the same as for a freshly created workspace. Falls back
+        to provisioning inline when the pool is empty.
+
+        Args:
+            execution_id: Unique identifier for this execution
+
+        Returns:
+            Tuple of (workspace_dir, testjs_dir)
+        """
+        workspace_dir = _workspace_path(execution_id)
+
+        try:
+            pool_id = self._ready.get_nowait()
+            os.rename(_workspace_path(pool_id), workspace_dir)
+            logger.info(f"Checked out pooled workspace {pool_id} as {execution_id}")
+        except (asyncio.QueueEmpty, OSError):
+            create_workspace(execution_id)
+        finally:
+            self._refill.set()
+
+        testjs_dir = setup_testjs_workspace(workspace_dir, logger)
+        if not await install_test_dependencies(testjs_dir, logger):
+            raise RuntimeError("Failed to install dependencies")
+
+        return workspace_dir, testjs_dir
+
+    async def release(self, execution_id: str):
+        """
+        Scrub a checked-out workspace and return it to the pool.
+
+        Execution logs stay at the per-execution path; everything else is
+        moved back under a new pool ID. Workspaces linked to an outdated
+        dependency cache, or beyond the pool size, are removed instead.
+
+        Args:
+            execution_id: The execution ID the workspace was checked out for
+        """
+        workspace_dir = _workspace_path(execution_id)
+        testjs_dir = os.path.join(workspace_dir, "testjs")
+
+        if not os.path.isdir(testjs_dir):
+            return
+
+        current_cache = get_dependency_cache_dir()
+        node_modules = os.path.realpath(os.path.join(testjs_dir, "node_modules"))
+        reusable = (
+            self.size > 0
+            and self._ready.qsize() + self._returning < self.size
+            and node_modules.startswith(current_cache + os.sep)
+        )
+
+        if not reusable:
+            await asyncio.to_thread(self._remove, workspace_dir)
+            return
+
+        self._returning += 1
+        try:
+            pool_id = await asyncio.to_thread(self._recycle, execution_id)
+        finally:
+            self._returning -= 1
+
+        if pool_id is not None:
+            self._ready.put_nowait(pool_id)
+            logger.info(f"Returned workspace {execution_id} to pool as {pool_id}")
+
+    @staticmethod
+    def _remove(workspace_dir: str):
+        """Delete a workspace except for its execution logs. Blocking."""
+        shutil.rmtree(os.path.join(workspace_dir, "testjs"), ignore_errors=True)
+        shutil.rmtree(os.path.join(workspace_dir, "browser_data"), ignore_errors=True)
+
+    @classmethod
+    def _recycle(cls, execution_id: str) -> str | None:
+        """
+        Scrub a workspace and move it under a new pool ID. Blocking.
+
+        Returns:
+            The pool ID, or None if the workspace could not be recycled and
+            was removed instead
+        """
+        workspace_dir = _workspace_path(execution_id)
+        try:
+            cls._scrub(workspace_dir)
+        except OSError as e:
+            logger.warning(f"Failed to scrub workspace {execution_id}, removing it: {e}")
+            cls._remove(workspace_dir)
+            return None
+
+        pool_id = f"pool_{uuid.uuid4().hex[:8]}"
+        pool_dir = _workspace_path(pool_id)
+        try:
+            os.rename(workspace_dir, pool_dir)
+            logs_dir = os.path.join(pool_dir, "logs")
+            if os.path.isdir(logs_dir):
+                os.makedirs(workspace_dir, exist_ok=True)
+                shutil.move(logs_dir, os.path.join(workspace_dir, "logs"))
+        except OSError as e:
+            logger.warning(f"Failed to return workspace {execution_id} to pool: {e}")
+            shutil.rmtree(pool_dir, ignore_errors=True)
+            return None
+        return pool_id
+
+    @staticmethod
+    def _scrub(workspace_dir: str):
+        testjs_dir = os.path.join(workspace_dir, "testjs")
+        tests_dir = os.path.join(testjs_dir, "tests")
+
+        for entry in os.listdir(tests_dir):
+            path = os.path.join(tests_dir, entry)
+            if os.path.isdir(path):
+                shutil.rmtree(path, ignore_errors=True)
+            else:
+                os.remove(path)
+
+        for pattern in RUN_ARTIFACTS:
+            for path in glob.glob(os.path.join(testjs_dir, pattern)):
+                if os.path.isdir(path):
+                    shutil.rmtree(path, ignore_errors=True)
+                else:
+                    os.remove(path)
+
+        browser_data = os.path.join(workspace_dir, "browser_data")
+        shutil.rmtree(browser_data, ignore_errors=True)
+        os.makedirs(browser_data, exist_ok=True)
+
+
+workspace_pool = WorkspacePool(size=int(os.getenv("WORKSPACE_POOL_SIZE", "2")))
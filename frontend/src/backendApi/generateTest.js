@@ -1,33 +1,64 @@
 import {
   TestGenerationResponseSchema,
   TestGenerationRequestSchema,
+  GenerationJobResponseSchema,
+  GenerationJobStatusResponseSchema,
   TestExecutionRequestSchema,
   TestExecutionResponseSchema,
+  SuiteExecutionRequestSchema,
+  SuiteExecutionResponseSchema,
+  ScreenshotStatusResponseSchema,
+  StepTimingStatsResponseSchema,
+  RepairTestRequestSchema,
+  RepairTestResponseSchema,
 } from "../schemas/generateTestSchema.js"
 import { API_BASE_URL } from "../constants.js"
 import { getDummyTestGenerationResponse } from "../test_data/dummyData.js"
 
-export const generateTest = async (requestData) => {
+const GENERATION_POLL_INTERVAL_MS = 3000
+const SCREENSHOT_POLL_INTERVAL_MS = 1000
+
+// Generation runs as a background job on the server; submit it and poll
+// until it finishes so long agent runs don't hit proxy timeouts.
+export const generateTest = async (requestData, { onProgress, signal } = {}) => {
   TestGenerationRequestSchema.parse(requestData)
 
   // !!! USING DUMMY DATA
   // const responseData = getDummyTestGenerationResponse()
 
-  // Simulate network delay
-  // await new Promise((resolve) => setTimeout(resolve, 20000))
-
-  const response = await fetch(`${API_BASE_URL}/generate-test`, {
+  const submitResponse = await fetch(`${API_BASE_URL}/generate-test/jobs`, {
     method: "POST",
     headers: {
       "Content-Type": "application/json",
     },
     body: JSON.stringify(requestData),
   })
-  const responseData = await response.json()
+  const job = GenerationJobResponseSchema.parse(await submitResponse.json())
 
-  TestGenerationResponseSchema.parse(responseData)
+  const cancel = () =>
+    fetch(`${API_BASE_URL}/generate-test/jobs/${job.job_id}`, { method: "DELETE" })
+  signal?.addEventListener("abort", cancel, { once: true })
 
-  return responseData
+  try {
+    while (true) {
+      await new Promise((resolve) => setTimeout(resolve, GENERATION_POLL_INTERVAL_MS))
+      if (signal?.aborted) throw new Error("Test generation cancelled")
+
+      const statusResponse = await fetch(`${API_BASE_URL}/generate-test/jobs/${job.job_id}`)
+      const status = GenerationJobStatusResponseSchema.parse(await statusResponse.json())
+      onProgress?.(status)
+
+      if (status.status === "succeeded") {
+        TestGenerationResponseSchema.parse(status.result)
+        return status.result
+      }
+      if (status.status === "failed" || status.status === "cancelled") {
+        throw new Error(status.error || `Test generation ${status.status}`)
+      }
+    }
+  } finally {
+    signal?.removeEventListener("abort", cancel)
+  }
 }
 
 export const executeTest = async (requestData) => {
@@ -46,3 +77,111 @@ export const executeTest = async (requestData) => {
 
   return responseData
 }
+
+// Re-runs a stored test and, if it fails, patches its script from the failing
+// step on. The result is not saved; update the test like after a generation.
+export const repairTest = async (requestData) => {
+  RepairTestRequestSchema.parse(requestData)
+
+  const response = await fetch(`${API_BASE_URL}/repair-test`, {
+    method: "POST",
+    headers: {
+      "Content-Type": "application/json",
+    },
+    body: JSON.stringify(requestData),
+  })
+  const responseData = await response.json()
+
+  RepairTestResponseSchema.parse(responseData)
+
+  return responseData
+}
+
+// Failure screenshots are uploaded in the background; resolves true once the
+// screenshot is in storage, false if the upload failed or is unknown.
+export const waitForScreenshot = async (screenshotId) => {
+  while (true) {
+    const response = await fetch(
+      `${API_BASE_URL}/screenshots/${encodeURIComponent(screenshotId)}`
+    )
+    if (!response.ok) return false
+
+    const { status } = ScreenshotStatusResponseSchema.parse(await response.json())
+    if (status !== "pending") return status === "available"
+
+    await new Promise((resolve) => setTimeout(resolve, SCREENSHOT_POLL_INTERVAL_MS))
+  }
+}
+
+// Uploads a trace or video kept for an execution run with debug_artifacts
+// and resolves with a signed download URL
+export const getDebugArtifactUrl = async (executionId, name) => {
+  const response = await fetch(
+    `${API_BASE_URL}/executions/${encodeURIComponent(executionId)}/artifacts/${encodeURIComponent(name)}`,
+    { method: "POST" }
+  )
+  if (!response.ok) throw new Error(`Failed to fetch artifact ${name}`)
+
+  return (await response.json()).url
+}
+
+// Drops the server's cached script and plan after a test was regenerated or deleted
+export const invalidateTestCache = async (testId) => {
+  await fetch(`${API_BASE_URL}/tests/${encodeURIComponent(testId)}/cache`, {
+    method: "DELETE",
+  })
+}
+
+// p50/p95 duration of each step over the test's most recent runs
+export const getStepTimingStats = async (testId, runs = 50) => {
+  const response = await fetch(
+    `${API_BASE_URL}/tests/${encodeURIComponent(testId)}/step-timings?runs=${runs}`
+  )
+  const responseData = await response.json()
+
+  StepTimingStatsResponseSchema.parse(responseData)
+
+  return responseData
+}
+
+export const executeSuite = async (requestData) => {
+  SuiteExecutionRequestSchema.parse(requestData)
+
+  const response = await fetch(`${API_BASE_URL}/execute-suite`, {
+    method: "POST",
+    headers: {
+      "Content-Type": "application/json",
+    },
+    body: JSON.stringify(requestData),
+  })
+  const responseData = await response.json()
+
+  SuiteExecutionResponseSchema.parse(responseData)
+
+  return responseData
+}
+
+// Streams execution events for a test. onEvent receives every event
+// ({ type: "step" | "stdout" | "stderr" | "failure" | "screenshot", ... });
+// resolves with the final TestExecutionResponse.
+export const streamTestExecution = (testId, onEvent) =>
+  new Promise((resolve, reject) => {
+    const source = new EventSource(
+      `${API_BASE_URL}/execute-test/${encodeURIComponent(testId)}/stream`
+    )
+
+    for (const type of ["step", "stdout", "stderr", "failure", "screenshot"]) {
+      source.addEventListener(type, (event) => onEvent?.(JSON.parse(event.data)))
+    }
+
+    source.addEventListener("result", (event) => {
+      source.close()
+      const { type, ...responseData } = JSON.parse(event.data)
+      resolve(TestExecutionResponseSchema.parse(responseData))
+    })
+
+    source.addEventListener("error", (event) => {
+      source.close()
+      reject(new Error(event.data ? JSON.parse(event.data).detail : "Test execution stream failed"))
+    })
+  })
@@ -1,8 +1,8 @@
 import { Globe, CircleDashed, Wrench, Play, List, MoreHorizontal, Delete, CheckCircle, XCircle, Clock } from 'lucide-react';
 import { useNavigate } from 'react-router-dom';
 import { useState } from 'react';
-import { supabase, updateTestOnSuccess, updateTestOnFailure, getScreenshotUrl } from "../supabase";
-import { executeTest } from "../backendApi/generateTest";
+import { supabase } from "../supabase";
+import { executeTest, invalidateTestCache } from "../backendApi/generateTest";
 
 export default function TestBar({ test, onDelete, onTestUpdate }) {
     const navigate = useNavigate();
@@ -31,10 +31,8 @@ export default function TestBar({ test, onDelete, onTestUpdate }) {
         try {
             const response = await executeTest({ test_id: test.id });
             
+            // The backend records the run and updates the test row
             if (response.success) {
-                // Test passed - update database
-                await updateTestOnSuccess(test.id);
-                
                 // Update local state
                 if (onTestUpdate) {
                     onTestUpdate(test.id, { 
@@ -45,16 +43,6 @@ export default function TestBar({ test, onDelete, onTestUpdate }) {
                     });
                 }
             } else {
-                // Test failed - update database
-                const screenshotUrl = response.screenshot_id ? getScreenshotUrl(response.screenshot_id) : null;
-                
-                await updateTestOnFailure(test.id, {
-                    errorMessage: response.output,
-                    errorStep: response.failing_step,
-                    errorIndex: response.failing_step_index,
-                    screenshotId: response.screenshot_id
-                });
-                
                 // Update local state
                 if (onTestUpdate) {
                     onTestUpdate(test.id, { 
@@ -83,6 +71,7 @@ export default function TestBar({ test, onDelete, onTestUpdate }) {
         try {
             const { error } = await supabase.from('tests').delete().eq('id', id);
             if (error) throw error;
+            await invalidateTestCache(id);
             
             // Call the parent's delete function to update the state
             if (onDelete) {
@@ -54,11 +54,14 @@ function TestResultsPanel({
               <span className="text-2xl">❌</span>
               <span className="font-semibold">Test Failed at Step {testResult.failedStep}</span>
             </div>
-            <img
-              src={testResult.screenshot}
-              alt="Failure screenshot"
-              className="w-full rounded border border-gray-300 mb-3 flex-1 object-contain"
-            />
+            {/* Show the small thumbnail first, the full screenshot opens on click */}
+            <a href={testResult.screenshot} target="_blank" rel="noreferrer" className="flex-1 mb-3">
+              <img
+                src={testResult.thumbnail || testResult.screenshot}
+                alt="Failure screenshot"
+                className="w-full h-full rounded border border-gray-300 object-contain"
+              />
+            </a>
           </div>
 
           <div
@@ -1,5 +1,5 @@
 import { useState } from 'react';
-import { generateTest } from '../backendApi/generateTest';
+import { generateTest, invalidateTestCache } from '../backendApi/generateTest';
 import { supabase } from '../supabase';
 
 export const useTestGeneration = () => {
@@ -33,6 +33,7 @@ export const useTestGeneration = () => {
         .eq('id', testId);
 
       if (updateError) throw updateError;
+      await invalidateTestCache(testId);
 
       return {
         testPlan: response.test_plan,
@@ -1,7 +1,7 @@
 import { useState, useEffect } from 'react';
 import { useParams, useNavigate } from 'react-router-dom';
-import { fetchTestById, updateTestOnSuccess, updateTestOnFailure, getScreenshotUrl } from '../supabase';
-import { executeTest } from '../backendApi/generateTest';
+import { fetchTestById, getScreenshotUrl } from '../supabase';
+import { executeTest, waitForScreenshot } from '../backendApi/generateTest';
 import { useTestGeneration } from '../hooks/useTestGeneration';
 import TestHeader from '../components/TestHeader';
 import TestConfigurationPanel from '../components/TestConfigurationPanel';
@@ -178,32 +178,33 @@ function TestCreate() {
           message: response.output || 'All test steps passed successfully!',
           timestamp: new Date().toLocaleTimeString()
         });
-
-        await updateTestOnSuccess(id);
       } else {
         // Test failed
         const failedStepIndex = response.failing_step_index;
         const statuses = calculateStepStatuses(false, failedStepIndex, steps);
         setStepStatuses(statuses);
 
-        const screenshotUrl = response.screenshot_id ? getScreenshotUrl(response.screenshot_id) : null;
-
         setTestResult({
           passed: false,
           failedStep: failedStepIndex !== null ? failedStepIndex + 1 : undefined,
           errorMessage: response.failing_step || 'Test execution failed',
           message: response.output || `Test failed${failedStepIndex !== null ? ` at step ${failedStepIndex + 1}` : ''}`,
           timestamp: new Date().toLocaleTimeString(),
-          screenshot: screenshotUrl
+          screenshot: null
         });
 
-        // Update database with failure information
-        await updateTestOnFailure(id, {
-          errorMessage: response.output,
-          errorStep: response.failing_step,
-          errorIndex: response.failing_step_index,
-          screenshotId: response.screenshot_id
-        });
+        // The screenshot is still uploading when the result arrives
+        if (response.screenshot_id) {
+          waitForScreenshot(response.screenshot_id).then((available) => {
+            if (available) {
+              setTestResult((result) => ({
+                ...result,
+                screenshot: getScreenshotUrl(response.screenshot_id),
+                thumbnail: getScreenshotUrl(response.thumbnail_id),
+              }));
+            }
+          });
+        }
       }
 
       setIsRunning(false);
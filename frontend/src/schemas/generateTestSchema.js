@@ -3,18 +3,67 @@ import { z } from "zod"
 export const TestGenerationRequestSchema = z.object({
   target_url: z.string(),
   test_case_description: z.string(),
+  tenant_id: z.string().optional(),
+  max_input_tokens: z.number().int().positive().optional(),
+  max_output_tokens: z.number().int().positive().optional(),
+  max_cost_usd: z.number().positive().optional(),
+  max_seconds: z.number().positive().optional(),
+  use_cache: z.boolean().optional(),
+})
+
+export const GenerationUsageSchema = z.object({
+  input_tokens: z.number().int(),
+  cached_input_tokens: z.number().int(),
+  cache_hit_rate: z.number().nullable().optional(),
+  output_tokens: z.number().int(),
+  total_tokens: z.number().int(),
+  requests: z.number().int(),
+  cost_usd: z.number(),
+  duration_seconds: z.number(),
+  stop_reason: z
+    .enum(["input_tokens", "output_tokens", "cost", "tenant", "time"])
+    .nullable()
+    .optional(),
 })
 
 export const TestGenerationResponseSchema = z.object({
   test_plan: z.array(z.string()),
   test_script: z.string(),
   status: z.string(),
+  usage: GenerationUsageSchema.nullable().optional(),
+  cached: z.boolean().optional(),
+})
+
+
+export const GenerationJobResponseSchema = z.object({
+  job_id: z.string(),
+  status: z.string(),
 })
 
+export const GenerationJobStatusResponseSchema = z.object({
+  job_id: z.string(),
+  status: z.enum(["queued", "running", "succeeded", "failed", "cancelled"]),
+  turns: z.number().int(),
+  tool_calls: z.number().int(),
+  last_test_success: z.boolean().nullable().optional(),
+  last_test_output: z.string().nullable().optional(),
+  usage: GenerationUsageSchema.nullable().optional(),
+  result: TestGenerationResponseSchema.nullable().optional(),
+  error: z.string().nullable().optional(),
+})
 
 export const TestExecutionRequestSchema = z
   .object({
     test_id: z.string(),
+    debug_artifacts: z.enum(["on_failure", "on_retry"]).optional(),
+  })
+  .strict();
+
+export const StepTimingSchema = z
+  .object({
+    description: z.string(),
+    started_ms: z.number(),
+    duration_ms: z.number(),
   })
   .strict();
 
@@ -24,8 +73,81 @@ export const TestExecutionResponseSchema = z
     output: z.string(),
     test_id: z.string(),
     test_plan: z.array(z.string()).nullable().optional(),
+    step_timings: z.array(StepTimingSchema).nullable().optional(),
     failing_step: z.string().nullable().optional(),
     failing_step_index: z.number().int().nullable().optional(),
     screenshot_id: z.string().nullable().optional(),
+    thumbnail_id: z.string().nullable().optional(),
+    duration_seconds: z.number().nullable().optional(),
+    execution_id: z.string().nullable().optional(),
+    debug_artifacts: z.array(z.string()).nullable().optional(),
+  })
+  .strict();
+
+export const SuiteExecutionRequestSchema = z
+  .object({
+    test_ids: z.array(z.string()).optional(),
+    filter: z.enum(["all", "failing"]).optional(),
+    concurrency: z.number().int().positive().optional(),
+    mode: z.enum(["parallel", "batch"]).optional(),
+  })
+  .strict();
+
+export const SuiteExecutionResponseSchema = z
+  .object({
+    results: z.array(TestExecutionResponseSchema),
+    total: z.number().int(),
+    passed: z.number().int(),
+    failed: z.number().int(),
+    duration_seconds: z.number(),
+    concurrency: z.number().int(),
   })
-  .strict();
\ No newline at end of file
+  .strict();
+
+export const ScreenshotStatusResponseSchema = z
+  .object({
+    screenshot_id: z.string(),
+    status: z.enum(["pending", "available", "failed"]),
+  })
+  .strict();
+
+export const StepTimingStatsResponseSchema = z
+  .object({
+    test_id: z.string(),
+    runs: z.number().int(),
+    steps: z.array(
+      z
+        .object({
+          index: z.number().int(),
+          description: z.string(),
+          samples: z.number().int(),
+          p50_ms: z.number(),
+          p95_ms: z.number(),
+          max_ms: z.number(),
+        })
+        .strict()
+    ),
+  })
+  .strict();
+
+export const RepairTestRequestSchema = z
+  .object({
+    test_id: z.string(),
+    tenant_id: z.string().optional(),
+    max_input_tokens: z.number().int().positive().optional(),
+    max_output_tokens: z.number().int().positive().optional(),
+    max_cost_usd: z.number().positive().optional(),
+    max_seconds: z.number().positive().optional(),
+  })
+  .strict();
+
+export const RepairTestResponseSchema = z.object({
+  test_id: z.string(),
+  status: z.enum(["passing", "repaired", "not_repaired"]),
+  test_plan: z.array(z.string()).nullable().optional(),
+  test_script: z.string(),
+  failing_step: z.string().nullable().optional(),
+  failing_step_index: z.number().int().nullable().optional(),
+  summary: z.string().nullable().optional(),
+  usage: GenerationUsageSchema.nullable().optional(),
+})
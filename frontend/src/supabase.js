@@ -26,51 +26,16 @@ export async function fetchTestById(testId) {
   return data;
 }
 
-export async function updateTestOnSuccess(testId) {
-  const { error } = await supabase
-    .from('tests')
-    .update({
-      last_run_at: new Date().toISOString(),
-      last_passed: true,
-      last_error_message: null,
-      last_error_step: null,
-      last_error_index: null
-    })
-    .eq('id', testId);
-
-  if (error) {
-    console.error('Error updating test on success:', error);
-    throw error;
-  }
-}
-
-export async function updateTestOnFailure(testId, { errorMessage, errorStep, errorIndex, screenshotId }) {
-  const { error } = await supabase
-    .from('tests')
-    .update({
-      last_run_at: new Date().toISOString(),
-      last_passed: false,
-      last_error_message: errorMessage,
-      last_error_step: errorStep,
-      last_error_index: errorIndex,
-      last_screenshot_id: screenshotId
-    })
-    .eq('id', testId);
-
-  if (error) {
-    console.error('Error updating test on failure:', error);
-    throw error;
-  }
-}
-
+// Screenshot IDs are object names with their extension ("<hash>.webp");
+// older IDs are bare UUIDs of PNG files.
 export function getScreenshotUrl(screenshotId) {
   if (!screenshotId) return null;
 
+  const objectName = screenshotId.includes('.') ? screenshotId : `${screenshotId}.png`;
   const { data } = supabase
     .storage
     .from('Screenshots')
-    .getPublicUrl(screenshotId);
-
+    .getPublicUrl(objectName);
 
-  return data?.publicUrl ? data.publicUrl + ".png" : null;
+  return data?.publicUrl ?? null;
 }